@@ -64,19 +64,33 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # 与应用使用同一个数据库（STG_DATABASE_URL），而不是 alembic.ini 中的相对路径；
+    # stg-admin init-db 会通过 config.attributes 传入已打开的连接
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
+        {"sqlalchemy.url": SQLALCHEMY_DATABASE_URL},
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+        _run_with_connection(connection)
+
 
-        with context.begin_transaction():
-            context.run_migrations()
+def _run_with_connection(connection) -> None:
+    # SQLite 不支持大部分 ALTER TABLE，迁移以 batch 模式（重建表）执行
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,49 @@
+"""hash password reset tokens
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 08:26:35.087741
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 先加可空列，把已有 token 换成哈希后再加 NOT NULL 和唯一索引
+    with op.batch_alter_table('password_reset_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.text('SELECT id, token FROM password_reset_tokens')).fetchall()
+    for row_id, token in rows:
+        connection.execute(
+            sa.text('UPDATE password_reset_tokens SET token_hash = :token_hash WHERE id = :id'),
+            {'token_hash': hashlib.sha256(token.encode('utf-8')).hexdigest(), 'id': row_id},
+        )
+
+    with op.batch_alter_table('password_reset_tokens', schema=None) as batch_op:
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.drop_index(batch_op.f('ix_password_reset_tokens_token'))
+        batch_op.create_index(batch_op.f('ix_password_reset_tokens_token_hash'), ['token_hash'], unique=True)
+        batch_op.drop_column('token')
+
+
+def downgrade() -> None:
+    # 哈希无法还原为原始 token：降级时作废所有未使用的重置链接
+    op.execute('DELETE FROM password_reset_tokens')
+    with op.batch_alter_table('password_reset_tokens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token', sa.VARCHAR(), nullable=False))
+        batch_op.drop_index(batch_op.f('ix_password_reset_tokens_token_hash'))
+        batch_op.create_index(batch_op.f('ix_password_reset_tokens_token'), ['token'], unique=1)
+        batch_op.drop_column('token_hash')
@@ -0,0 +1,75 @@
+"""register legacy uploads
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:05:12.418305
+
+"""
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.uploads import UPLOADS_ROOT
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 一次性数据迁移：把内容寻址存储上线前的上传文件（随机文件名）登记到 stored_files，
+    # 引用计数按当前数据库中的实际引用计算；之后的清理只依赖 ref_count 索引，不再扫描目录
+    connection = op.get_bind()
+    known = {url for (url,) in connection.execute(sa.text('SELECT url FROM stored_files'))}
+    cover_refs = Counter(
+        url for (url,) in connection.execute(sa.text('SELECT image_url FROM games WHERE image_url IS NOT NULL'))
+    )
+    cover_refs.update(
+        url for (url,) in connection.execute(sa.text('SELECT cover_image FROM resources WHERE cover_image IS NOT NULL'))
+    )
+    article_contents = [content or '' for (content,) in connection.execute(sa.text('SELECT content_md FROM articles'))]
+
+    now = datetime.utcnow()
+    registered = 0
+    for subdir in ('covers', 'articles'):
+        directory = UPLOADS_ROOT / subdir
+        if not directory.exists():
+            continue
+        for file in directory.iterdir():
+            if not file.is_file() or file.name.startswith('.'):
+                continue
+            url = f'/static/uploads/{subdir}/{file.name}'
+            if url in known:
+                continue
+            if subdir == 'covers':
+                refs = cover_refs.get(url, 0)
+            else:
+                refs = sum(1 for content in article_contents if url in content)
+            connection.execute(
+                sa.text(
+                    'INSERT INTO stored_files (sha256, url, size, ref_count, created_at, updated_at) '
+                    'VALUES (:sha256, :url, :size, :ref_count, :now, :now)'
+                ),
+                {
+                    'sha256': hashlib.sha256(file.read_bytes()).hexdigest(),
+                    'url': url,
+                    'size': file.stat().st_size,
+                    'ref_count': refs,
+                    'now': now,
+                },
+            )
+            registered += 1
+    if registered:
+        print(f'[uploads] 已登记 {registered} 个历史上传文件。')
+
+
+def downgrade() -> None:
+    # 登记记录与新上传的记录无法区分，降级时保留
+    pass
@@ -2,9 +2,11 @@ from fastapi import Request, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import os
 
 # 这里显式兼容不同版本的 bcrypt，避免 passlib 自检时出错
@@ -20,12 +22,15 @@ except Exception:
     # 如果环境里没有 bcrypt 或其他异常，交给 passlib 自己处理
     _bcrypt = None  # type: ignore[assignment]
 
-from . import models, database
+from . import models
+from app.utils import token_versions
 
 # 安全配置
 SECRET_KEY = os.getenv("STG_SECRET_KEY", "a_very_very_secret_key_should_be_in_env_var")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("STG_ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))  # 默认24小时 
+# 从环境变量读取HTTPS设置，生产环境应设为True（登录 Cookie 只通过 HTTPS 发送）
+HTTPS_ONLY = os.getenv("STG_HTTPS_ONLY", "False").lower() == "true"
 
 # 说明：
 # - bcrypt 原生只支持前 72 字节的密码（按字节算，不是字符）
@@ -74,6 +79,55 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def token_claims(user: models.User) -> dict:
+    """登录 token 的载荷：除 sub 外携带 uid / adm / ver，校验时无需查询 users 表"""
+    return {"sub": user.username, "uid": user.id, "adm": bool(user.is_admin), "ver": user.token_version or 0}
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    由 token 载荷和用户状态缓存构造的当前用户（通常不查询数据库）。
+    只提供 id / username / is_admin，路由和模板用到的也只有这几个属性。
+    """
+    id: int
+    username: str
+    is_admin: bool
+
+
+def decode_claims(token: Optional[str]) -> Optional[dict]:
+    """校验 token 签名与有效期；token 缺失、无效、过期或缺少 uid/ver（旧版 token）时返回 None"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if not isinstance(payload.get("uid"), int) or not payload.get("sub") or payload.get("ver") is None:
+        return None
+    return payload
+
+
+async def authenticate(token: Optional[str]) -> Optional[Principal]:
+    """
+    由 token 得到当前用户；无效或已作废（版本号不一致、用户已删除）时返回 None。
+    只在用户状态缓存过期或未命中时查询数据库（在线程池中执行），见 app/utils/token_versions.py。
+    管理员身份以缓存中的 is_admin 为准，不使用 token 中的 adm。
+    """
+    claims = decode_claims(token)
+    if claims is None:
+        return None
+    user_id = claims["uid"]
+    if token_versions.is_stale():
+        await run_in_threadpool(token_versions.refresh)
+    if not token_versions.is_known(user_id):
+        await run_in_threadpool(token_versions.load, user_id)
+    state = token_versions.current(user_id)
+    if state is None or state.token_version != claims["ver"]:
+        return None
+    return Principal(id=user_id, username=claims["sub"], is_admin=state.is_admin)
+
+
 def get_user(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
@@ -83,29 +137,17 @@ def authenticate_user(db: Session, username: str, password: str):
         return None
     return user
 
-async def get_current_user(
-    token: str = Depends(cookie_auth),  # 使用自定义的认证方式
-    db: Session = Depends(database.get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+async def get_current_user(token: Optional[str] = Depends(cookie_auth)) -> Principal:
+    """当前登录用户（Principal），只校验 token 和内存中的用户状态缓存，通常不查询数据库"""
+    if principal := await authenticate(token):
+        return principal
+    raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭证",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    if user := get_user(db, username=username):
-        return user
-    raise credentials_exception
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     验证当前用户是否为管理员。
     如果不是管理员，则抛出 403 Forbidden 错误。
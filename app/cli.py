@@ -0,0 +1,179 @@
+"""
+stg-admin：部署 / 运维命令行
+
+建表、迁移与初始数据不再在应用导入时执行（gunicorn 每次启动 / 回收 worker 都要重复一遍），
+改由部署步骤一次性运行：
+
+    python -m app.cli init-db              # 升级到最新迁移并写入初始数据（可重复执行）
+    python -m app.cli init-db --no-seed    # 只建表 / 迁移
+    python -m app.cli backup               # SQLite 在线备份（见 app/maintenance/backup.py）
+    python -m app.cli verify-backup FILE   # 对备份文件做恢复校验
+    python -m app.cli send-emails          # 立即发送 outbox 中到期的邮件（STG_EMAIL_DISPATCHER=false 时用 cron 运行）
+
+数据库由 STG_DATABASE_URL 指定，迁移脚本位于 alembic/versions。
+"""
+import argparse
+from typing import List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app import database, models
+from app.config.constants import BASE_DIR
+from app.utils import rankings
+
+# 预设的悬赏板块
+BOUNTY_CATEGORIES = [
+    ("技术求助", "技术问题求助、代码实现等"),
+    ("资源征集", "游戏资源、素材、资料征集"),
+    ("合作邀请", "项目合作、团队招募等"),
+    ("其他", "其他类型的悬赏"),
+    ("游戏悬赏", "游戏相关悬赏"),
+]
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "alembic"))
+    return config
+
+
+# 旧版本（应用启动时 create_all）建立的数据库对应的迁移版本
+LEGACY_REVISION = "0001"
+
+# LEGACY_REVISION 之后的迁移新建或修改过的表：不能按当前模型补建（结构与 LEGACY_REVISION 不同），由迁移处理。
+# 新增修改已有表 / 新建表的迁移时，需要把表名加到这里
+TABLES_CHANGED_AFTER_LEGACY = {"users", "password_reset_tokens", "email_outbox", "ranking_totals"}
+
+
+def migrate() -> None:
+    """把数据库升级到最新迁移。
+
+    旧版本由应用启动时 create_all 建立的数据库没有 alembic_version 表：
+    先补齐 LEGACY_REVISION 中有、但旧库缺少的表，标记为 LEGACY_REVISION，再照常升级到最新版本，
+    之后的迁移（加列、改列、新表）都会真正执行。
+    """
+    from alembic import command
+
+    config = _alembic_config()
+    with database.engine.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if tables and "alembic_version" not in tables:
+            missing_changed = {"users", "password_reset_tokens"} - tables
+            if missing_changed:
+                raise SystemExit(
+                    f"[init-db] 数据库缺少 {', '.join(sorted(missing_changed))} 表，不是旧版本建立的数据库，请检查 STG_DATABASE_URL。"
+                )
+            missing = [
+                table
+                for table in models.Base.metadata.sorted_tables
+                if table.name not in tables and table.name not in TABLES_CHANGED_AFTER_LEGACY
+            ]
+            models.Base.metadata.create_all(bind=connection, tables=missing)
+            command.stamp(config, LEGACY_REVISION)
+            print(f"[init-db] 检测到未纳入迁移管理的数据库，已补齐 {len(missing)} 个缺失的表并标记为 {LEGACY_REVISION}。")
+        command.upgrade(config, "head")
+        print("[init-db] 数据库已升级到最新版本。")
+
+
+def seed_bounty_categories(db: Session) -> int:
+    """写入预设的悬赏板块（已有板块时跳过），返回新增数量"""
+    if db.query(models.BountyCategory.id).first() is not None:
+        return 0
+    for name, description in BOUNTY_CATEGORIES:
+        db.add(models.BountyCategory(name=name, description=description))
+    db.commit()
+    return len(BOUNTY_CATEGORIES)
+
+
+def seed() -> None:
+    db = database.SessionLocal()
+    try:
+        created = seed_bounty_categories(db)
+        if created:
+            print(f"[init-db] 已创建 {created} 个悬赏板块。")
+        # 升级到带排行表的版本后首次运行时，从已有评分全量重建
+        rankings.ensure_rankings(db)
+    finally:
+        db.close()
+
+
+def init_db(with_seed: bool = True) -> None:
+    migrate()
+    if with_seed:
+        seed()
+    print("[init-db] 完成。")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="stg-admin", description="STG 社区网站运维命令")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = commands.add_parser("init-db", help="建表 / 升级到最新迁移，并写入初始数据")
+    init_parser.add_argument("--no-seed", action="store_true", help="不写入初始数据")
+
+    backup_parser = commands.add_parser("backup", help="SQLite 在线备份（backup API + 压缩 + 轮换 + 恢复校验）")
+    backup_parser.add_argument("--dir", help="备份目录（默认 STG_BACKUP_DIR）")
+    backup_parser.add_argument("--output", help="写到指定文件（不做轮换），与 --dir 二选一")
+    backup_parser.add_argument("--compression", choices=["zstd", "gzip", "none"], help="默认 zstd（未安装 zstandard 时 gzip）")
+    backup_parser.add_argument("--keep", type=int, help="保留最近几份备份（默认 STG_BACKUP_KEEP）")
+    backup_parser.add_argument("--vacuum", action="store_true", help="对副本执行 VACUUM INTO 整理")
+    backup_parser.add_argument("--no-verify", action="store_true", help="跳过恢复校验")
+    backup_parser.add_argument("--pages", type=int, help="每批复制的页数（越小越不影响写入，备份越慢）")
+    backup_parser.add_argument("--sleep", type=float, help="批间休眠秒数")
+
+    verify_parser = commands.add_parser("verify-backup", help="解压备份文件并执行 integrity_check")
+    verify_parser.add_argument("path")
+
+    commands.add_parser("send-emails", help="发送 email_outbox 中到期的邮件")
+
+    args = parser.parse_args(argv)
+    if args.command == "init-db":
+        init_db(with_seed=not args.no_seed)
+    elif args.command == "backup":
+        from app.maintenance import backup
+
+        if args.dir and args.output:
+            parser.error("--dir 与 --output 不能同时使用")
+        options = {
+            name: value
+            for name, value in (("keep", args.keep), ("pages", args.pages), ("sleep", args.sleep))
+            if value is not None
+        }
+        try:
+            stats = backup.backup_database(
+                directory=args.dir,
+                output=args.output,
+                compression=args.compression,
+                vacuum=args.vacuum,
+                verify=not args.no_verify,
+                **options,
+            )
+        except RuntimeError as e:
+            print(f"[backup] 备份失败：{e}")
+            raise SystemExit(1)
+        backup.print_report(stats)
+    elif args.command == "verify-backup":
+        from app.maintenance import backup
+
+        result = backup.verify_backup(args.path)
+        print(f"[backup] {args.path}：integrity_check {result}")
+        if result != "ok":
+            raise SystemExit(1)
+    elif args.command == "send-emails":
+        from app.utils import outbox
+
+        count = outbox.drain()
+        db = database.SessionLocal()
+        try:
+            pending = outbox.pending_count(db)
+        finally:
+            db.close()
+        print(f"[email] 已处理 {count} 封邮件，仍待发送 {pending} 封。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 from fastapi.templating import Jinja2Templates
 from app.config.constants import BASE_DIR
+from app.utils.images import cover_src, cover_srcset
 
 # 使用绝对路径配置模板目录，避免路径问题
 templates = Jinja2Templates(directory=str(BASE_DIR / "app" / "templates"))
+
+# 封面缩略图辅助函数（输出 srcset / 回退原图）
+templates.env.globals["cover_src"] = cover_src
+templates.env.globals["cover_srcset"] = cover_srcset
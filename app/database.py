@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import os
+import sqlite3
+import tempfile
 from pathlib import Path
 
+from app.utils.snapshots import SnapshotRefresher
+
 # 从环境变量读取数据库URL，如果未设置则使用默认路径
 # 默认路径使用绝对路径，避免工作目录问题
 DEFAULT_DB_PATH = Path(__file__).parent.parent / "stg_website.db"
@@ -14,6 +22,117 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url(url: str) -> str:
+    """同步 URL -> 异步驱动 URL（SQLite 使用 aiosqlite）"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+# 异步引擎：高并发的只读页面（游戏详情、浏览、资源列表、/api/v1/games）使用，
+# 查询在事件循环中等待而不占用线程池；其他数据库可通过 STG_ASYNC_DATABASE_URL 指定异步驱动
+ASYNC_DATABASE_URL = os.getenv("STG_ASYNC_DATABASE_URL", _async_url(SQLALCHEMY_DATABASE_URL))
+ASYNC_POOL_SIZE = int(os.getenv("STG_ASYNC_POOL_SIZE", "10"))
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_POOL_SIZE
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# 只读引擎：/stats、/api/v1/games 全量导出等耗时的只读查询使用，不与写入争用主库文件
+# - STG_READ_DATABASE_URL：只读副本（例如复制工具同步出的文件）；SQLite 以 mode=ro 打开并设置 query_only
+# - STG_READ_SNAPSHOT_SECONDS：未配置副本时，每隔这么多秒用 SQLite backup API 生成一份主库快照
+#   （STG_READ_SNAPSHOT_PATH，默认在临时目录），以 immutable 方式打开；快照生成前仍读主库
+# 两者都未配置时只读路由直接使用主库
+READ_DATABASE_URL = os.getenv("STG_READ_DATABASE_URL")
+READ_SNAPSHOT_SECONDS = float(os.getenv("STG_READ_SNAPSHOT_SECONDS", "0"))
+READ_SNAPSHOT_PATH = os.getenv(
+    "STG_READ_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "stg_read_snapshot.db")
+)
+
+
+def sqlite_path(url: str):
+    """SQLite 文件 URL 对应的路径；非 SQLite 或内存库返回 None"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return parsed.database
+
+
+# 支持 INSERT ... ON CONFLICT 的方言
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def upsert_insert(db, model):
+    """
+    当前数据库方言的 INSERT 构造，可接 on_conflict_do_nothing / on_conflict_do_update。
+    SQLite 与 PostgreSQL 的写法一致（index_elements + set_），其他数据库不支持
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise NotImplementedError(f"不支持的数据库方言: {dialect}（需要 SQLite 或 PostgreSQL）")
+    return _UPSERT_INSERTS[dialect](model)
+
+
+def _sqlite_uri(path: str, immutable: bool) -> str:
+    return f"file:{path}?mode=ro" + ("&immutable=1" if immutable else "")
+
+
+def _set_query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def _readonly_sqlite_engines(path: str, immutable: bool):
+    """按路径打开的只读 SQLite 引擎（同步 + 异步）。
+    快照会被原子替换，immutable 模式下不使用连接池，每次取连接都打开当前文件。"""
+    uri = _sqlite_uri(path, immutable)
+
+    async def async_creator():
+        import aiosqlite
+
+        return await aiosqlite.connect(uri, uri=True, check_same_thread=False)
+
+    pool_args = {"poolclass": NullPool} if immutable else {}
+    sync_engine = create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+        **pool_args,
+    )
+    async_engine = create_async_engine("sqlite+aiosqlite://", async_creator=async_creator, **pool_args)
+    for target in (sync_engine, async_engine.sync_engine):
+        event.listen(target, "connect", _set_query_only)
+    return sync_engine, async_engine
+
+
+read_snapshot = None
+if READ_DATABASE_URL and sqlite_path(READ_DATABASE_URL):
+    read_engine, async_read_engine = _readonly_sqlite_engines(sqlite_path(READ_DATABASE_URL), immutable=False)
+elif READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL)
+    async_read_engine = create_async_engine(os.getenv("STG_ASYNC_READ_DATABASE_URL", _async_url(READ_DATABASE_URL)))
+elif READ_SNAPSHOT_SECONDS > 0 and sqlite_path(SQLALCHEMY_DATABASE_URL):
+    read_snapshot = SnapshotRefresher(sqlite_path(SQLALCHEMY_DATABASE_URL), READ_SNAPSHOT_PATH, READ_SNAPSHOT_SECONDS)
+    read_engine, async_read_engine = _readonly_sqlite_engines(READ_SNAPSHOT_PATH, immutable=True)
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def _use_read_engine() -> bool:
+    """快照模式下触发过期刷新；快照尚未生成时回退到主库"""
+    if read_snapshot is None:
+        return True
+    read_snapshot.refresh_if_stale()
+    return read_snapshot.ready()
+
 Base = declarative_base()
 
 # 添加这个函数
@@ -24,5 +143,30 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    异步会话依赖。路由中不能触发懒加载（会抛 MissingGreenlet），
+    模板用到的关系需在查询时 selectinload；同步的工具函数通过 await db.run_sync(fn, ...) 调用。
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """
+    只读会话依赖：只查询、不写入的路由使用（只读副本 / 快照，未配置时即主库）。
+    读到的数据可能落后主库最多一个同步 / 快照周期，写入后需要立即读回的路由应使用 get_db。
+    """
+    db = ReadSessionLocal() if _use_read_engine() else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    """get_read_db 的异步版本，限制同 get_async_db"""
+    session_factory = AsyncReadSessionLocal if _use_read_engine() else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
 def create_db_and_tables():
     Base.metadata.create_all(bind=engine)
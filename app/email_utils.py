@@ -1,30 +1,22 @@
-import asyncio
-import smtplib
 import os
-from redmail import EmailSender
+
+from sqlalchemy.orm import Session
 
 from app.config.constants import SITE_BASE_URL
+from app.utils import outbox
 
 # 本地发信：通过 VPS 上的 Postfix/Sendmail，连接 localhost:25，无需认证/加密
+# 邮件先写入 email_outbox，由后台发信线程（app/utils/outbox.py）复用 SMTP 连接批量发送
 LOCAL_MAIL_HOST = os.getenv("STG_LOCAL_MAIL_HOST", "localhost")
 LOCAL_MAIL_PORT = int(os.getenv("STG_LOCAL_MAIL_PORT", "25"))
 
 # 设定站点发件人地址（从环境变量读取）
 SENDER_ADDRESS = os.getenv("STG_SENDER_ADDRESS", "noreply@localhost")
 
-mail_sender = EmailSender(
-    host=LOCAL_MAIL_HOST,
-    port=LOCAL_MAIL_PORT,
-    username=None,
-    password=None,
-    use_starttls=False,
-    cls_smtp=smtplib.SMTP,
-)
-
 
-async def send_password_reset_email(email: str, token: str) -> None:
+def queue_password_reset_email(db: Session, email: str, token: str) -> None:
     """
-    发送密码重置邮件（使用 redmail）。
+    把密码重置邮件写入 outbox（随调用方的事务提交，提交后由发信线程发送）。
 
     :param email: 收件人邮箱
     :param token: 重置 token，将会拼接到前端重置页面 URL 上
@@ -56,17 +48,4 @@ async def send_password_reset_email(email: str, token: str) -> None:
     </html>
     """
 
-    # redmail 为同步接口，这里用线程池异步调用，保持调用方接口不变
-    loop = asyncio.get_running_loop()
-
-    def _send():
-        mail_sender.send(
-            subject=subject,
-            receivers=[email],
-            html=body,
-            sender=SENDER_ADDRESS,
-        )
-
-    await loop.run_in_executor(None, _send)
-
-
+    outbox.enqueue(db, recipient=email, subject=subject, html=body)
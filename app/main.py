@@ -1,51 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from app.routers import ratings
 from . import models, database, auth
-from .routers import authentication, pages, api, admin, articles, bounties, password_reset, resources
-from starlette.middleware.sessions import SessionMiddleware
-import secrets
-import os
+from .routers import authentication, pages, api, admin, articles, bounties, password_reset, resources, metrics
+from starlette.concurrency import run_in_threadpool
 from app.config.constants import BASE_DIR
-from jose import jwt
+from app.utils import archives, images, instrumentation, nplusone, outbox
 
-# 创建所有数据库表
-models.Base.metadata.create_all(bind=database.engine)
+# 建表 / 迁移与初始数据（悬赏板块、排行表回填）由部署步骤执行：python -m app.cli init-db
 
-# 初始化悬赏板块
-def init_bounty_categories():
-    """初始化预设的悬赏板块"""
-    db = database.SessionLocal()
-    try:
-        # 检查是否已有板块
-        existing = db.query(models.BountyCategory).first()
-        if existing:
-            return  # 已初始化，跳过
-        
-        # 创建预设板块
-        categories = [
-            models.BountyCategory(name="技术求助", description="技术问题求助、代码实现等"),
-            models.BountyCategory(name="资源征集", description="游戏资源、素材、资料征集"),
-            models.BountyCategory(name="合作邀请", description="项目合作、团队招募等"),
-            models.BountyCategory(name="其他", description="其他类型的悬赏"),
-            models.BountyCategory(name="游戏悬赏", description="游戏相关悬赏")
-        ]
-        
-        for category in categories:
-            db.add(category)
-        
-        db.commit()
-        print("悬赏板块初始化完成")
-    except Exception as e:
-        db.rollback()
-        print(f"初始化悬赏板块时出错: {e}")
-    finally:
-        db.close()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 上一个 worker 退出时中断的静态包解压任务标记为失败（解压线程随进程终止）
+    await run_in_threadpool(archives.fail_interrupted_jobs)
+    # 上一个 worker 提交、尚未完成的封面缩略图任务重新提交
+    await run_in_threadpool(images.resume_pending)
+    # 每个 worker 启动后（gunicorn fork 之后）才启动后台线程
+    outbox.start_dispatcher()
+    yield
+    await run_in_threadpool(outbox.stop_dispatcher)
 
-# 初始化悬赏板块
-init_bounty_categories()
-
-app = FastAPI(title="STG Community Ratings")
+app = FastAPI(title="STG Community Ratings", lifespan=lifespan)
 
 @app.get("/health")
 async def health_check():
@@ -55,51 +31,29 @@ async def health_check():
 # BASE_DIR 已经是项目根目录，所以直接使用 app/static
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "app" / "static")), name="static")
 
-# 添加 SessionMiddleware
-# 从环境变量读取会话密钥，如果未设置则生成随机密钥（仅用于开发）
-SESSION_SECRET_KEY = os.getenv("STG_SESSION_SECRET_KEY")
-if not SESSION_SECRET_KEY:
-    SESSION_SECRET_KEY = secrets.token_urlsafe(32)
-
-# 从环境变量读取HTTPS设置，生产环境应设为True
-HTTPS_ONLY = os.getenv("STG_HTTPS_ONLY", "False").lower() == "true"
-
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=SESSION_SECRET_KEY,
-    session_cookie="session_id",
-    max_age=3600 * 24 * 7,  # 会话有效期 7 天
-    same_site="lax",
-    https_only=HTTPS_ONLY
-)
-
 # 中间件：在每个请求中检查cookie，并将用户信息附加到request.state
 # 这是为了模板可以访问 request.state.user
+# 登录状态只保存在 access_token（JWT）Cookie 中，不再使用 SessionMiddleware（它对每个请求都要解码、重新签名 session Cookie）
 @app.middleware("http")
 async def add_user_to_state(request: Request, call_next):
-    """将用户信息附加到 request.state，供模板使用"""
+    """将当前用户（auth.Principal，由 token 载荷和用户状态缓存构造，通常不查询数据库）附加到 request.state，供模板使用"""
     request.state.user = None
     token = request.cookies.get("access_token")
     if token:
-        try:
-            # 移除可能的 "Bearer " 前缀
-            token = token[7:] if token.startswith("Bearer ") else token
-            payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-            username: str = payload.get("sub")
-            if username:
-                db = database.SessionLocal()
-                try:
-                    user = auth.get_user(db, username)
-                    if user:
-                        request.state.user = user
-                finally:
-                    db.close()
-        except Exception:
-            # Token 无效或过期，忽略错误，保持 request.state.user = None
-            pass
+        # 移除可能的 "Bearer " 前缀；token 无效、过期或已作废时保持 request.state.user = None
+        token = token[7:] if token.startswith("Bearer ") else token
+        request.state.user = await auth.authenticate(token)
     response = await call_next(request)
     return response
 
+# 请求耗时与 SQL 统计（最后注册，位于最外层）
+instrumentation.instrument_engine(database.engine)
+instrumentation.instrument_engine(database.async_engine.sync_engine)
+instrumentation.instrument_engine(database.read_engine)
+instrumentation.instrument_engine(database.async_read_engine.sync_engine)
+nplusone.configure()
+app.middleware("http")(instrumentation.timing_middleware)
+
 # 包含来自其他文件的路由
 app.include_router(authentication.router)
 app.include_router(pages.router)
@@ -109,4 +63,5 @@ app.include_router(admin.router) # +++ 包含新的 admin 路由
 app.include_router(articles.router)
 app.include_router(bounties.router)
 app.include_router(password_reset.router)
-app.include_router(resources.router)
\ No newline at end of file
+app.include_router(resources.router)
+app.include_router(metrics.router)
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+SQLite 在线备份：服务运行时即可执行，得到一致的数据库副本。
+
+用法（通过 stg-admin 命令行）：
+    python -m app.cli backup                                          # 备份到 STG_BACKUP_DIR，保留最近 STG_BACKUP_KEEP 份
+    python -m app.cli backup --dir /var/backups/stg --keep 14 --vacuum
+    python -m app.cli backup --output /tmp/stg_website.db --compression none   # 单个未压缩副本（deploy.sh backup 使用）
+    python -m app.cli verify-backup backups/stg_website-20260101-030000.db.zst
+
+流程：
+1. sqlite3 backup API 分批复制页面（每批 --pages 页，批间休眠 --sleep 秒），写入只在批内短暂等待
+2. 可选 VACUUM INTO：对副本（而不是线上库）做一次整理，去掉空闲页
+3. 对副本执行 PRAGMA integrity_check，不通过则丢弃这份备份
+4. 流式压缩为 .zst（安装了 zstandard 时）或 .gz
+5. 恢复校验：把压缩文件解压到临时文件后再次 integrity_check，确认备份文件本身可以恢复
+6. 按时间戳只保留最近 --keep 份
+"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config.constants import BASE_DIR
+from app.database import SQLALCHEMY_DATABASE_URL, sqlite_path
+from app.utils import snapshots
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+BACKUP_DIR = os.getenv("STG_BACKUP_DIR", str(BASE_DIR / "backups"))
+BACKUP_KEEP = int(os.getenv("STG_BACKUP_KEEP", "7"))
+
+COMPRESSION_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compression_of(path: Path) -> str:
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and path.name.endswith(suffix):
+            return compression
+    return "none"
+
+
+def _open_compressed(path: Path, compression: str, mode: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd 压缩需要安装 zstandard")
+        raw = open(path, mode)
+        if "w" in mode:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL) if "w" in mode else gzip.open(path, mode)
+    return open(path, mode)
+
+
+def integrity_check(path: Path) -> str:
+    """对数据库文件执行 PRAGMA integrity_check，返回结果（正常为 "ok"；无法打开时为错误信息）"""
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = connection.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def verify_backup(path: Path) -> str:
+    """恢复校验：解压（如需要）到临时文件后执行 integrity_check"""
+    path = Path(path)
+    compression = _compression_of(path)
+    if compression == "none":
+        return integrity_check(path)
+    with tempfile.TemporaryDirectory(dir=path.parent) as workdir:
+        restored = Path(workdir) / "restore.db"
+        with _open_compressed(path, compression, "rb") as source, open(restored, "wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        return integrity_check(restored)
+
+
+def _backup_pattern(stem: str) -> "re.Pattern[str]":
+    return re.compile(rf"^{re.escape(stem)}-\d{{8}}-\d{{6}}\.db(\.zst|\.gz)?$")
+
+
+def rotate(directory: Path, stem: str, keep: int) -> List[Path]:
+    """只保留最近 keep 份备份（按文件名中的时间戳），返回删除的文件"""
+    pattern = _backup_pattern(stem)
+    backups = sorted((p for p in directory.iterdir() if pattern.match(p.name)), key=lambda p: p.name, reverse=True)
+    removed = backups[keep:] if keep > 0 else []
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def backup_database(
+    directory: Optional[str] = None,
+    output: Optional[str] = None,
+    compression: Optional[str] = None,
+    keep: int = BACKUP_KEEP,
+    vacuum: bool = False,
+    verify: bool = True,
+    pages: int = snapshots.BACKUP_PAGES,
+    sleep: float = snapshots.BACKUP_SLEEP,
+    database_url: str = SQLALCHEMY_DATABASE_URL,
+) -> Dict[str, object]:
+    """执行一次备份并返回统计信息；output 指定时写到该文件且不做轮换"""
+    source = sqlite_path(database_url)
+    if source is None:
+        raise RuntimeError("在线备份只支持 SQLite 文件数据库")
+    if not os.path.exists(source):
+        raise RuntimeError(f"数据库文件不存在：{source}")
+    compression = compression or default_compression()
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"未知的压缩方式：{compression}")
+
+    if output:
+        target = Path(output).absolute()
+    else:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = Path(directory or BACKUP_DIR).absolute() / f"{Path(source).stem}-{stamp}.db{COMPRESSION_SUFFIXES[compression]}"
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    stats: Dict[str, object] = {"source": source, "target": str(target), "compression": compression}
+    started = time.perf_counter()
+    # 临时文件放在目标目录，最后一步原子改名，不会留下半份备份
+    with tempfile.TemporaryDirectory(dir=target.parent, prefix=".backup-") as workdir:
+        copy = Path(workdir) / "copy.db"
+        snapshots.copy_database(source, str(copy), pages=pages, sleep=sleep)
+        stats["copy_seconds"] = round(time.perf_counter() - started, 2)
+        stats["database_bytes"] = copy.stat().st_size
+
+        if vacuum:
+            compacted = Path(workdir) / "compacted.db"
+            connection = sqlite3.connect(copy)
+            try:
+                connection.execute("VACUUM INTO ?", (str(compacted),))
+            finally:
+                connection.close()
+            copy.unlink()
+            copy = compacted
+            stats["vacuumed_bytes"] = copy.stat().st_size
+
+        result = integrity_check(copy)
+        if result != "ok":
+            raise RuntimeError(f"副本 integrity_check 未通过：{result}")
+
+        staged = Path(workdir) / target.name
+        if compression == "none":
+            copy.rename(staged)
+        else:
+            with open(copy, "rb") as plain, _open_compressed(staged, compression, "wb") as packed:
+                shutil.copyfileobj(plain, packed, 1024 * 1024)
+        stats["backup_bytes"] = staged.stat().st_size
+
+        if verify:
+            result = verify_backup(staged)
+            if result != "ok":
+                raise RuntimeError(f"恢复校验未通过：{result}")
+            stats["verified"] = True
+        os.replace(staged, target)
+
+    if not output:
+        stats["removed"] = [path.name for path in rotate(target.parent, Path(source).stem, keep)]
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def print_report(stats: Dict[str, object]) -> None:
+    size_mb = stats["backup_bytes"] / 1024 / 1024
+    print(f"[backup] {stats['source']} -> {stats['target']}（{stats['compression']}，{size_mb:.1f} MB，用时 {stats['seconds']}s）")
+    if "vacuumed_bytes" in stats:
+        print(f"[backup] VACUUM INTO：{stats['database_bytes']} -> {stats['vacuumed_bytes']} 字节")
+    if stats.get("verified"):
+        print("[backup] 恢复校验通过（integrity_check: ok）")
+    for name in stats.get("removed", []):
+        print(f"[backup] 已删除旧备份 {name}")
@@ -0,0 +1,71 @@
+"""
+为没有 manifest 的封面补生成缩略图：缩略图功能上线前上传的封面，以及生成失败 / 任务丢失的封面。
+
+只处理仍被引用、原图存在的封面；已有 manifest 的跳过，可重复运行。
+
+用法：
+    python -m app.maintenance.build_cover_renditions              # 生成缺少的缩略图
+    python -m app.maintenance.build_cover_renditions --dry-run    # 只列出缺少缩略图的封面
+    python -m app.maintenance.build_cover_renditions --workers 4  # 进程数（默认 STG_IMAGE_WORKERS）
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app import models
+from app.database import SessionLocal
+from app.utils import images
+from app.utils.uploads import upload_path
+
+
+def missing_covers() -> list:
+    """仍被引用、原图存在但还没有 manifest 的封面 URL"""
+    db = SessionLocal()
+    try:
+        urls = [
+            url
+            for (url,) in db.query(models.StoredFile.url)
+            .filter(models.StoredFile.url.like("/static/uploads/covers/%"), models.StoredFile.ref_count > 0)
+            .order_by(models.StoredFile.id)
+        ]
+    finally:
+        db.close()
+    return [
+        url for url in urls
+        if upload_path(url) is not None and upload_path(url).exists() and not images.has_renditions(url)
+    ]
+
+
+def build_cover_renditions(dry_run: bool = False, workers: int = images.IMAGE_WORKERS) -> None:
+    if images.Image is None:
+        print("[images] 未安装 Pillow，跳过")
+        return
+    urls = missing_covers()
+    print(f"[images] {len(urls)} 个封面缺少缩略图（dry_run={dry_run}）。")
+    if dry_run or not urls:
+        for url in urls:
+            print(f"[images] Missing renditions: {url}")
+        return
+
+    started = time.perf_counter()
+    built = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(images.render_cover, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                future.result()
+            except Exception as exc:
+                print(f"[images] 生成失败: {url} ({exc})")
+                continue
+            built += 1
+    print(f"[images] 已为 {built} 个封面生成缩略图，用时 {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="为没有 manifest 的封面补生成缩略图")
+    parser.add_argument("--dry-run", action="store_true", help="只列出，不生成")
+    parser.add_argument("--workers", type=int, default=images.IMAGE_WORKERS, help="生成缩略图的进程数")
+    args = parser.parse_args()
+
+    build_cover_renditions(dry_run=args.dry_run, workers=args.workers)
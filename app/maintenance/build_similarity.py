@@ -0,0 +1,53 @@
+"""
+相似游戏推荐的后台任务：处理 similarity_dirty_games 中待更新的游戏，写入 game_similarity。
+
+用法：
+    python -m app.maintenance.build_similarity                # 增量更新一次（首次运行会全量计算）
+    python -m app.maintenance.build_similarity --full         # 全量重建（建议每天一次，校正全站均值漂移）
+    python -m app.maintenance.build_similarity --watch 300    # 常驻，每 300 秒增量更新一次
+    python -m app.maintenance.build_similarity --watch 300 --full-hours 24   # 同上，并每 24 小时全量重建一次
+
+部署时由 stg_website_similarity.service 以常驻模式运行（随主服务启动 / 停止）。
+"""
+import argparse
+import time
+
+from app.database import SessionLocal
+from app.utils import similarity
+
+
+def build_similarity(full: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if full:
+            count = similarity.rebuild_all(db)
+            print(f"[similarity] 全量重建 {count} 个游戏，用时 {time.perf_counter() - started:.1f}s")
+        else:
+            count = similarity.update_dirty(db)
+            if count:
+                print(f"[similarity] 更新 {count} 个待处理游戏，用时 {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="计算相似游戏推荐")
+    parser.add_argument("--full", action="store_true", help="全量重建")
+    parser.add_argument("--watch", type=float, default=0, help="常驻运行，每隔 N 秒增量更新一次")
+    parser.add_argument("--full-hours", type=float, default=0, help="常驻运行时每隔 N 小时全量重建一次")
+    args = parser.parse_args()
+
+    build_similarity(full=args.full)
+    last_full = time.monotonic()
+    while args.watch > 0:
+        time.sleep(args.watch)
+        full = args.full_hours > 0 and time.monotonic() - last_full >= args.full_hours * 3600
+        try:
+            build_similarity(full=full)
+        except Exception as exc:
+            # 常驻进程不因单次失败（如数据库被锁）退出，下一轮重试
+            print(f"[similarity] 更新失败: {exc}")
+            continue
+        if full:
+            last_full = time.monotonic()
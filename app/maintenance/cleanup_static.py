@@ -1,57 +1,90 @@
+from datetime import datetime, timedelta
+import os
 from pathlib import Path
 import shutil
+from typing import List, Tuple
+
+from sqlalchemy import delete
 
 from app.config.constants import BASE_DIR
 from app import models
 from app.database import SessionLocal
-
-
-def cleanup_covers(dry_run: bool = True) -> None:
+from app.utils.archives import (
+    JOB_TTL_SECONDS,
+    LINK_PREFIX,
+    RELEASE_PREFIX,
+    STAGING_PREFIX,
+    TRASH_PREFIX,
+    release_of,
+    remove_article_dir,
+)
+from app.utils.images import cover_paths
+from app.utils.uploads import upload_path
+
+
+def _move_aside(paths: List[Path]) -> List[Tuple[Path, Path]]:
+    moved = []
+    for path in paths:
+        trash = path.with_name(f".trash-{path.name}")
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            continue
+        moved.append((path, trash))
+    return moved
+
+
+def cleanup_uploads(dry_run: bool = True, grace_hours: int = 1) -> None:
     """
-    清理 /static/uploads/covers 目录下未被数据库引用的封面图片。
+    清理引用计数归零的上传文件（封面 + 文章插图）。
 
-    通过对比文件名是否出现在 Game.image_url / Resource.cover_image 中来判断是否为孤立文件。
-    """
-    covers_dir = BASE_DIR / "app" / "static" / "uploads" / "covers"
-    if not covers_dir.exists():
-        print("[covers] 目录不存在，跳过")
-        return
+    通过 StoredFile.ref_count 索引直接查出孤立文件，无需扫描目录；
+    最近 grace_hours 小时内刚变为 0 的记录暂不删除（例如刚上传、文章尚未保存的插图）。
 
+    每个文件单独一个事务：只删除提交时 ref_count 仍为 0 的记录（期间被重新上传 / 引用的跳过）；
+    提交前先把文件改名移开，提交成功后再删除。并发的重新上传会等本事务提交后才登记，
+    随后发现文件不存在而重新写入，不会出现有记录、没有文件的情况。
+    """
     db = SessionLocal()
     try:
-        used_paths = set()
-
-        # 收集游戏封面
-        for (url,) in db.query(models.Game.image_url).filter(models.Game.image_url.isnot(None)):
-            used_paths.add(url)
-
-        # 收集资源封面
-        for (url,) in db.query(models.Resource.cover_image).filter(models.Resource.cover_image.isnot(None)):
-            used_paths.add(url)
-
-        used_filenames = {
-            Path(p).name
-            for p in used_paths
-            if isinstance(p, str) and p.startswith("/static/uploads/covers/")
-        }
-
-        total = 0
-        deletable = 0
-
-        for file in covers_dir.iterdir():
-            if not file.is_file():
+        cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+        orphans = (
+            db.query(models.StoredFile.id, models.StoredFile.url)
+            .filter(models.StoredFile.ref_count <= 0, models.StoredFile.updated_at < cutoff)
+            .all()
+        )
+        db.rollback()
+
+        removed = 0
+        for file_id, url in orphans:
+            print(f"[uploads] Orphan file: {url}")
+            if dry_run:
                 continue
-            total += 1
-            if file.name not in used_filenames:
-                deletable += 1
-                print(f"[covers] Orphan file: {file}")
-                if not dry_run:
-                    try:
-                        file.unlink()
-                    except Exception as exc:
-                        print(f"[covers] 删除失败: {file} ({exc})")
+            result = db.execute(
+                delete(models.StoredFile).where(models.StoredFile.id == file_id, models.StoredFile.ref_count <= 0)
+            )
+            if result.rowcount != 1:
+                db.rollback()
+                print(f"[uploads] 已被重新引用，跳过: {url}")
+                continue
+            if url.startswith("/static/uploads/covers/"):
+                paths = cover_paths(url)
+            else:
+                paths = [path for path in [upload_path(url)] if path is not None]
+            moved = _move_aside(paths)
+            try:
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                for path, trash in moved:
+                    os.replace(trash, path)
+                print(f"[uploads] 删除失败: {url} ({exc})")
+                continue
+            for _, trash in moved:
+                trash.unlink(missing_ok=True)
+            removed += 1
 
-        print(f"[covers] 共扫描 {total} 个文件，可删除 {deletable} 个孤立封面（dry_run={dry_run}）。")
+        print(f"[uploads] 可删除 {len(orphans)} 个引用归零的上传文件，已删除 {removed} 个（dry_run={dry_run}）。")
     finally:
         db.close()
 
@@ -73,7 +106,8 @@ def cleanup_article_statics(dry_run: bool = True) -> None:
         deletable = 0
 
         for sub in articles_root.iterdir():
-            if not sub.is_dir():
+            # 以 . 开头的是版本目录、解压中的暂存目录与待删除的旧目录
+            if not sub.is_dir() or sub.name.startswith("."):
                 continue
             total += 1
             slug = sub.name
@@ -82,7 +116,8 @@ def cleanup_article_statics(dry_run: bool = True) -> None:
                 print(f"[articles] Orphan static dir: {sub}")
                 if not dry_run:
                     try:
-                        shutil.rmtree(sub)
+                        # 正式目录是符号链接，连同它指向的版本目录一起删除
+                        remove_article_dir(sub)
                     except Exception as exc:
                         print(f"[articles] 删除失败: {sub} ({exc})")
 
@@ -91,9 +126,42 @@ def cleanup_article_statics(dry_run: bool = True) -> None:
         db.close()
 
 
+def cleanup_article_leftovers(dry_run: bool = True, max_age_seconds: int = JOB_TTL_SECONDS) -> None:
+    """
+    清理 /static/articles 下残留的暂存目录（.staging-*）、没有正式目录指向的版本目录（.release-*）、
+    切换用的临时符号链接（.link-*）与切换后未删掉的旧目录（.trash-*）。
+
+    解压中的 worker 被重启 / 回收时会留下这些目录；只删除超过 max_age_seconds 未修改的，
+    不影响正在进行的解压。
+    """
+    articles_root = BASE_DIR / "app" / "static" / "articles"
+    if not articles_root.exists():
+        print("[articles] 目录不存在，跳过")
+        return
+
+    cutoff = datetime.now().timestamp() - max_age_seconds
+    in_use = {release.name for sub in articles_root.iterdir() if (release := release_of(sub)) is not None}
+    leftovers = [
+        sub for sub in articles_root.iterdir()
+        if sub.name.startswith((STAGING_PREFIX, RELEASE_PREFIX, LINK_PREFIX, TRASH_PREFIX))
+        and sub.name not in in_use
+        and sub.lstat().st_mtime < cutoff
+    ]
+    for sub in leftovers:
+        print(f"[articles] Leftover dir: {sub}")
+        if not dry_run:
+            if sub.is_symlink():
+                sub.unlink(missing_ok=True)
+            else:
+                shutil.rmtree(sub, ignore_errors=True)
+
+    print(f"[articles] 可删除 {len(leftovers)} 个残留的暂存 / 旧目录（dry_run={dry_run}）。")
+
+
 if __name__ == "__main__":
     # 默认使用 dry_run 模式，先观察输出结果是否符合预期。
-    cleanup_covers(dry_run=True)
+    cleanup_uploads(dry_run=True)
     cleanup_article_statics(dry_run=True)
+    cleanup_article_leftovers(dry_run=True)
 
 
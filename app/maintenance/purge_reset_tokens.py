@@ -0,0 +1,21 @@
+"""
+分批删除过期的密码重置 token（按 expires_at 索引，每批一个短事务）。
+
+发信线程的 leader 每小时自动执行一次；STG_EMAIL_DISPATCHER=false 时用 cron 每小时运行：
+    python -m app.maintenance.purge_reset_tokens
+"""
+from app.database import SessionLocal
+from app.utils import reset_tokens
+
+
+def purge_reset_tokens() -> None:
+    db = SessionLocal()
+    try:
+        removed = reset_tokens.purge_expired(db)
+        print(f"[reset-tokens] 已删除 {removed} 个过期的密码重置 token。")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    purge_reset_tokens()
@@ -0,0 +1,24 @@
+"""
+从评分表全量重建排行表 game_rankings，并按当前全站均值重新计算贝叶斯分数。
+
+评分写入时排行表已增量更新，全站均值漂移由邮件 outbox 的 leader 每小时校正；
+这里用于手工修改评分数据后修复（STG_EMAIL_DISPATCHER=false 时也可用 cron 每小时运行）。
+
+用法：
+    python -m app.maintenance.rebuild_rankings
+"""
+from app.database import SessionLocal
+from app.utils import rankings
+
+
+def rebuild_rankings() -> None:
+    db = SessionLocal()
+    try:
+        count = rankings.rebuild(db)
+        print(f"[rankings] 已重建 {count} 个游戏的排行数据。")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_rankings()
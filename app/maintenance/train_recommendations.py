@@ -0,0 +1,36 @@
+"""
+训练个性化推荐模型（ALS 协同过滤）并写入 user_recommendations。
+
+建议每天运行一次（例如 cron），训练只占用 CPU，不影响在线请求读取旧结果。
+
+用法：
+    python -m app.maintenance.train_recommendations
+    python -m app.maintenance.train_recommendations --factors 64 --iterations 15 --top-n 20
+"""
+import argparse
+import time
+
+from app.database import SessionLocal
+from app.utils import recommendations
+
+
+def train_recommendations(factors: int, iterations: int, top_n: int) -> None:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        stats = recommendations.train_and_store(db, factors=factors, iterations=iterations, top_n=top_n)
+        print(
+            f"[recommendations] {stats['ratings']} 条评分（{stats['users']} 用户 × {stats['games']} 游戏），"
+            f"写入 {stats['recommendations']} 条推荐，用时 {time.perf_counter() - started:.1f}s"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练个性化推荐模型")
+    parser.add_argument("--factors", type=int, default=recommendations.FACTORS, help="隐向量维度")
+    parser.add_argument("--iterations", type=int, default=recommendations.ITERATIONS, help="ALS 迭代次数")
+    parser.add_argument("--top-n", type=int, default=recommendations.TOP_N, help="每个用户保存的推荐数")
+    args = parser.parse_args()
+    train_recommendations(args.factors, args.iterations, args.top_n)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, Text, DateTime, Boolean, Table, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -29,6 +29,9 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
+    # 登录 token 中携带的版本号（JWT 的 ver）；加一即作废该用户已签发的全部 token。
+    # 重置密码、set_admin.py 修改管理员身份时加一
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     comments = relationship("Comment", back_populates="author")
@@ -43,7 +46,8 @@ class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    token = Column(String, unique=True, nullable=False, index=True)
+    # 只保存 token 的 SHA-256，原始 token 只出现在邮件链接中（见 app/utils/reset_tokens.py）
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
 
     user = relationship("User")
@@ -168,6 +172,93 @@ class DifficultyRating(Base):
     ship_type = relationship("ShipType", back_populates="ratings")
 
 
+# --- 新增：排行榜预计算表 ---
+class GameRanking(Base):
+    """
+    每个游戏一行的评分汇总，在评分写入时增量维护（见 app/utils/rankings.py）。
+    quality_sum / difficulty_sum 为每条评分各维度均值之和，*_score 为贝叶斯平均，
+    排行榜与首页热门直接按 *_score 索引排序，无需对评分表做 GROUP BY。
+    """
+    __tablename__ = "game_rankings"
+
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    quality_count = Column(Integer, default=0, nullable=False)
+    quality_sum = Column(Float, default=0.0, nullable=False)
+    quality_score = Column(Float, nullable=True, index=True)
+    difficulty_count = Column(Integer, default=0, nullable=False)
+    difficulty_sum = Column(Float, default=0.0, nullable=False)
+    difficulty_score = Column(Float, nullable=True, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    game = relationship("Game")
+
+
+class RankingTotals(Base):
+    """
+    全站评分汇总（每种排行一行）：贝叶斯平均的先验「全站均值」= sum / count。
+    与 game_rankings 在同一事务内按相同差值增量更新，评分写入时无需对 game_rankings 求和。
+    """
+    __tablename__ = "ranking_totals"
+
+    kind = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    sum = Column(Float, default=0.0, nullable=False)
+
+
+# --- 新增：相似游戏推荐 ---
+class GameSimilarity(Base):
+    """
+    每个游戏预先计算好的前 K 个相似游戏（见 app/utils/similarity.py），
+    详情页按 (game_id, rank) 直接读取，不做任何实时计算。
+    """
+    __tablename__ = "game_similarity"
+
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    similar_game_id = Column(Integer, ForeignKey("games.id"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+
+
+class SimilarityDirtyGame(Base):
+    """标签或评分发生变化、等待后台任务重新计算相似度的游戏"""
+    __tablename__ = "similarity_dirty_games"
+
+    game_id = Column(Integer, primary_key=True)
+    marked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# --- 新增：个性化推荐 ---
+class UserRecommendation(Base):
+    """离线协同过滤任务为每个用户生成的前 N 个推荐游戏（见 app/utils/recommendations.py）"""
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=False, index=True)
+    score = Column(Float, nullable=False)
+
+
+# --- 新增：待发送邮件（outbox） ---
+class EmailOutbox(Base):
+    """
+    待发送邮件：与业务数据在同一个事务中写入，由后台发信线程（app/utils/outbox.py）批量发送，
+    失败后按指数退避重试，超过次数标记为 failed。
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
 # --- 新增：文章/静态页模型 ---
 class Article(Base):
     __tablename__ = "articles"
@@ -273,3 +364,20 @@ class ResourceVote(Base):
     value = Column(Integer, nullable=False)  # 1 或 -1
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+
+
+# --- 新增：内容寻址的上传文件索引 ---
+class StoredFile(Base):
+    """
+    上传文件索引表：文件按 SHA-256 内容哈希命名，相同内容只存一份。
+    ref_count 记录被多少条业务记录引用；归零后由 cleanup_static 统一删除文件。
+    """
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    url = Column(String, unique=True, nullable=False, index=True)  # /static/uploads/{subdir}/{sha256}{ext}
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -3,7 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from .. import models, database, auth
-from app.config.constants import BASE_DIR
+from app.utils import facets, rankings, similarity
+from app.utils.images import release_cover
 
 router = APIRouter(
     prefix="/admin",  # 所有此文件的路由都以 /admin 开头
@@ -11,10 +12,10 @@ router = APIRouter(
 )
 
 @router.delete("/comment/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_comment_by_admin(
+def delete_comment_by_admin(
     comment_id: int,
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user) # <-- 权限保护
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user) # <-- 权限保护
 ):
     """管理员删除任意评论"""
     comment_to_delete = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
@@ -28,10 +29,10 @@ async def delete_comment_by_admin(
     return
 
 @router.delete("/game/{game_id}", status_code=status.HTTP_200_OK)
-async def delete_game_by_admin(
+def delete_game_by_admin(
     game_id: int,
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user) # <-- 权限保护
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user) # <-- 权限保护
 ):
     """
     管理员删除整个游戏及其所有关联数据（评分、评论、封面文件）。
@@ -42,11 +43,8 @@ async def delete_game_by_admin(
     if not game_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="找不到该游戏")
 
-    # 1. 删除封面图片文件（使用绝对路径）
-    if game_to_delete.image_url:
-        image_file_path = BASE_DIR / "app" / game_to_delete.image_url.lstrip("/static/")
-        if image_file_path.exists():
-            image_file_path.unlink()
+    # 1. 释放封面引用（文件在引用归零后由清理任务删除）
+    release_cover(db, game_to_delete.image_url)
     
     # 2. 删除游戏记录
     # 由于在 Game 模型中设置了 cascade="all, delete-orphan"，
@@ -54,9 +52,12 @@ async def delete_game_by_admin(
     # 我们还需要手动删除 QualityRating 和 DifficultyRating。
     db.query(models.QualityRating).filter(models.QualityRating.game_id == game_id).delete()
     db.query(models.DifficultyRating).filter(models.DifficultyRating.game_id == game_id).delete()
+    rankings.forget_game(db, game_id)
+    similarity.forget_game(db, game_id)
     
     db.delete(game_to_delete)
     db.commit()
+    facets.invalidate()
     
     # 清理无引用的标签（可选：在删除游戏后自动清理）
     # cleanup_orphaned_tags(db)
@@ -64,9 +65,9 @@ async def delete_game_by_admin(
     return {"status": "success", "message": f"游戏 '{game_to_delete.title}' 已被成功删除。"}
 
 @router.post("/cleanup-orphaned-tags", status_code=status.HTTP_200_OK)
-async def cleanup_orphaned_tags_endpoint(
+def cleanup_orphaned_tags_endpoint(
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user)
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user)
 ):
     """
     清理所有无引用的标签（没有任何游戏使用的标签）。
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, Form, HTTPException, status
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload
 from pydantic import BaseModel
 from typing import List, Optional  # <-- 关键修改：导入 List 和 Optional
 from .. import auth, models, database
+from app.utils import rankings, ratelimit, recommendations
 
 router = APIRouter(
     prefix="/api/v1",
@@ -35,29 +38,93 @@ class GameBasicResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LeaderboardEntryResponse(BaseModel):
+    rank: int
+    game_id: int
+    title: str
+    company: str
+    image_url: Optional[str]
+    score: float  # 贝叶斯平均
+    mean: float  # 原始均分
+    rating_count: int
+    realm: Optional[str] = None  # 仅难度排行
+
+class LeaderboardResponse(BaseModel):
+    kind: str
+    total: int
+    items: List[LeaderboardEntryResponse]
+
+class RecommendationResponse(BaseModel):
+    id: int
+    title: str
+    company: str
+    image_url: Optional[str]
+    score: float  # 预测品质分
+
 # --- API 路由 ---
 
 @router.get("/games", response_model=List[GameBasicResponse])
-def get_all_games_for_browse(db: Session = Depends(database.get_db)):
+async def get_all_games_for_browse(db: AsyncSession = Depends(database.get_async_read_db)):
     """
     提供给前端浏览页面异步加载所有游戏数据。
-    使用 selectinload 高效加载关联的别名和标签。
+    使用 selectinload 高效加载关联的别名和标签；异步会话，查询期间不占用线程池；
+    全量导出走只读引擎（副本 / 快照），不与写入争用主库。
     """
-    games = db.query(models.Game).options(
+    games = (await db.execute(select(models.Game).options(
         selectinload(models.Game.aliases),
-        selectinload(models.Game.tags)
-    ).order_by(models.Game.title).all()
+        selectinload(models.Game.tags),
+        raiseload("*")
+    ).order_by(models.Game.title))).scalars().all()
     return games
 
 
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+def get_leaderboard(
+    kind: str = Query("quality", pattern="^(quality|difficulty)$"),
+    tag: Optional[str] = None,
+    company: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(database.get_db)
+):
+    """
+    排行榜：直接读取预计算的 game_rankings（按贝叶斯平均索引排序），
+    可按标签名 / 公司筛选。
+    """
+    total, rows = rankings.leaderboard(db, kind, tag=tag, company=company, limit=limit, offset=offset)
+    items = []
+    for index, (ranking, game) in enumerate(rows):
+        data = rankings.entry(ranking, game, kind)
+        data.pop("game")
+        items.append({"rank": offset + index + 1, **data})
+    return {"kind": kind, "total": total, "items": items}
+
+
+@router.get("/me/recommendations", response_model=List[RecommendationResponse])
+def get_my_recommendations(
+    limit: int = Query(recommendations.TOP_N, ge=1, le=100),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    [API] 当前用户的个性化推荐（离线协同过滤任务预先计算）。
+    尚未训练或用户没有品质评分时返回空列表。
+    """
+    return recommendations.recommendations_for(db, current_user.id, limit=limit)
+
+
 # --- Comment Routes ---
 
-@router.post("/games/{game_id}/comments", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/games/{game_id}/comments",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(ratelimit.limit("comment"))],
+)
 def add_comment_api(
     game_id: int,
     content: str = Form(...),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     [API] 添加评论 (仅限登录用户)
@@ -87,11 +154,11 @@ def add_comment_api(
     }
 
 @router.put("/comments/{comment_id}", status_code=status.HTTP_200_OK)
-async def update_comment_api(
+def update_comment_api(
     comment_id: int,
     comment_data: CommentUpdate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     [API] 更新评论 (仅限评论作者本人)
@@ -119,10 +186,10 @@ async def update_comment_api(
     }
 
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_comment_api(
+def delete_comment_api(
     comment_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     [API] 删除评论 (作者本人或管理员)
@@ -148,7 +215,7 @@ async def delete_comment_api(
 def get_my_ratings(
     game_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     [API] 获取当前用户对指定游戏的评分
@@ -1,140 +1,97 @@
-import os
-import io
-import zipfile
+import re
+import tempfile
 from pathlib import Path
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload
 
 from app import models, database, auth
 from app.config.templates import templates
 from app.config.constants import BASE_DIR
-
-try:
-    import markdown as md
-except ImportError:  # pragma: no cover
-    md = None
-
-try:
-    import bleach
-except ImportError:  # pragma: no cover
-    bleach = None
+from app.utils.archives import ArchiveError, get_job, install_package, start_install_job
+from app.utils.rendering import render_markdown
+from app.utils.uploads import acquire_upload, release_upload, store_upload, stream_to_tempfile
 
 router = APIRouter(tags=["Articles"])
 
 
-def render_markdown(content_md: str) -> str:
-    if not content_md:
-        return ""
-    if md is None:
-        # 最简 fallback，直接转义换行
-        return content_md.replace("\n", "<br>")
-    html = md.markdown(content_md, extensions=["fenced_code", "tables"])
-    if bleach:
-        allowed_tags = list(bleach.sanitizer.ALLOWED_TAGS) + [
-            "p",
-            "pre",
-            "code",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "table",
-            "thead",
-            "tbody",
-            "tr",
-            "th",
-            "td",
-            "img",
-            "figure",
-            "figcaption",
-        ]
-        allowed_attrs = {
-            "*": ["class", "id", "style"],
-            "a": ["href", "title", "target", "rel"],
-            "img": ["src", "alt", "title", "width", "height", "loading", "referrerpolicy"],
-        }
-        html = bleach.clean(html, tags=allowed_tags, attributes=allowed_attrs, strip=True)
-    return html
-
-
 def slugify(value: str) -> str:
     return "".join(ch.lower() if ch.isalnum() else "-" for ch in value).strip("-")
 
 
-def ensure_article_static_dir(slug: str) -> Path:
-    target_dir = BASE_DIR / "app" / "static" / "articles" / slug
-    target_dir.mkdir(parents=True, exist_ok=True)
-    return target_dir
+def article_static_dir(slug: str) -> Path:
+    return BASE_DIR / "app" / "static" / "articles" / slug
 
 
-def ensure_article_upload_dir() -> Path:
-    target_dir = BASE_DIR / "app" / "static" / "uploads" / "articles"
-    target_dir.mkdir(parents=True, exist_ok=True)
-    return target_dir
+def save_static_package(upload: UploadFile) -> Path:
+    """把上传的 zip 流式保存到临时文件（超过 50MB 立即中止），返回临时文件路径"""
+    filename = upload.filename.lower()
+    if not filename.endswith(".zip"):
+        raise HTTPException(status_code=400, detail="仅支持上传 zip 静态包")
+    tmp_path, _, _, _ = stream_to_tempfile(
+        upload,
+        Path(tempfile.gettempdir()),
+        max_size=50 * 1024 * 1024,
+        allowed_kinds=("zip",),
+        limit_label="50MB",
+        type_error="仅支持上传 zip 静态包",
+    )
+    return tmp_path
 
 
 def handle_static_upload(slug: str, upload: Optional[UploadFile]) -> Optional[str]:
+    """
+    同步安装静态包（在线程池中调用）：解压到暂存目录后与旧目录交换。
+    """
     if not upload or not upload.filename:
         return None
-    filename = upload.filename.lower()
-    if not filename.endswith(".zip"):
-        raise HTTPException(status_code=400, detail="仅支持上传 zip 静态包")
-
-    content = upload.file.read()
-    max_size = 50 * 1024 * 1024  # 50MB
-    if len(content) > max_size:
-        raise HTTPException(status_code=400, detail="静态包最大 50MB")
-
-    target_dir = ensure_article_static_dir(slug)
-
-    # 清空旧文件
-    for item in target_dir.iterdir():
-        if item.is_file():
-            item.unlink()
-        else:
-            # 简单递归删除目录
-            for root, dirs, files in os.walk(item, topdown=False):
-                for f in files:
-                    Path(root, f).unlink()
-                for d in dirs:
-                    Path(root, d).rmdir()
-            item.rmdir()
-
-    # 直接从内存解压
-    with zipfile.ZipFile(io.BytesIO(content)) as zf:
-        zf.extractall(target_dir)
+    tmp_path = save_static_package(upload)
+    try:
+        install_package(tmp_path, article_static_dir(slug))
+    except ArchiveError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     # 返回静态路径
     return f"/static/articles/{slug}/"
 
 
-def handle_image_upload(upload: UploadFile) -> str:
-    filename = upload.filename.lower()
-    allowed_ext = [".png", ".jpg", ".jpeg", ".gif", ".webp"]
-    if not any(filename.endswith(ext) for ext in allowed_ext):
-        raise HTTPException(status_code=400, detail="仅支持图片上传")
-    content = upload.file.read()
-    max_size = 10 * 1024 * 1024  # 10MB
-    if len(content) > max_size:
-        raise HTTPException(status_code=400, detail="图片最大 10MB")
-
-    upload_dir = ensure_article_upload_dir()
-    target_name = f"{slugify(Path(filename).stem)}-{os.urandom(4).hex()}{Path(filename).suffix}"
-    target_path = upload_dir / target_name
-    with open(target_path, "wb") as f:
-        f.write(content)
-    # 返回可访问 URL
-    rel = target_path.relative_to(BASE_DIR / "app")
-    return "/" + rel.as_posix()
+def handle_image_upload(db: Session, upload: UploadFile) -> str:
+    # 插图按内容哈希存储；此时还没有文章引用它，引用在文章保存时由 sync_article_uploads 计入
+    url, _ = store_upload(
+        db,
+        upload,
+        "articles",
+        max_size=10 * 1024 * 1024,
+        limit_label="10MB",
+        type_error="仅支持图片上传",
+        acquire=False,
+    )
+    return url
+
+
+ARTICLE_UPLOAD_RE = re.compile(r"/static/uploads/articles/[0-9A-Za-z_.-]+")
+
+
+def sync_article_uploads(db: Session, old_md: Optional[str], new_md: Optional[str]) -> None:
+    """根据正文中引用的插图 URL 的增减，调整对应上传文件的引用计数"""
+    old_urls = set(ARTICLE_UPLOAD_RE.findall(old_md or ""))
+    new_urls = set(ARTICLE_UPLOAD_RE.findall(new_md or ""))
+    for url in new_urls - old_urls:
+        acquire_upload(db, url)
+    for url in old_urls - new_urls:
+        release_upload(db, url)
 
 
 @router.get("/articles", response_class=HTMLResponse)
 def list_articles(request: Request, db: Session = Depends(database.get_db)):
     articles = (
         db.query(models.Article)
+        .options(selectinload(models.Article.author))
         .filter(models.Article.status == "published")
         .order_by(models.Article.created_at.desc())
         .all()
@@ -163,7 +120,7 @@ def article_detail(slug: str, request: Request, db: Session = Depends(database.g
 
 @router.get("/admin/articles/new", response_class=HTMLResponse)
 def new_article_form(
-    request: Request, admin_user: models.User = Depends(auth.get_current_admin_user)
+    request: Request, admin_user: auth.Principal = Depends(auth.get_current_admin_user)
 ):
     return templates.TemplateResponse(
         "article_form.html",
@@ -172,7 +129,7 @@ def new_article_form(
 
 
 @router.post("/admin/articles/new", response_class=HTMLResponse)
-async def create_article(
+def create_article(
     request: Request,
     title: str = Form(...),
     slug: Optional[str] = Form(None),
@@ -180,7 +137,7 @@ async def create_article(
     static_path: Optional[str] = Form(None),
     static_package: UploadFile = File(None),
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
     slug_value = slugify(slug or title)
     if db.query(models.Article).filter(models.Article.slug == slug_value).first():
@@ -201,6 +158,7 @@ async def create_article(
         static_path=final_static_path,
     )
     db.add(article)
+    sync_article_uploads(db, None, article.content_md)
     db.commit()
     return RedirectResponse(url=f"/article/{slug_value}", status_code=303)
 
@@ -210,7 +168,7 @@ def edit_article_form(
     article_id: int,
     request: Request,
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
     if not article:
@@ -222,7 +180,7 @@ def edit_article_form(
 
 
 @router.post("/admin/articles/{article_id}/edit", response_class=HTMLResponse)
-async def update_article(
+def update_article(
     article_id: int,
     request: Request,
     title: str = Form(...),
@@ -230,13 +188,14 @@ async def update_article(
     static_path: Optional[str] = Form(None),
     static_package: UploadFile = File(None),
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
     if not article:
         raise HTTPException(status_code=404, detail="文章不存在")
 
     article.title = title
+    sync_article_uploads(db, article.content_md, content_md)
     article.content_md = content_md or ""
     article.content_html = render_markdown(article.content_md)
 
@@ -253,11 +212,12 @@ async def update_article(
 def delete_article(
     article_id: int,
     db: Session = Depends(database.get_db),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
     if not article:
         raise HTTPException(status_code=404, detail="文章不存在")
+    sync_article_uploads(db, article.content_md, None)
     db.delete(article)
     db.commit()
     return RedirectResponse(url="/articles", status_code=303)
@@ -265,30 +225,56 @@ def delete_article(
 
 @router.post("/admin/articles/preview")
 async def preview_markdown(
+    request: Request,
     content_md: str = Form(""),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
-    html = render_markdown(content_md)
+    # 前端发起新的预览时会中止旧请求；已断开的请求不再渲染
+    if await request.is_disconnected():
+        return JSONResponse({"html": ""}, status_code=499)
+    html = await run_in_threadpool(render_markdown, content_md)
     return {"html": html}
 
 
 @router.post("/admin/articles/upload_image")
-async def upload_image(
+def upload_image(
     file: UploadFile = File(...),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    db: Session = Depends(database.get_db),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
-    url = handle_image_upload(file)
+    url = handle_image_upload(db, file)
+    db.commit()
     return JSONResponse({"url": url})
 
 
 @router.post("/admin/articles/upload_static")
-async def upload_static(
+def upload_static(
     slug: str = Form(...),
     static_package: UploadFile = File(...),
-    admin_user: models.User = Depends(auth.get_current_admin_user),
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
+):
+    """
+    上传静态包并在后台线程中解压，立即返回任务 ID；
+    前端通过 GET /admin/articles/upload_static/{job_id} 轮询解压进度。
+    """
+    slug_value = slugify(slug)
+    if not static_package.filename:
+        raise HTTPException(status_code=400, detail="请选择静态包")
+    tmp_path = save_static_package(static_package)
+    static_path = f"/static/articles/{slug_value}/"
+    job_id = start_install_job(tmp_path, article_static_dir(slug_value), {"static_path": static_path})
+    return JSONResponse({"job_id": job_id, "static_path": static_path})
+
+
+@router.get("/admin/articles/upload_static/{job_id}")
+def upload_static_status(
+    job_id: str,
+    admin_user: auth.Principal = Depends(auth.get_current_admin_user),
 ):
-    static_path = handle_static_upload(slugify(slug), static_package)
-    return JSONResponse({"static_path": static_path})
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return JSONResponse(job)
 
 
 @router.get("/article/{slug}/static")
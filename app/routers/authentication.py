@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from .. import auth, models, schemas, database
 from app.config.templates import templates  # 直接从模板配置导入
+from app.utils import ratelimit
 
 router = APIRouter(
     tags=["Authentication"] # 在API文档中分组
@@ -14,7 +15,7 @@ def get_register_form(request: Request):
     """显示注册表单页面"""
     return templates.TemplateResponse("register.html", {"request": request})
 
-@router.post("/register")
+@router.post("/register", dependencies=[Depends(ratelimit.limit("register"))])
 def register_user(
     username: str = Form(...),
     email: str = Form(...),
@@ -38,7 +39,7 @@ def get_login_form(request: Request):
     """显示登录表单页面"""
     return templates.TemplateResponse("login.html", {"request": request})
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(ratelimit.limit("login"))])
 def login_user(
     request: Request,  # 添加 request 参数
     username: str = Form(...),
@@ -49,22 +50,19 @@ def login_user(
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
-    access_token = auth.create_access_token(data={"sub": user.username})
+    access_token = auth.create_access_token(data=auth.token_claims(user))
     
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True, samesite='lax')
-    
-    # 设置会话用户ID
-    request.session["user_id"] = user.id
-    
+    response.set_cookie(
+        key="access_token", value=f"Bearer {access_token}", httponly=True, samesite='lax', secure=auth.HTTPS_ONLY
+    )
     return response
 
 @router.get("/logout")
 def logout_user(request: Request):  # 添加 request 参数
-    """处理用户登出逻辑，删除Cookie和会话"""
-    # 清除会话
-    request.session.clear()
-    
+    """处理用户登出逻辑，删除Cookie"""
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
     response.delete_cookie(key="access_token")
+    # 旧版本写入的会话 Cookie（已不再使用）一并删除
+    response.delete_cookie(key="session_id")
     return response
\ No newline at end of file
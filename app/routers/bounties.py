@@ -56,7 +56,7 @@ def list_bounties(
 def new_bounty_form(
     request: Request,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """创建悬赏表单"""
     categories = db.query(models.BountyCategory).order_by(models.BountyCategory.name).all()
@@ -78,7 +78,7 @@ def create_bounty(
     contact_info: str = Form(None),
     tags: str = Form(""),  # 以 |~| 分隔的标签字符串
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """提交新悬赏"""
     # 验证板块是否存在
@@ -149,7 +149,7 @@ def edit_bounty_form(
     bounty_id: int,
     request: Request,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """编辑悬赏表单"""
     bounty = db.query(models.Bounty).options(
@@ -184,7 +184,7 @@ def update_bounty(
     contact_info: str = Form(None),
     tags: str = Form(""),  # 以 |~| 分隔的标签字符串
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """更新悬赏"""
     bounty = db.query(models.Bounty).options(
@@ -230,7 +230,7 @@ def update_bounty(
 def complete_bounty(
     bounty_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """标记悬赏为已完成"""
     bounty = db.query(models.Bounty).filter(models.Bounty.id == bounty_id).first()
@@ -255,7 +255,7 @@ def add_bounty_comment(
     bounty_id: int,
     content: str = Form(...),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """添加悬赏评论"""
     bounty = db.query(models.Bounty).filter(models.Bounty.id == bounty_id).first()
@@ -281,7 +281,7 @@ def add_bounty_comment(
 def delete_bounty(
     bounty_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """删除悬赏"""
     bounty = db.query(models.Bounty).filter(models.Bounty.id == bounty_id).first()
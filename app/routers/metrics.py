@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app import auth
+from app.utils import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def _is_local_request(request: Request) -> bool:
+    """
+    直接来自本机的请求（如同机的 Prometheus 抓取）。
+    经 Caddy 反向代理的请求同样来自 127.0.0.1，但会带有 X-Forwarded-For，不算本机请求。
+    """
+    client_host = request.client.host if request.client else None
+    return client_host in LOOPBACK_HOSTS and "x-forwarded-for" not in request.headers
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics(request: Request):
+    """Prometheus 抓取入口：仅允许本机直连或管理员访问"""
+    if not _is_local_request(request):
+        token = await auth.cookie_auth(request)
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="需要管理员身份")
+        principal = await auth.get_current_user(token=token)
+        await auth.get_current_admin_user(current_user=principal)
+
+    result = metrics.render_latest()
+    if result is None:
+        raise HTTPException(status_code=404, detail="未安装 prometheus_client，指标不可用")
+    content, content_type = result
+    return Response(content=content, media_type=content_type)
@@ -1,16 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, status, File, UploadFile
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
+from sqlalchemy import func, select
 from typing import Dict, Any
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from .. import models, database, auth
 from app.config.templates import templates
-from app.config.constants import BASE_DIR, MAX_TAGS_DISPLAY
-from app.utils.ratings import get_game_evaluation
-from pathlib import Path
-import secrets
-import shutil
-import io
+from app.config.constants import MAX_TAGS_DISPLAY
+from app.utils import facets, rating_engine, rankings, recommendations, similarity
+from app.utils.ratings import get_difficulty_realm
+from app.utils.images import save_cover, release_cover, discard_cover
 
 router = APIRouter(
     tags=["Pages"]
@@ -52,47 +52,16 @@ def read_root(request: Request, db: Session = Depends(database.get_db)):
         selectinload(models.Game.tags)
     ).order_by(models.Game.id.desc()).limit(6).all()
     
-    # 热门游戏：基于品质评分，至少需要3条评分
-    from ..models import game_tag_association
-    games_with_ratings = db.query(
-        models.Game.id,
-        func.count(models.QualityRating.id).label('rating_count'),
-        func.avg(
-            (models.QualityRating.fun + 
-             models.QualityRating.core + 
-             models.QualityRating.depth + 
-             models.QualityRating.performance + 
-             models.QualityRating.story) / 5.0
-        ).label('avg_score')
-    ).join(
-        models.QualityRating, models.Game.id == models.QualityRating.game_id
-    ).group_by(
-        models.Game.id
-    ).having(
-        func.count(models.QualityRating.id) >= 3
-    ).order_by(
-        func.avg(
-            (models.QualityRating.fun + 
-             models.QualityRating.core + 
-             models.QualityRating.depth + 
-             models.QualityRating.performance + 
-             models.QualityRating.story) / 5.0
-        ).desc()
-    ).limit(8).all()
-    
-    # 处理热门游戏数据，添加评分信息，并加载tags关系
-    popular_games = []
-    for game_id, rating_count, avg_score in games_with_ratings:
-        game = db.query(models.Game).options(
-            selectinload(models.Game.tags)
-        ).filter(models.Game.id == game_id).first()
-        if game:
-            game_data = {
-                'game': game,
-                'rating_count': rating_count,
-                'avg_score': round(float(avg_score), 2) if avg_score else 0.0
-            }
-            popular_games.append(game_data)
+    # 热门游戏：直接读取预计算的排行表（品质贝叶斯平均），至少需要 MIN_RATINGS 条评分
+    _, top_rankings = rankings.leaderboard(db, "quality", limit=8)
+    popular_games = [
+        {
+            'game': game,
+            'rating_count': ranking.quality_count,
+            'avg_score': round(ranking.quality_sum / ranking.quality_count, 2) if ranking.quality_count else 0.0
+        }
+        for ranking, game in top_rankings
+    ]
     
     # 平台统计数据
     total_games = db.query(func.count(models.Game.id)).scalar() or 0
@@ -101,20 +70,8 @@ def read_root(request: Request, db: Session = Depends(database.get_db)):
     total_ratings = total_quality_ratings + total_difficulty_ratings
     total_users = db.query(func.count(models.User.id)).scalar() or 0
     
-    # 热门标签（使用频率最高的标签）
-    tags_with_count = db.query(
-        models.Tag,
-        func.count(game_tag_association.c.game_id).label('game_count')
-    ).outerjoin(
-        game_tag_association, models.Tag.id == game_tag_association.c.tag_id
-    ).group_by(models.Tag.id).having(
-        func.count(game_tag_association.c.game_id) > 0
-    ).order_by(
-        func.count(game_tag_association.c.game_id).desc(),
-        models.Tag.name
-    ).limit(15).all()
-    
-    popular_tags = [{"tag": tag, "count": count} for tag, count in tags_with_count]
+    # 热门标签（使用频率最高的标签，来自分面索引）
+    popular_tags = facets.get_index(db).tag_counts(limit=15)
     
     # 最近评论（可选，增加动态感）
     recent_comments = db.query(models.Comment).options(
@@ -134,9 +91,9 @@ def read_root(request: Request, db: Session = Depends(database.get_db)):
     })
 
 @router.get("/games", response_class=HTMLResponse)
-def browse_games(
+async def browse_games(
     request: Request, 
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     tag: str = None,  # 单个标签（向后兼容）
     tags: str = None,  # 多个标签，用逗号分隔
     company: str = None,  # 公司筛选
@@ -158,72 +115,47 @@ def browse_games(
         # 单个标签（向后兼容）
         active_tags = [tag]
     
-    # 构建基础查询
-    query = db.query(models.Game).options(selectinload(models.Game.tags))
-    
-    # 多标签筛选：游戏必须包含所有指定的标签
-    if active_tags:
-        # 使用子查询找到包含所有标签的游戏ID
-        from ..models import game_tag_association
-        tag_ids = db.query(models.Tag.id).filter(models.Tag.name.in_(active_tags)).all()
-        tag_ids = [tid[0] for tid in tag_ids]
-        
-        if tag_ids:
-            # 对每个标签，找到包含该标签的游戏ID集合
-            game_id_sets = []
-            for tid in tag_ids:
-                game_ids = db.query(game_tag_association.c.game_id).filter(
-                    game_tag_association.c.tag_id == tid
-                ).distinct().all()
-                game_id_sets.append({gid[0] for gid in game_ids})
-            
-            # 找到所有集合的交集（包含所有标签的游戏）
-            if game_id_sets:
-                common_game_ids = set.intersection(*game_id_sets)
-                query = query.filter(models.Game.id.in_(common_game_ids))
+    # 构建基础查询（异步会话：模板用到的关系在这里 selectinload，其余关系不加载）
+    query = select(models.Game).options(
+        selectinload(models.Game.tags),
+        selectinload(models.Game.aliases),
+        raiseload("*"),
+    )
+    # 索引过期时需要重建（全表查询 + 构建位图），在线程池中执行，不阻塞事件循环
+    index = await run_in_threadpool(facets.get_index)
+    
+    # 多标签筛选：游戏必须包含所有指定的标签（在分面索引中对位图求交）
+    known_tags = [name for name in active_tags if name in index.tags]
+    if known_tags:
+        query = query.filter(models.Game.id.in_(index.ids(index.matching(known_tags))))
 
     # 公司筛选
     if company:
         query = query.filter(models.Game.company == company)
-    
-    # 排序
-    query = query.order_by(models.Game.title)
 
     # 获取总数（在应用分页之前）
-    total_count = query.count()
+    total_count = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
     
-    # 分页查询
-    games = query.offset((page - 1) * per_page).limit(per_page).all()
+    # 排序、分页查询
+    games = (await db.execute(
+        query.order_by(models.Game.title).offset((page - 1) * per_page).limit(per_page)
+    )).scalars().all()
     
     # 计算总页数
     total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 1
     
-    # 查询所有的公司和标签用于前端筛选按钮
-    companies = [c[0] for c in db.query(models.Game.company).distinct().order_by(models.Game.company).all()]
-    
-    # 优化：查询标签并计算每个标签的使用数量，按使用频率降序排序
-    # 限制显示数量，只显示最常用的标签（由 MAX_TAGS_DISPLAY 配置）
-    from sqlalchemy import func
-    from ..models import game_tag_association
-    tags_with_count = db.query(
-        models.Tag,
-        func.count(game_tag_association.c.game_id).label('game_count')
-    ).outerjoin(
-        game_tag_association, models.Tag.id == game_tag_association.c.tag_id
-    ).group_by(models.Tag.id).having(
-        func.count(game_tag_association.c.game_id) > 0
-    ).order_by(
-        func.count(game_tag_association.c.game_id).desc(),
-        models.Tag.name
-    ).limit(MAX_TAGS_DISPLAY).all()
-    
-    # 构建标签列表，包含标签对象和使用数量
-    all_tags = [{"tag": tag, "count": count} for tag, count in tags_with_count]
+    # 筛选按钮及下钻计数（来自分面索引）：
+    # - 标签按全站使用频率取前 MAX_TAGS_DISPLAY 个，计数为「当前筛选结果中带有该标签」的游戏数
+    # - 公司计数为「当前标签筛选下属于该公司」的游戏数（选择公司会替换当前公司）
+    companies = index.companies
+    all_tags = index.tag_counts(index.matching(known_tags, company), limit=MAX_TAGS_DISPLAY)
+    company_counts = index.company_counts(index.matching(known_tags))
 
     return templates.TemplateResponse("browse_games.html", {
         "request": request,
         "games": games,
         "companies": companies,
+        "company_counts": company_counts,
         "all_tags": all_tags,
         "active_tags": active_tags,  # 当前激活的标签列表
         "current_company": company,  # 当前筛选的公司
@@ -233,76 +165,89 @@ def browse_games(
         "total_pages": total_pages
     })
 
+@router.get("/leaderboard", response_class=HTMLResponse)
+def leaderboard_page(
+    request: Request,
+    db: Session = Depends(database.get_db),
+    kind: str = "quality",
+    tag: str = None,
+    company: str = None,
+    page: int = 1,
+    per_page: int = 50
+):
+    """排行榜：按品质 / 难度的贝叶斯平均排序，可按标签和公司筛选"""
+    if kind not in rankings.KINDS:
+        raise HTTPException(status_code=400, detail="未知的排行类型")
+    page = max(1, page)
+    per_page = max(1, min(100, per_page))
+
+    total_count, rows = rankings.leaderboard(
+        db, kind, tag=tag or None, company=company or None,
+        limit=per_page, offset=(page - 1) * per_page
+    )
+    entries = [rankings.entry(ranking, game, kind) for ranking, game in rows]
+    total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 1
+
+    index = facets.get_index(db)
+    companies = index.companies
+    tag_names = [item["tag"].name for item in index.tag_counts(limit=MAX_TAGS_DISPLAY)]
+
+    return templates.TemplateResponse("leaderboard.html", {
+        "request": request,
+        "entries": entries,
+        "kind": kind,
+        "current_tag": tag or "",
+        "current_company": company or "",
+        "companies": companies,
+        "tag_names": tag_names,
+        "min_ratings": rankings.MIN_RATINGS,
+        "page": page,
+        "per_page": per_page,
+        "total_count": total_count,
+        "total_pages": total_pages,
+        "rank_offset": (page - 1) * per_page
+    })
+
 @router.get("/stats", response_class=HTMLResponse)
 def difficulty_stats(
     request: Request,
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
     """难度评分统计页面"""
-    from app.utils.ratings import get_difficulty_realm
-    
-    # 获取所有游戏及其难度评分
+    # 评分按列一次取回，按 (游戏, 难度等级, 机体) 向量化分组聚合
+    contexts_by_game = rating_engine.difficulty_context_stats(rating_engine.fetch_difficulty_rows(db))
     games = db.query(models.Game).options(
-        selectinload(models.Game.difficulty_ratings),
-        selectinload(models.Game.difficulty_levels),
-        selectinload(models.Game.ship_types),
         selectinload(models.Game.tags)
-    ).order_by(models.Game.title).all()
-    
+    ).filter(models.Game.id.in_(list(contexts_by_game))).order_by(models.Game.title).all() if contexts_by_game else []
+    level_names = dict(db.query(models.DifficultyLevel.id, models.DifficultyLevel.name).all())
+    ship_names = dict(db.query(models.ShipType.id, models.ShipType.name).all())
+
     # 构建统计数据
     stats_data = []
     for game in games:
-        # 按情境分组计算
-        from itertools import groupby
-        sort_key = lambda r: (r.difficulty_level_id or 0, r.ship_type_id or 0)
-        
-        for context_ids, ratings_iter in groupby(sorted(game.difficulty_ratings, key=sort_key), key=sort_key):
-            diff_id, ship_id = context_ids
-            ratings = list(ratings_iter)
-            
-            if not ratings:
-                continue
-            
-            # 计算平均分
-            dodge_scores = [r.dodge for r in ratings if r.dodge is not None]
-            strategy_scores = [r.strategy for r in ratings if r.strategy is not None]
-            execution_scores = [r.execution for r in ratings if r.execution is not None]
-            
-            dodge_avg = sum(dodge_scores) / len(dodge_scores) if dodge_scores else 0
-            strategy_avg = sum(strategy_scores) / len(strategy_scores) if strategy_scores else 0
-            execution_avg = sum(execution_scores) / len(execution_scores) if execution_scores else 0
-            
-            valid_dims = sum(1 for scores in [dodge_scores, strategy_scores, execution_scores] if scores)
+        tags = [t.name for t in game.tags]
+        for context in contexts_by_game[game.id]:
+            diff_id = context["difficulty_level_id"]
+            ship_id = context["ship_type_id"]
+            dodge_avg, strategy_avg, execution_avg = context["averages"]
+            valid_dims = sum(1 for count in context["counts"] if count)
             overall_avg = (dodge_avg + strategy_avg + execution_avg) / valid_dims if valid_dims > 0 else 0
-            
-            # 获取难度等级和机体名称
-            difficulty_level_name = "游戏总体"
-            if diff_id:
-                diff_level = next((dl for dl in game.difficulty_levels if dl.id == diff_id), None)
-                if diff_level:
-                    difficulty_level_name = diff_level.name
-            
-            ship_type_name = "全机体/角色"
-            if ship_id:
-                ship = next((s for s in game.ship_types if s.id == ship_id), None)
-                if ship:
-                    ship_type_name = ship.name
-            
+
             stats_data.append({
                 "game_id": game.id,
                 "game_title": game.title,
                 "game_company": game.company,
-                "tags": [t.name for t in game.tags],
-                "difficulty_level_id": diff_id or 0,
-                "difficulty_level_name": difficulty_level_name,
-                "ship_type_id": ship_id or 0,
-                "ship_type_name": ship_type_name,
+                "tags": tags,
+                "difficulty_level_id": diff_id,
+                "difficulty_level_name": level_names.get(diff_id, "游戏总体") if diff_id else "游戏总体",
+                "ship_type_id": ship_id,
+                "ship_type_name": ship_names.get(ship_id, "全机体/角色") if ship_id else "全机体/角色",
                 "dodge_avg": round(dodge_avg, 2),
                 "strategy_avg": round(strategy_avg, 2),
                 "execution_avg": round(execution_avg, 2),
                 "overall_avg": round(overall_avg, 2),
                 "realm": get_difficulty_realm(overall_avg),
-                "rating_count": len(ratings)
+                "rating_count": context["rating_count"]
             })
     
     # 获取所有游戏、难度等级、机体类型用于筛选
@@ -325,34 +270,37 @@ def difficulty_stats(
     })
 
 @router.get("/game/{game_id}", response_class=HTMLResponse)
-def read_game(request: Request, game_id: int, db: Session = Depends(database.get_db)):
+async def read_game(request: Request, game_id: int, db: AsyncSession = Depends(database.get_async_db)):
     """
     显示游戏详情页。
     使用 selectinload 优化查询，这是比 joinedload 更好的选择对于多个"to-many"关系。
+    使用异步会话：查询期间不占用线程池，高并发下吞吐更高。
     """
-    game = db.query(models.Game).options(
+    game = (await db.execute(select(models.Game).options(
         selectinload(models.Game.comments),
         selectinload(models.Game.tags),
         selectinload(models.Game.aliases),
         selectinload(models.Game.translations),
         selectinload(models.Game.difficulty_levels),
-        selectinload(models.Game.ship_types),
-        selectinload(models.Game.quality_ratings),
-        selectinload(models.Game.difficulty_ratings)
-    ).filter(models.Game.id == game_id).first()
+        selectinload(models.Game.ship_types)
+    ).filter(models.Game.id == game_id))).scalars().first()
 
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    evaluation = get_game_evaluation(game)
+    # 评分不再整行加载为 ORM 对象，由评分引擎按列聚合
+    evaluation = await db.run_sync(rating_engine.evaluate_game, game)
+
+    # 相似游戏由后台任务预先计算，这里只读取
+    similar_games = await db.run_sync(similarity.similar_games, game_id)
     
     # 获取当前用户的评分（如果已登录）
     user_ratings = {"quality": None, "difficulty": {}}
     if request.state.user:
         # 获取用户的品质评分
-        user_quality_rating = db.query(models.QualityRating).filter_by(
+        user_quality_rating = (await db.execute(select(models.QualityRating).filter_by(
             game_id=game_id, user_id=request.state.user.id
-        ).first()
+        ))).scalars().first()
         if user_quality_rating:
             user_ratings['quality'] = {
                 'fun': user_quality_rating.fun,
@@ -363,9 +311,9 @@ def read_game(request: Request, game_id: int, db: Session = Depends(database.get
             }
         
         # 获取用户的所有难度评分（按情境分组）
-        user_difficulty_ratings = db.query(models.DifficultyRating).filter_by(
+        user_difficulty_ratings = (await db.execute(select(models.DifficultyRating).filter_by(
             game_id=game_id, user_id=request.state.user.id
-        ).all()
+        ))).scalars().all()
         if user_difficulty_ratings:
             user_ratings['difficulty'] = {}
             for rating in user_difficulty_ratings:
@@ -382,7 +330,8 @@ def read_game(request: Request, game_id: int, db: Session = Depends(database.get
         "request": request, 
         "game": game, 
         "evaluation": evaluation,
-        "user_ratings": user_ratings
+        "user_ratings": user_ratings,
+        "similar_games": similar_games
     })
 
 @router.get("/add-game", response_class=HTMLResponse)
@@ -391,9 +340,9 @@ async def show_add_game_form(request: Request):
     return templates.TemplateResponse("add_game.html", {"request": request})
 
 @router.post("/add-game", response_class=RedirectResponse)
-async def add_game(
+def add_game(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     company: str = Form(...),
     title: str = Form(...),
     description: str = Form(""),
@@ -407,31 +356,7 @@ async def add_game(
     """处理添加新游戏的表单提交"""
     image_path_to_db = None
     if image_file and image_file.filename:
-        # 读取文件内容以检查大小
-        contents = await image_file.read()
-        file_size = len(contents)
-        if file_size > 1 * 1024 * 1024: 
-            raise HTTPException(status_code=413, detail="图片文件大小不能超过 1MB")
-        if image_file.content_type not in ["image/jpeg", "image/png", "image/gif", "image/webp"]: 
-            raise HTTPException(status_code=400, detail="只支持上传 JPG, PNG, GIF, WebP 格式的图片")
-        # 使用绝对路径
-        upload_dir = BASE_DIR / "app" / "static" / "uploads" / "covers"
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        token = secrets.token_hex(16)
-        file_extension = Path(image_file.filename).suffix
-        # 如果文件没有扩展名，根据content_type添加
-        if not file_extension:
-            content_type_map = {
-                "image/jpeg": ".jpg",
-                "image/png": ".png",
-                "image/gif": ".gif",
-                "image/webp": ".webp"
-            }
-            file_extension = content_type_map.get(image_file.content_type, ".jpg")
-        save_path = upload_dir / f"{token}{file_extension}"
-        with open(save_path, "wb") as buffer:
-            buffer.write(contents)
-        image_path_to_db = f"/static/uploads/covers/{token}{file_extension}"
+        image_path_to_db = save_cover(db, image_file)
 
     try:
         new_game = models.Game(company=company, title=title, description=description, image_url=image_path_to_db, created_by=current_user.id)
@@ -441,20 +366,19 @@ async def add_game(
         process_one_to_many(db, new_game, difficulty_levels, models.DifficultyLevel, "difficulty_levels")
         process_one_to_many(db, new_game, ship_types, models.ShipType, "ship_types")
         db.add(new_game)
+        db.flush()
+        similarity.mark_dirty(db, new_game.id)
         db.commit()
         db.refresh(new_game)
+        facets.invalidate()
         return RedirectResponse(url=f"/game/{new_game.id}", status_code=status.HTTP_303_SEE_OTHER)
     except Exception as e:
         db.rollback()
-        # 使用绝对路径删除图片
-        if image_path_to_db:
-            image_file_path = BASE_DIR / "app" / image_path_to_db.lstrip("/static/")
-            if image_file_path.exists():
-                image_file_path.unlink()
+        discard_cover(db, image_path_to_db)
         raise HTTPException(status_code=500, detail=f"创建游戏失败: {e}")
 
 @router.get("/game/{game_id}/edit", response_class=HTMLResponse)
-async def show_edit_game_form(request: Request, game_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def show_edit_game_form(request: Request, game_id: int, db: Session = Depends(database.get_db), current_user: auth.Principal = Depends(auth.get_current_user)):
     """显示编辑游戏资料的表单页面（创建者或管理员）"""
     game = db.query(models.Game).filter(models.Game.id == game_id).first()
     if not game: raise HTTPException(status_code=404, detail="Game not found")
@@ -467,10 +391,10 @@ async def show_edit_game_form(request: Request, game_id: int, db: Session = Depe
     return templates.TemplateResponse("edit_game.html", {"request": request, "game": game})
 
 @router.post("/game/{game_id}/update", response_class=RedirectResponse)
-async def update_game(
+def update_game(
     game_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     company: str = Form(...),
     title: str = Form(...),
     description: str = Form(""),
@@ -492,37 +416,9 @@ async def update_game(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="没有权限编辑该游戏")
 
     if image_file and image_file.filename:
-        # 读取文件内容以检查大小
-        contents = await image_file.read()
-        file_size = len(contents)
-        if file_size > 1 * 1024 * 1024: 
-            raise HTTPException(status_code=413, detail="图片大小不能超过 1MB")
-        if image_file.content_type not in ["image/jpeg", "image/png", "image/gif", "image/webp"]: 
-            raise HTTPException(status_code=400, detail="只支持 JPG, PNG, GIF, WebP 图片")
         old_image_path_str = game_to_update.image_url
-        # 使用绝对路径
-        upload_dir = BASE_DIR / "app" / "static" / "uploads" / "covers"
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        token = secrets.token_hex(16)
-        file_extension = Path(image_file.filename).suffix
-        # 如果文件没有扩展名，根据content_type添加
-        if not file_extension:
-            content_type_map = {
-                "image/jpeg": ".jpg",
-                "image/png": ".png",
-                "image/gif": ".gif",
-                "image/webp": ".webp"
-            }
-            file_extension = content_type_map.get(image_file.content_type, ".jpg")
-        new_save_path = upload_dir / f"{token}{file_extension}"
-        with open(new_save_path, "wb") as buffer:
-            buffer.write(contents)
-        game_to_update.image_url = f"/static/uploads/covers/{token}{file_extension}"
-        # 使用绝对路径删除旧图片
-        if old_image_path_str:
-            old_image_file_path = BASE_DIR / "app" / old_image_path_str.lstrip("/static/")
-            if old_image_file_path.exists():
-                old_image_file_path.unlink()
+        game_to_update.image_url = save_cover(db, image_file)
+        release_cover(db, old_image_path_str)
 
     game_to_update.company, game_to_update.title, game_to_update.description = company, title, description
     process_tags(db, game_to_update, tags)
@@ -530,7 +426,9 @@ async def update_game(
     process_one_to_many(db, game_to_update, aliases, models.Alias, "aliases")
     process_one_to_many(db, game_to_update, difficulty_levels, models.DifficultyLevel, "difficulty_levels")
     process_one_to_many(db, game_to_update, ship_types, models.ShipType, "ship_types")
+    similarity.mark_dirty(db, game_id)
     db.commit()
+    facets.invalidate()
     return RedirectResponse(url=f"/game/{game_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/user/{user_id}", response_class=HTMLResponse)
@@ -600,6 +498,11 @@ def user_profile(
                 valid_count += 1
         if valid_count > 0:
             avg_difficulty_score = round(total_difficulty / valid_count, 2)
+
+    # 个性化推荐只展示给用户本人（由离线任务预先计算）
+    recommended_games = []
+    if request.state.user and request.state.user.id == user_id:
+        recommended_games = recommendations.recommendations_for(db, user_id)
     
     return templates.TemplateResponse("user_profile.html", {
         "request": request,
@@ -615,5 +518,6 @@ def user_profile(
         "quality_per_page": quality_per_page,
         "difficulty_per_page": difficulty_per_page,
         "quality_total_pages": quality_total_pages,
-        "difficulty_total_pages": difficulty_total_pages
+        "difficulty_total_pages": difficulty_total_pages,
+        "recommended_games": recommended_games
     })
\ No newline at end of file
@@ -1,5 +1,4 @@
-import secrets
-from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
@@ -7,16 +6,12 @@ from sqlalchemy.orm import Session
 
 from app import database, models
 from app.config.templates import templates
-from app.email_utils import send_password_reset_email
+from app.email_utils import queue_password_reset_email
+from app.utils import outbox, ratelimit, reset_tokens, token_versions
 
 router = APIRouter(tags=["PasswordReset"])
 
 
-def _now_utc() -> datetime:
-    # 使用 naive UTC 时间，避免与数据库返回的 naive datetime 比较时报错
-    return datetime.utcnow()
-
-
 @router.get("/password-reset-request")
 def get_password_reset_request_form(request: Request):
     """显示输入邮箱的密码重置请求页面"""
@@ -26,8 +21,8 @@ def get_password_reset_request_form(request: Request):
     )
 
 
-@router.post("/password-reset/request")
-async def request_password_reset(
+@router.post("/password-reset/request", dependencies=[Depends(ratelimit.limit("password_reset"))])
+def request_password_reset(
     request: Request,
     email: str = Form(...),
     db: Session = Depends(database.get_db),
@@ -35,24 +30,10 @@ async def request_password_reset(
     """
     处理用户提交邮箱的密码重置请求。
     无论邮箱是否存在，都返回统一的提示，避免泄露用户信息。
+    邮件与 token 在同一个事务中写入 outbox，由后台发信线程发送，请求不等待 SMTP。
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
-
-    if user:
-        # 为该用户创建一次性 token（有效期 30 分钟）
-        token = secrets.token_urlsafe(32)
-        expires_at = _now_utc() + timedelta(minutes=30)
-
-        reset_token = models.PasswordResetToken(
-            user_id=user.id,
-            token=token,
-            expires_at=expires_at,
-        )
-        db.add(reset_token)
-        db.commit()
-
-        # 异步发送邮件
-        await send_password_reset_email(email=user.email, token=token)
+    if _create_reset_token(db, email):
+        outbox.notify()
 
     # 无论是否存在该邮箱，都渲染同一结果页面
     return templates.TemplateResponse(
@@ -61,20 +42,28 @@ async def request_password_reset(
     )
 
 
+def _create_reset_token(db: Session, email: str) -> Optional[str]:
+    """邮箱对应的用户存在时创建一次性 token（有效期 30 分钟）并把重置邮件写入 outbox，返回 token；否则返回 None"""
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if not user:
+        return None
+
+    token = reset_tokens.create(db, user.id)
+    queue_password_reset_email(db, email=email, token=token)
+    db.commit()
+    return token
+
+
 def _get_valid_reset_token(db: Session, token: str) -> models.PasswordResetToken:
     """根据 token 查询并校验是否有效（存在且未过期）。"""
-    reset_token = (
-        db.query(models.PasswordResetToken)
-        .filter(models.PasswordResetToken.token == token)
-        .first()
-    )
+    reset_token = reset_tokens.lookup(db, token)
     if not reset_token:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="重置链接无效或已被使用。",
         )
 
-    if reset_token.expires_at < _now_utc():
+    if reset_tokens.is_expired(reset_token):
         # 过期后直接删除记录
         db.delete(reset_token)
         db.commit()
@@ -152,9 +141,12 @@ def submit_new_password(
 
     # 更新用户密码
     user.hashed_password = get_password_hash(new_password)
-    # 重置成功后物理删除 token 记录
-    db.delete(reset_token)
+    # 重置成功后删除该用户的全部 token（本次使用的和其他尚未使用的链接）
+    reset_tokens.revoke_all(db, user.id)
+    # 同时作废该用户已签发的登录 token（其他设备上的登录需重新登录）
+    token_versions.bump(user)
     db.commit()
+    token_versions.invalidate()
 
     return templates.TemplateResponse(
         "password_reset_success.html",
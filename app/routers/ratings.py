@@ -1,9 +1,11 @@
 # app/routers/ratings.py
 from fastapi import APIRouter, Depends, Form, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from .. import models, database, auth
 from fastapi.responses import JSONResponse
 from typing import Optional
+from app.utils import rankings, similarity
 from app.utils.ratings import (
     get_updated_difficulty_scores_for_context,
     QUALITY_CATEGORY_MAP,
@@ -22,7 +24,7 @@ async def rate_game_quality(
     request: Request,
     game_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     form_data = await request.form()
     
@@ -37,19 +39,29 @@ async def rate_game_quality(
     if not ratings:
         raise HTTPException(status_code=400, detail="没有提供任何有效的评分数据")
 
+    # 读取表单需要 await；写入与聚合是同步查询，放到线程池执行，不阻塞事件循环
+    content = await run_in_threadpool(_save_quality_rating, db, game_id, current_user, ratings)
+    return JSONResponse(content=content)
+
+
+def _save_quality_rating(db: Session, game_id: int, current_user: auth.Principal, ratings: dict) -> dict:
     existing_rating = db.query(models.QualityRating).filter_by(
         game_id=game_id, user_id=current_user.id
     ).first()
 
     if existing_rating:
+        old_value = rankings.quality_value(existing_rating)
         for field, value in ratings.items():
             setattr(existing_rating, field, value)
+        rankings.record_quality(db, game_id, old_value, rankings.quality_value(existing_rating))
     else:
         new_rating = models.QualityRating(
             game_id=game_id, user_id=current_user.id, user_name=current_user.username, **ratings
         )
         db.add(new_rating)
+        rankings.record_quality(db, game_id, None, rankings.quality_value(new_rating))
     # +++ 结束 +++
+    similarity.mark_dirty(db, game_id)
     
     db.commit()
 
@@ -64,19 +76,19 @@ async def rate_game_quality(
         "count": count
     } for cat, field in zip(QUALITY_CATEGORY_MAP.keys(), QUALITY_CATEGORY_MAP.values())]
 
-    return JSONResponse(content={
+    return {
         "status": "success",
         "message": "品质评分提交成功！",
         "updated_scores": updated_scores,
         "overall_score": round(total_score, 2)
-    })
+    }
 
 
 @router.delete("/{game_id}/rate_quality")
-async def delete_game_quality_rating(
+def delete_game_quality_rating(
     game_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """撤销当前用户对该游戏的品质评分"""
     existing_rating = db.query(models.QualityRating).filter_by(
@@ -86,7 +98,9 @@ async def delete_game_quality_rating(
     if not existing_rating:
         raise HTTPException(status_code=404, detail="当前没有可撤销的品质评分")
 
+    rankings.record_quality(db, game_id, rankings.quality_value(existing_rating), None)
     db.delete(existing_rating)
+    similarity.mark_dirty(db, game_id)
     db.commit()
 
     # 删除后返回更新的聚合结果，前端可选择刷新或按需更新
@@ -114,7 +128,7 @@ async def rate_game_difficulty(
     request: Request,
     game_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     form_data = await request.form()
     
@@ -135,6 +149,21 @@ async def rate_game_difficulty(
     if not ratings:
         raise HTTPException(status_code=400, detail="没有提供任何有效的评分数据")
 
+    # 同 rate_game_quality：同步的写入与聚合放到线程池执行
+    content = await run_in_threadpool(
+        _save_difficulty_rating, db, game_id, current_user, difficulty_level_id, ship_type_id, ratings
+    )
+    return JSONResponse(content=content)
+
+
+def _save_difficulty_rating(
+    db: Session,
+    game_id: int,
+    current_user: auth.Principal,
+    difficulty_level_id: Optional[int],
+    ship_type_id: Optional[int],
+    ratings: dict,
+) -> dict:
     existing_rating = db.query(models.DifficultyRating).filter_by(
         game_id=game_id, 
         user_id=current_user.id,
@@ -143,34 +172,38 @@ async def rate_game_difficulty(
     ).first()
 
     if existing_rating:
+        old_value = rankings.difficulty_value(existing_rating)
         for field, value in ratings.items():
             setattr(existing_rating, field, value)
+        rankings.record_difficulty(db, game_id, old_value, rankings.difficulty_value(existing_rating))
     else:
         new_rating = models.DifficultyRating(
             game_id=game_id, user_id=current_user.id, user_name=current_user.username,
             difficulty_level_id=difficulty_level_id, ship_type_id=ship_type_id, **ratings
         )
         db.add(new_rating)
+        rankings.record_difficulty(db, game_id, None, rankings.difficulty_value(new_rating))
+    similarity.mark_dirty(db, game_id)
     db.commit()
 
     # 计算并返回更新后的评分
     updated_context_data = get_updated_difficulty_scores_for_context(db, game_id, difficulty_level_id, ship_type_id)
     context_key = f"d{difficulty_level_id or 0}_s{ship_type_id or 0}"
 
-    return JSONResponse(content={
+    return {
         "status": "success",
         "message": "难度评分提交成功！",
         "updated_context_key": context_key,
         "updated_context_data": updated_context_data
-    })
+    }
 
 
 @router.delete("/{game_id}/rate_difficulty")
-async def delete_game_difficulty_rating(
+def delete_game_difficulty_rating(
     game_id: int,
     request: Request,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """
     撤销当前用户在指定情境下的难度评分。
@@ -194,7 +227,9 @@ async def delete_game_difficulty_rating(
     if not existing_rating:
         raise HTTPException(status_code=404, detail="当前情境下没有可撤销的难度评分")
 
+    rankings.record_difficulty(db, game_id, rankings.difficulty_value(existing_rating), None)
     db.delete(existing_rating)
+    similarity.mark_dirty(db, game_id)
     db.commit()
 
     # 返回当前情境以及整体的更新后数据，前端可按需使用
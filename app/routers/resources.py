@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, status, File, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload
+from sqlalchemy import func, or_, select
 from typing import Optional
-from pathlib import Path
-import secrets
 
 from app import models, database, auth
 from app.config.templates import templates
-from app.config.constants import BASE_DIR
+from app.utils import ratelimit
+from app.utils.images import save_cover, release_cover, discard_cover
 
 
 router = APIRouter(
@@ -52,49 +52,12 @@ def process_resource_tags(db: Session, resource: models.Resource, tags_str: str)
         resource.tags.append(tag)
 
 
-def save_resource_cover(image_file: UploadFile) -> Optional[str]:
-    """
-    保存资源封面图到静态目录，返回存入数据库的相对路径。
-    限制：<1MB，JPG/PNG/WEBP/GIF
-    """
-    if not image_file or not image_file.filename:
-        return None
-
-    contents = image_file.file.read()
-    file_size = len(contents)
-    if file_size > 1 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="图片文件大小不能超过 1MB")
-
-    if image_file.content_type not in ["image/jpeg", "image/png", "image/gif", "image/webp"]:
-        raise HTTPException(status_code=400, detail="只支持上传 JPG, PNG, GIF, WebP 格式的图片")
-
-    upload_dir = BASE_DIR / "app" / "static" / "uploads" / "covers"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    token = secrets.token_hex(16)
-    file_extension = Path(image_file.filename).suffix
-    if not file_extension:
-        content_type_map = {
-            "image/jpeg": ".jpg",
-            "image/png": ".png",
-            "image/gif": ".gif",
-            "image/webp": ".webp",
-        }
-        file_extension = content_type_map.get(image_file.content_type, ".jpg")
-
-    save_path = upload_dir / f"{token}{file_extension}"
-    with open(save_path, "wb") as buffer:
-        buffer.write(contents)
-
-    return f"/static/uploads/covers/{token}{file_extension}"
-
-
 # --- 页面路由 ---
 
 @router.get("/", response_class=HTMLResponse)
-def resource_list(
+async def resource_list(
     request: Request,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     page: int = 1,
     per_page: int = 20,
     q: Optional[str] = None,
@@ -105,13 +68,14 @@ def resource_list(
     - 紧凑列表布局
     - 支持关键词搜索（title + 标签）
     - 支持按单个标签过滤
+    - 使用异步会话（模板用到的 tags / uploader 需在查询时加载）
     """
     page = max(1, page)
     per_page = max(1, min(50, per_page))
 
-    query = db.query(models.Resource).options(
-        selectinload(models.Resource.tags),
-        selectinload(models.Resource.uploader),
+    query = select(models.Resource).options(
+        selectinload(models.Resource.tags).raiseload("*"),
+        selectinload(models.Resource.uploader).raiseload("*"),
     )
 
     # 仅展示有效资源；失效资源仍可通过详情访问
@@ -130,19 +94,18 @@ def resource_list(
     if tag:
         query = query.join(models.Resource.tags).filter(models.ResourceTag.name == tag)
 
-    total_count = query.distinct().count()
+    total_count = (await db.execute(select(func.count()).select_from(query.distinct().subquery()))).scalar_one()
     total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 1
 
-    resources = (
+    resources = (await db.execute(
         query.order_by(models.Resource.heat.desc(), models.Resource.created_at.desc())
         .offset((page - 1) * per_page)
         .limit(per_page)
-        .all()
-    )
+    )).scalars().all()
 
     # 热门标签（仅资源标签）
-    tag_counts = (
-        db.query(models.ResourceTag, func.count(models.resource_tag_association.c.resource_id).label("res_count"))
+    tag_counts = (await db.execute(
+        select(models.ResourceTag, func.count(models.resource_tag_association.c.resource_id).label("res_count"))
         .outerjoin(
             models.resource_tag_association,
             models.ResourceTag.id == models.resource_tag_association.c.resource_tag_id,
@@ -151,8 +114,8 @@ def resource_list(
         .having(func.count(models.resource_tag_association.c.resource_id) > 0)
         .order_by(func.count(models.resource_tag_association.c.resource_id).desc(), models.ResourceTag.name)
         .limit(30)
-        .all()
-    )
+        .options(raiseload("*"))
+    )).all()
     popular_tags = [{"tag": t, "count": c} for t, c in tag_counts]
 
     # 推荐分类枚举（前端展示用，但数据库不强制）
@@ -177,7 +140,7 @@ def resource_list(
 
 @router.get("/submit", response_class=HTMLResponse)
 async def resource_submit_page(
-    request: Request, current_user: models.User = Depends(auth.get_current_user)
+    request: Request, current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """资源提交页（仅登录用户可访问）"""
     suggested_categories = ["游戏本体", "补丁", "OST", "DLC", "工具", "攻略/文档", "其他"]
@@ -191,10 +154,10 @@ async def resource_submit_page(
 
 
 @router.post("/submit", response_class=RedirectResponse)
-async def resource_submit(
+def resource_submit(
     request: Request,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     title: str = Form(...),
     category: str = Form(...),
     tags: str = Form(...),
@@ -212,9 +175,7 @@ async def resource_submit(
     if not content.strip():
         raise HTTPException(status_code=400, detail="提交内容不能为空")
 
-    cover_path = None
-    if cover and cover.filename:
-        cover_path = save_resource_cover(cover)
+    cover_path = save_cover(db, cover)
 
     new_resource = models.Resource(
         title=title.strip(),
@@ -232,6 +193,7 @@ async def resource_submit(
         db.refresh(new_resource)
     except Exception as e:
         db.rollback()
+        discard_cover(db, cover_path)
         raise HTTPException(status_code=500, detail=f"创建资源失败: {e}")
 
     return RedirectResponse(
@@ -282,12 +244,12 @@ def resource_detail(
     )
 
 
-@router.post("/{resource_id}/vote")
-async def resource_vote(
+@router.post("/{resource_id}/vote", dependencies=[Depends(ratelimit.limit("vote"))])
+def resource_vote(
     resource_id: int,
     direction: str = Form(...),  # "up" 或 "down"
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
 ):
     """
     资源投票：
@@ -352,10 +314,10 @@ async def resource_vote(
 
 
 @router.post("/{resource_id}/delete", response_class=RedirectResponse)
-async def resource_delete(
+def resource_delete(
     resource_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
 ):
     """
     删除资源（仅上传者或管理员可以操作）。
@@ -369,6 +331,7 @@ async def resource_delete(
     if not (is_owner or current_user.is_admin):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="没有权限删除该资源")
 
+    release_cover(db, resource.cover_image)
     db.delete(resource)
     db.commit()
 
@@ -376,11 +339,11 @@ async def resource_delete(
 
 
 @router.get("/{resource_id}/edit", response_class=HTMLResponse)
-async def resource_edit_page(
+def resource_edit_page(
     request: Request,
     resource_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
 ):
     """编辑资源页面（仅上传者或管理员）"""
     resource = (
@@ -413,10 +376,10 @@ async def resource_edit_page(
 
 
 @router.post("/{resource_id}/edit", response_class=RedirectResponse)
-async def resource_edit(
+def resource_edit(
     resource_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: auth.Principal = Depends(auth.get_current_user),
     title: str = Form(...),
     category: str = Form(...),
     tags: str = Form(...),
@@ -449,8 +412,9 @@ async def resource_edit(
 
     # 可选更新封面
     if cover and cover.filename:
-        new_cover = save_resource_cover(cover)
-        resource.cover_image = new_cover
+        old_cover = resource.cover_image
+        resource.cover_image = save_cover(db, cover)
+        release_cover(db, old_cover)
 
     process_resource_tags(db, resource, tags)
     db.commit()
@@ -0,0 +1,317 @@
+"""
+文章静态包（zip）的安全解压
+
+- 从磁盘上的临时文件逐个条目流式解压到暂存目录，不把整个包读入内存
+- 限制条目数、单个条目大小、解压总大小与压缩比（防 zip 炸弹），拒绝路径穿越
+- 解压完成后改名为版本目录（.release-*），正式目录是指向它的符号链接，用 os.replace 原子地切换，
+  读者任何时刻都能看到完整的旧版本或新版本；同一 slug 的安装用文件锁（fcntl.flock）串行执行
+- 可在后台线程中执行，进度写入临时目录下的 JSON 文件，任何 worker 都能查询；
+  执行任务的 worker 退出（重启 / max_requests 回收）后任务标记为失败，残留的暂存目录由 cleanup_static 清理
+"""
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# 解压限制（可通过环境变量调整）
+MAX_ENTRIES = int(os.getenv("STG_ZIP_MAX_ENTRIES", "5000"))
+MAX_ENTRY_SIZE = int(os.getenv("STG_ZIP_MAX_ENTRY_MB", "50")) * 1024 * 1024
+MAX_TOTAL_SIZE = int(os.getenv("STG_ZIP_MAX_TOTAL_MB", "200")) * 1024 * 1024
+MAX_RATIO = int(os.getenv("STG_ZIP_MAX_RATIO", "100"))
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+# 后台解压任务的进度文件目录
+JOBS_DIR = Path(tempfile.gettempdir()) / "stg_extract_jobs"
+
+# 进度文件保留时长（秒），过期的在创建新任务时顺带清理
+JOB_TTL_SECONDS = 3600
+
+# 同一 slug 安装时的锁文件目录
+LOCKS_DIR = Path(tempfile.gettempdir()) / "stg_article_locks"
+
+# 与正式目录同级的辅助目录前缀（以 . 开头不会被当作文章目录）：
+# 暂存目录、版本目录（正式目录的符号链接指向它）、切换用的临时符号链接、升级前的普通目录被替换后待删除的旧目录
+STAGING_PREFIX = ".staging-"
+RELEASE_PREFIX = ".release-"
+LINK_PREFIX = ".link-"
+TRASH_PREFIX = ".trash-"
+
+
+class ArchiveError(Exception):
+    """静态包不合法（超限、路径穿越、损坏等）"""
+
+
+def _safe_member_path(name: str) -> Optional[PurePosixPath]:
+    """校验条目路径，目录条目返回 None，不安全的路径抛出 ArchiveError"""
+    path = PurePosixPath(name.replace("\\", "/"))
+    if name.endswith("/"):
+        return None
+    if path.is_absolute() or ".." in path.parts or (path.parts and ":" in path.parts[0]):
+        raise ArchiveError(f"静态包中包含非法路径: {name}")
+    return path
+
+
+def extract_zip(
+    zip_path: Path,
+    dest_dir: Path,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    把 zip 解压到 dest_dir（应为空的暂存目录），返回解压出的字节数。
+
+    :param progress: 回调 (已解压字节数, 预计总字节数)
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = zf.infolist()
+        if len(infos) > MAX_ENTRIES:
+            raise ArchiveError(f"静态包条目过多（上限 {MAX_ENTRIES}）")
+
+        declared_total = 0
+        for info in infos:
+            if info.file_size > MAX_ENTRY_SIZE:
+                raise ArchiveError(f"静态包中文件过大: {info.filename}")
+            if info.compress_size and info.file_size / info.compress_size > MAX_RATIO:
+                raise ArchiveError(f"静态包中文件压缩比异常: {info.filename}")
+            declared_total += info.file_size
+        if declared_total > MAX_TOTAL_SIZE:
+            raise ArchiveError("静态包解压后总大小超出限制")
+
+        written = 0
+        for info in infos:
+            member = _safe_member_path(info.filename)
+            if member is None:
+                continue
+            target = dest_dir.joinpath(*member.parts)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            entry_written = 0
+            with zf.open(info) as src, open(target, "wb") as out:
+                while True:
+                    chunk = src.read(_COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    # 不信任条目头中声明的大小，按实际写出的字节数再检查一次
+                    entry_written += len(chunk)
+                    written += len(chunk)
+                    if entry_written > info.file_size or written > MAX_TOTAL_SIZE:
+                        raise ArchiveError(f"静态包中文件实际大小超出声明: {info.filename}")
+                    out.write(chunk)
+                    if progress:
+                        progress(written, declared_total)
+        return written
+
+
+def release_of(target_dir: Path) -> Optional[Path]:
+    """正式目录（符号链接）指向的版本目录；不是符号链接或指向的不是同级版本目录时返回 None"""
+    if not target_dir.is_symlink():
+        return None
+    release_dir = target_dir.parent / os.readlink(target_dir)
+    if release_dir.parent != target_dir.parent or not release_dir.name.startswith(RELEASE_PREFIX):
+        return None
+    return release_dir
+
+
+def _release_dir(target_dir: Path) -> Path:
+    return target_dir.with_name(f"{RELEASE_PREFIX}{target_dir.name}-{secrets.token_hex(4)}")
+
+
+def _releases(target_dir: Path) -> List[Path]:
+    """target_dir 的全部版本目录（按名称精确匹配，slug a 不会匹配到 slug a-b 的版本）"""
+    prefix = f"{RELEASE_PREFIX}{target_dir.name}-"
+    return [
+        path for path in target_dir.parent.glob(f"{prefix}*")
+        if len(path.name) == len(prefix) + 8 and path.is_dir() and not path.is_symlink()
+    ]
+
+
+def swap_directory(release_dir: Path, target_dir: Path) -> None:
+    """
+    让正式目录 target_dir 指向同级的版本目录 release_dir。
+
+    先创建指向新版本的临时符号链接，再用 os.replace 覆盖 target_dir（一次原子 rename），
+    期间 target_dir 始终存在，读者看到的要么是旧版本要么是新版本。
+    切换前的版本保留到下一次切换（切换瞬间已解析到旧版本的读取仍能完成），更早的版本删除。
+    target_dir 还是升级前安装的普通目录时无法用 rename 原子替换，先移走再切换，只在这一次留有很短的空档。
+    调用方需持有该 slug 的锁（见 install_package）。
+    """
+    old_release = release_of(target_dir)
+    trash_dir = None
+    if old_release is None and target_dir.exists() and not target_dir.is_symlink():
+        trash_dir = target_dir.with_name(f"{TRASH_PREFIX}{target_dir.name}-{secrets.token_hex(4)}")
+        os.replace(target_dir, trash_dir)
+    link = target_dir.with_name(f"{LINK_PREFIX}{target_dir.name}-{secrets.token_hex(4)}")
+    os.symlink(release_dir.name, link)
+    try:
+        os.replace(link, target_dir)
+    except OSError:
+        link.unlink(missing_ok=True)
+        raise
+    for old in _releases(target_dir):
+        if old not in (release_dir, old_release):
+            shutil.rmtree(old, ignore_errors=True)
+    if trash_dir is not None:
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+
+def remove_article_dir(target_dir: Path) -> None:
+    """删除文章的正式目录：符号链接连同它的全部版本目录一起删除"""
+    if target_dir.is_symlink():
+        target_dir.unlink()
+    else:
+        shutil.rmtree(target_dir)
+    for release_dir in _releases(target_dir):
+        shutil.rmtree(release_dir, ignore_errors=True)
+
+
+@contextmanager
+def _slug_lock(target_dir: Path) -> Iterator[None]:
+    """同一 slug 的安装（跨线程 / 跨 worker）串行执行，后到的等待前一个完成；没有 fcntl 时（Windows）不加锁"""
+    if fcntl is None:
+        yield
+        return
+    LOCKS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCKS_DIR / f"{target_dir.name}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def install_package(
+    zip_path: Path,
+    target_dir: Path,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """解压到 target_dir 同级的暂存目录，成功后改名为版本目录并切换；失败时清理暂存目录并保留旧内容"""
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    with _slug_lock(target_dir):
+        staging_dir = Path(tempfile.mkdtemp(prefix=f"{STAGING_PREFIX}{target_dir.name}-", dir=target_dir.parent))
+        try:
+            extract_zip(zip_path, staging_dir, progress)
+            staging_dir.chmod(0o755)
+            release_dir = _release_dir(target_dir)
+            os.replace(staging_dir, release_dir)
+            try:
+                swap_directory(release_dir, target_dir)
+            except BaseException:
+                shutil.rmtree(release_dir, ignore_errors=True)
+                raise
+        except zipfile.BadZipFile as exc:
+            raise ArchiveError("静态包不是有效的 zip 文件") from exc
+        finally:
+            if staging_dir.exists():
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+# --- 后台任务与进度 ---
+
+def _job_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def _write_job(job_id: str, **fields) -> None:
+    path = _job_path(job_id)
+    tmp = path.with_suffix(".part")
+    tmp.write_text(json.dumps(fields, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _purge_old_jobs() -> None:
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for path in JOBS_DIR.glob("*.json"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """本机上 pid 对应的进程是否仍在运行（记录了执行进程的后台任务用来判断任务是否已中断）"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fail_if_interrupted(job_id: str, job: dict) -> dict:
+    """running 状态但执行它的进程已退出（后台线程随之终止）的任务改为失败"""
+    if job.get("status") != "running" or pid_alive(job.get("pid")):
+        return job
+    job = {key: value for key, value in job.items() if key not in ("status", "done", "total", "pid")}
+    job.update(status="failed", error="解压被中断（服务重启），请重新上传静态包")
+    _write_job(job_id, **job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """读取任务进度，不存在时返回 None"""
+    if not job_id.isalnum():
+        return None
+    try:
+        job = json.loads(_job_path(job_id).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return _fail_if_interrupted(job_id, job)
+
+
+def fail_interrupted_jobs() -> int:
+    """worker 启动时调用：把执行进程已退出的 running 任务标记为失败，返回处理数"""
+    failed = 0
+    for path in JOBS_DIR.glob("*.json"):
+        try:
+            job = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if _fail_if_interrupted(path.stem, job) is not job:
+            failed += 1
+    return failed
+
+
+def start_install_job(zip_path: Path, target_dir: Path, result: dict) -> str:
+    """
+    在后台线程中安装静态包，立即返回任务 ID。
+
+    任务结束后会删除 zip_path；result 中的字段会原样附加到进度信息里（如 static_path）。
+    """
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    _purge_old_jobs()
+    job_id = secrets.token_hex(8)
+    _write_job(job_id, status="running", done=0, total=0, pid=os.getpid(), **result)
+
+    last_report = [0.0]
+
+    def report(done: int, total: int) -> None:
+        now = time.monotonic()
+        if now - last_report[0] >= 0.2:
+            last_report[0] = now
+            _write_job(job_id, status="running", done=done, total=total, pid=os.getpid(), **result)
+
+    def run() -> None:
+        try:
+            install_package(zip_path, target_dir, report)
+            _write_job(job_id, status="done", **result)
+        except ArchiveError as exc:
+            _write_job(job_id, status="failed", error=str(exc), **result)
+        except Exception as exc:
+            _write_job(job_id, status="failed", error=f"解压失败: {exc}", **result)
+        finally:
+            zip_path.unlink(missing_ok=True)
+
+    threading.Thread(target=run, name=f"zip-install-{job_id}", daemon=True).start()
+    return job_id
@@ -0,0 +1,150 @@
+"""
+浏览页的分面（标签 / 公司）计数
+
+每个 worker 在内存中保存一份紧凑的倒排索引：游戏按 id 排序后编号，
+每个标签、每个公司对应一个 Python 整数位图（第 i 位表示第 i 个游戏）。
+筛选即位图求交，计数即 popcount，因此可以廉价地给出「在当前筛选条件下
+再加上某个标签 / 公司后还剩多少游戏」的下钻计数，不必每次请求都对关联表 GROUP BY。
+
+游戏写入（新增、编辑、删除）后调用 invalidate()：更新临时目录中的时间戳文件，
+各 worker 在下次读取时发现时间戳变化即重建索引（两条查询）。
+"""
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.models import game_tag_association
+
+# 多个 worker 共享的失效时间戳文件
+STAMP_FILE = Path(tempfile.gettempdir()) / "stg_facets.stamp"
+
+
+class FacetTag(NamedTuple):
+    id: int
+    name: str
+
+
+def _popcount(bits: int) -> int:
+    return bits.bit_count() if hasattr(bits, "bit_count") else bin(bits).count("1")
+
+
+class FacetIndex:
+    """标签 / 公司 -> 游戏位图 的倒排索引"""
+
+    def __init__(self, games: Iterable[Tuple[int, str]], tag_links: Iterable[Tuple[int, int, str]]) -> None:
+        self.game_ids: List[int] = []
+        position: Dict[int, int] = {}
+        self.company_bits: Dict[str, int] = {}
+        for game_id, company in sorted(games):
+            bit = 1 << len(self.game_ids)
+            position[game_id] = len(self.game_ids)
+            self.game_ids.append(game_id)
+            self.company_bits[company] = self.company_bits.get(company, 0) | bit
+        self.all_bits = (1 << len(self.game_ids)) - 1
+
+        self.tags: Dict[str, FacetTag] = {}
+        self.tag_bits: Dict[int, int] = {}
+        for game_id, tag_id, tag_name in tag_links:
+            index = position.get(game_id)
+            if index is None:
+                continue
+            self.tags.setdefault(tag_name, FacetTag(tag_id, tag_name))
+            self.tag_bits[tag_id] = self.tag_bits.get(tag_id, 0) | (1 << index)
+        # 按全站使用次数降序（同次数按名称）排好的标签
+        self.ranked_tags = sorted(self.tags.values(), key=lambda tag: (-_popcount(self.tag_bits[tag.id]), tag.name))
+
+    def matching(self, tag_names: Iterable[str] = (), company: Optional[str] = None) -> int:
+        """同时满足所有标签与公司的游戏位图；不存在的标签名会被忽略（与原有筛选行为一致）"""
+        bits = self.all_bits
+        for name in tag_names:
+            tag = self.tags.get(name)
+            if tag is not None:
+                bits &= self.tag_bits[tag.id]
+        if company:
+            bits &= self.company_bits.get(company, 0)
+        return bits
+
+    def count(self, bits: int) -> int:
+        return _popcount(bits)
+
+    def ids(self, bits: int) -> List[int]:
+        """位图对应的游戏 id 列表"""
+        # bin() 的低位在末尾，倒序后第 i 个字符即第 i 个游戏
+        return [self.game_ids[i] for i, flag in enumerate(reversed(bin(bits)[2:])) if flag == "1"]
+
+    def tag_counts(self, bits: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, object]]:
+        """
+        标签按全站使用次数降序（同次数按名称）取前 limit 个，
+        count 为在 bits 范围内（默认全部游戏）同时带有该标签的游戏数。
+        """
+        ranked = self.ranked_tags if limit is None else self.ranked_tags[:limit]
+        scope = self.all_bits if bits is None else bits
+        return [{"tag": tag, "count": _popcount(self.tag_bits[tag.id] & scope)} for tag in ranked]
+
+    def company_counts(self, bits: Optional[int] = None) -> Dict[str, int]:
+        """公司名 -> 在 bits 范围内的游戏数"""
+        scope = self.all_bits if bits is None else bits
+        return {company: _popcount(company_bits & scope) for company, company_bits in self.company_bits.items()}
+
+    @property
+    def companies(self) -> List[str]:
+        return sorted(self.company_bits)
+
+
+_index: Optional[FacetIndex] = None
+_index_stamp: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _stamp() -> int:
+    try:
+        return STAMP_FILE.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def build_index(db: Session) -> FacetIndex:
+    games = db.query(models.Game.id, models.Game.company).all()
+    tag_links = db.query(
+        game_tag_association.c.game_id, models.Tag.id, models.Tag.name
+    ).join(models.Tag, models.Tag.id == game_tag_association.c.tag_id).all()
+    return FacetIndex(games, tag_links)
+
+
+def get_index(db: Optional[Session] = None) -> FacetIndex:
+    """
+    返回当前 worker 的分面索引，时间戳文件变化（其他 worker 写入了游戏）时重建。
+
+    不传 db 时重建用自己打开的同步会话：异步路由应通过 run_in_threadpool(get_index) 调用，
+    重建（全表两条查询 + 构建位图）不在事件循环中执行。
+    """
+    global _index, _index_stamp
+    stamp = _stamp()
+    if _index is not None and _index_stamp == stamp:
+        return _index
+    with _lock:
+        if _index is None or _index_stamp != stamp:
+            if db is None:
+                with SessionLocal() as own_db:
+                    _index = build_index(own_db)
+            else:
+                _index = build_index(db)
+            _index_stamp = stamp
+        return _index
+
+
+def invalidate() -> None:
+    """游戏或其标签 / 公司变更后调用（提交之后），让所有 worker 在下次读取时重建索引"""
+    global _index
+    _index = None
+    try:
+        STAMP_FILE.touch()
+        os.utime(STAMP_FILE)
+    except OSError:
+        pass
@@ -0,0 +1,324 @@
+"""
+封面图片统一入口
+
+游戏封面与资源封面都通过这里保存：
+- 原图经 uploads.store_upload 流式落盘（大小 / 格式校验），按内容哈希去重并计入引用
+- 缩略图（card / detail / retina）在进程池中异步生成 WebP（可用时额外生成 AVIF），
+  不占用请求处理时间；生成结果写入同目录下的 manifest JSON
+- 模板通过 cover_srcset / cover_src 读取 manifest，输出 srcset，
+  manifest 尚未生成或 Pillow 不可用时自动回退为原图
+- 提交任务时写入 .pending 标记（记录提交的进程），生成完成后删除；
+  提交它的 worker 退出（重启 / 被回收）后，下一个启动的 worker 通过 resume_pending 重新提交
+- 缩略图功能上线前上传、没有 manifest 的封面由 python -m app.maintenance.build_cover_renditions 补齐
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.config.constants import BASE_DIR
+from app.utils import metrics
+from app.utils.archives import pid_alive
+from app.utils.uploads import UPLOADS_ROOT, discard_upload, release_upload, store_upload, upload_path
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+# 封面大小上限
+COVER_MAX_SIZE = 1 * 1024 * 1024
+
+# 缩略图规格：名称 -> 目标宽度（像素）
+RENDITIONS = {
+    "card": 320,
+    "detail": 640,
+    "retina": 1280,
+}
+
+# 缩略图与 manifest 存放目录（对应 URL /static/uploads/covers/renditions/）
+RENDITIONS_DIR = UPLOADS_ROOT / "covers" / "renditions"
+RENDITIONS_URL = "/static/uploads/covers/renditions"
+
+# 生成缩略图的进程数（每个 worker 各自持有一个进程池）
+IMAGE_WORKERS = int(os.getenv("STG_IMAGE_WORKERS", "1"))
+
+# 是否在页面中使用缩略图（关闭后模板始终输出原图，便于对比页面体积）
+RENDITIONS_ENABLED = os.getenv("STG_COVER_RENDITIONS", "True").lower() == "true"
+
+# 进程池中的子进程异常退出（BrokenProcessPool）时重新提交的次数
+MAX_RETRIES = 2
+
+# manifest 缓存的条目数上限（按最近使用淘汰）
+MANIFEST_CACHE_SIZE = 4096
+
+# 尚未生成 manifest 的封面在这段时间（秒）内不再重复检查文件
+MISSING_TTL_SECONDS = 30
+
+logger = logging.getLogger("stg.images")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# 已读取的 manifest 缓存；未生成的记录检查时间，MISSING_TTL_SECONDS 后再检查文件
+_manifest_cache: "OrderedDict[str, dict]" = OrderedDict()
+_missing: Dict[str, float] = {}
+_cache_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    """子进程异常退出后进程池不可再用，换一个新的"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def _stem(url: str) -> str:
+    return Path(url).stem
+
+
+def _manifest_path(url: str) -> Path:
+    return RENDITIONS_DIR / f"{_stem(url)}.json"
+
+
+def _pending_path(url: str) -> Path:
+    return RENDITIONS_DIR / f".{_stem(url)}.pending"
+
+
+def render_renditions(src_path: str, out_dir: str, stem: str) -> dict:
+    """
+    在子进程中执行：为原图生成各尺寸缩略图并写入 manifest。
+
+    宽度不超过原图宽度（不放大）；manifest 最后通过 os.replace 原子写入，
+    读取方要么看到完整 manifest，要么看不到。
+    """
+    from PIL import Image, ImageOps, features
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    formats = ["webp"]
+    if features.check("avif"):
+        formats.append("avif")
+
+    manifest = {"renditions": {}}
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        for name, width in RENDITIONS.items():
+            target_width = min(width, img.width)
+            target_height = max(1, round(img.height * target_width / img.width))
+            resized = img.resize((target_width, target_height), Image.LANCZOS)
+            entry = {"width": target_width}
+            for fmt in formats:
+                # 同一封面的任务可能被重复提交（见 resume_pending），先写临时文件再原子替换
+                filename = f"{stem}-{name}.{fmt}"
+                tmp = out / f".{filename}.part"
+                resized.save(tmp, fmt.upper(), quality=80)
+                os.replace(tmp, out / filename)
+                entry[fmt] = f"{RENDITIONS_URL}/{filename}"
+            manifest["renditions"][name] = entry
+
+    tmp = out / f".{stem}.json.part"
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, out / f"{stem}.json")
+    return manifest
+
+
+def _write_pending(url: str) -> None:
+    RENDITIONS_DIR.mkdir(parents=True, exist_ok=True)
+    path = _pending_path(url)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.part")
+    tmp.write_text(json.dumps({"url": url, "pid": os.getpid()}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _submit(url: str, attempt: int = 0) -> None:
+    src_path = BASE_DIR / "app" / url.lstrip("/")
+    executor = _get_executor()
+    try:
+        future = executor.submit(render_renditions, str(src_path), str(RENDITIONS_DIR), _stem(url))
+    except BrokenProcessPool:
+        # 之前的任务让子进程异常退出，进程池已不可用
+        _reset_executor(executor)
+        executor = _get_executor()
+        future = executor.submit(render_renditions, str(src_path), str(RENDITIONS_DIR), _stem(url))
+    future.add_done_callback(partial(_on_done, url, attempt, executor))
+
+
+def _on_done(url: str, attempt: int, executor: ProcessPoolExecutor, future) -> None:
+    if future.cancelled():
+        return  # 进程退出时取消的任务保留 .pending 标记，由下一个 worker 重新提交
+    exc = future.exception()
+    if isinstance(exc, BrokenProcessPool) and attempt < MAX_RETRIES:
+        logger.warning("缩略图子进程异常退出，重新提交 %s（第 %s 次）", url, attempt + 1)
+        _reset_executor(executor)
+        _submit(url, attempt + 1)
+        return
+    if exc is not None:
+        # 图片本身无法处理时重试也没有意义，模板继续使用原图
+        logger.error("缩略图生成失败 %s: %s", url, exc)
+    with _cache_lock:
+        _missing.pop(url, None)
+    _pending_path(url).unlink(missing_ok=True)
+
+
+def schedule_renditions(url: str) -> None:
+    """把缩略图生成任务交给进程池，不等待结果"""
+    if Image is None or not url:
+        return
+    _write_pending(url)
+    _submit(url)
+
+
+def has_renditions(url: str) -> bool:
+    return _manifest_path(url).exists()
+
+
+def render_cover(url: str) -> dict:
+    """同步生成一个封面的缩略图（build_cover_renditions 在自己的进程池中调用）"""
+    manifest = render_renditions(str(upload_path(url)), str(RENDITIONS_DIR), _stem(url))
+    _pending_path(url).unlink(missing_ok=True)
+    return manifest
+
+
+def resume_pending() -> int:
+    """worker 启动时调用：重新提交提交进程已退出、尚未完成的缩略图任务，返回提交数"""
+    if Image is None or not RENDITIONS_DIR.exists():
+        return 0
+    resumed = 0
+    for path in RENDITIONS_DIR.glob(".*.pending"):
+        try:
+            pending = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if pid_alive(pending.get("pid")):
+            continue
+        # 多个 worker 同时启动时可能重复提交，生成结果是原子写入的，只是多做一次
+        schedule_renditions(pending["url"])
+        resumed += 1
+    if resumed:
+        logger.info("重新提交 %s 个未完成的缩略图任务", resumed)
+    return resumed
+
+
+def save_cover(db: Session, upload: UploadFile) -> Optional[str]:
+    """
+    保存封面原图（占用一个引用）并异步生成缩略图，返回原图 URL。
+    相同内容的封面已存在时直接复用，已有缩略图时不再重复生成。
+    """
+    if not upload or not upload.filename:
+        return None
+    url, is_new = store_upload(db, upload, "covers", max_size=COVER_MAX_SIZE)
+    if is_new or not _manifest_path(url).exists():
+        schedule_renditions(url)
+    return url
+
+
+def release_cover(db: Session, url: Optional[str]) -> None:
+    """封面不再被某条记录使用时调用（只减引用计数，文件由清理任务删除）"""
+    release_upload(db, url)
+
+
+def discard_cover(db: Session, url: Optional[str]) -> None:
+    """事务回滚后调用：删除本次新写入但未登记成功的封面"""
+    if discard_upload(db, url):
+        delete_cover_files(url)
+
+
+def cover_paths(url: Optional[str]) -> List[Path]:
+    """封面原图、全部缩略图、manifest 与 .pending 标记的磁盘路径（只包含存在的文件）"""
+    original = upload_path(url)
+    if original is None:
+        return []
+    paths = [original] if original.exists() else []
+    if RENDITIONS_DIR.exists():
+        paths.extend(RENDITIONS_DIR.glob(f"{_stem(url)}*"))
+        if _pending_path(url).exists():
+            paths.append(_pending_path(url))
+    return paths
+
+
+def delete_cover_files(url: Optional[str]) -> None:
+    """删除封面原图、全部缩略图与 manifest"""
+    with _cache_lock:
+        _manifest_cache.pop(url, None)
+        _missing.pop(url, None)
+    for path in cover_paths(url):
+        path.unlink(missing_ok=True)
+
+
+def load_manifest(url: Optional[str]) -> Optional[dict]:
+    """读取封面的 manifest，尚未生成时返回 None"""
+    if not RENDITIONS_ENABLED or not url or not url.startswith("/static/uploads/covers/"):
+        return None
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _manifest_cache.get(url)
+        if cached is not None:
+            _manifest_cache.move_to_end(url)
+        elif now - _missing.get(url, float("-inf")) < MISSING_TTL_SECONDS:
+            metrics.record_cache("cover_manifest", True)
+            return None
+    metrics.record_cache("cover_manifest", cached is not None)
+    if cached is not None:
+        return cached
+    try:
+        manifest = json.loads(_manifest_path(url).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        with _cache_lock:
+            _missing[url] = now
+            while len(_missing) > MANIFEST_CACHE_SIZE:
+                _missing.pop(next(iter(_missing)))
+        return None
+    with _cache_lock:
+        _missing.pop(url, None)
+        _manifest_cache[url] = manifest
+        while len(_manifest_cache) > MANIFEST_CACHE_SIZE:
+            _manifest_cache.popitem(last=False)
+    return manifest
+
+
+def cover_src(url: Optional[str], size: str = "card", fmt: str = "webp") -> Optional[str]:
+    """Jinja 辅助：返回指定尺寸的缩略图 URL，没有时回退为原图"""
+    manifest = load_manifest(url)
+    if manifest:
+        entry = manifest["renditions"].get(size)
+        if entry and entry.get(fmt):
+            return entry[fmt]
+    return url
+
+
+def cover_srcset(url: Optional[str], fmt: str = "webp") -> str:
+    """Jinja 辅助：返回 srcset 属性值（"url 320w, url 640w, ..."），没有缩略图时返回空字符串"""
+    manifest = load_manifest(url)
+    if not manifest:
+        return ""
+    candidates = []
+    seen_widths = set()
+    for entry in manifest["renditions"].values():
+        if not entry.get(fmt) or entry["width"] in seen_widths:
+            continue
+        seen_widths.add(entry["width"])
+        candidates.append(f"{entry[fmt]} {entry['width']}w")
+    return ", ".join(candidates)
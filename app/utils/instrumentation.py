@@ -0,0 +1,191 @@
+"""
+请求耗时与 SQL 统计
+
+- 每个请求在 contextvar 中持有一个 RequestStats，引擎的 before/after_cursor_execute 事件
+  把语句数与数据库耗时记到当前请求上（同步路由在线程池中执行时 contextvar 会随之复制）
+- 按路由模板（如 /games/{game_id}）累计延迟直方图，并同步记录到 Prometheus 指标（见 metrics）
+- STG_DEBUG=true 时在响应中附加 Server-Timing 头（浏览器开发者工具可直接查看）
+- 超过 STG_SLOW_REQUEST_MS 或 STG_SLOW_REQUEST_QUERIES 的请求记录日志，附带执行过的语句
+- 第一个请求到达时为当前事件循环启动阻塞看门狗（见 loop_watchdog）
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+
+from app.utils import loop_watchdog, metrics
+
+logger = logging.getLogger("stg.timing")
+
+DEBUG = os.getenv("STG_DEBUG", "False").lower() == "true"
+
+# 慢请求阈值：耗时（毫秒）或语句数任一超过即记录日志，设为 0 表示不按该项判断
+SLOW_REQUEST_MS = float(os.getenv("STG_SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_QUERIES = int(os.getenv("STG_SLOW_REQUEST_QUERIES", "50"))
+
+# 每个请求最多保留的语句条数 / 每条语句保留的长度（只用于慢请求日志）
+MAX_RECORDED_STATEMENTS = 100
+MAX_STATEMENT_LENGTH = 300
+
+# 延迟直方图的桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclass
+class RequestStats:
+    """单个请求的数据库统计"""
+    started: float = field(default_factory=time.perf_counter)
+    query_count: int = 0
+    db_time: float = 0.0
+    statements: List[str] = field(default_factory=list)
+    # 关系加载次数（"Comment.game" -> 次数），由 nplusone 检测器维护
+    relationship_loads: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.query_count += 1
+        self.db_time += elapsed
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append(f"{elapsed * 1000:.1f}ms {statement[:MAX_STATEMENT_LENGTH]}")
+
+
+@dataclass
+class RouteHistogram:
+    """单个路由的累计延迟分布（本进程内）"""
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    count: int = 0
+    total_ms: float = 0.0
+    queries: int = 0
+    db_ms: float = 0.0
+
+    def observe(self, elapsed_ms: float, stats: RequestStats) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.queries += stats.query_count
+        self.db_ms += stats.db_time * 1000
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("stg_request_stats", default=None)
+
+_histograms: Dict[str, RouteHistogram] = {}
+_histograms_lock = threading.Lock()
+
+# 请求结束时的回调 (method, 路由模板, RequestStats)，测试中用于检查查询预算
+_observers: List[Callable[[str, str, RequestStats], None]] = []
+
+
+def current_stats() -> Optional[RequestStats]:
+    """当前请求的统计，不在请求上下文中时返回 None"""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("stg_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("stg_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if statement.lstrip()[:6].upper() not in ("SELECT", "PRAGMA"):
+        metrics.observe_db_write(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def add_observer(callback: Callable[[str, str, RequestStats], None]) -> None:
+    _observers.append(callback)
+
+
+def remove_observer(callback: Callable[[str, str, RequestStats], None]) -> None:
+    if callback in _observers:
+        _observers.remove(callback)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """为引擎注册语句计时事件（重复调用无副作用）"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(request: Request) -> str:
+    """路由模板（未匹配到路由时统一记为 unmatched，避免按原始路径产生大量标签）"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+def route_histograms() -> Dict[str, dict]:
+    """各路由的延迟直方图快照"""
+    with _histograms_lock:
+        return {
+            label: {
+                "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"], hist.buckets)),
+                "count": hist.count,
+                "total_ms": round(hist.total_ms, 3),
+                "queries": hist.queries,
+                "db_ms": round(hist.db_ms, 3),
+            }
+            for label, hist in _histograms.items()
+        }
+
+
+def _is_slow(elapsed_ms: float, stats: RequestStats) -> bool:
+    if SLOW_REQUEST_MS and elapsed_ms >= SLOW_REQUEST_MS:
+        return True
+    return bool(SLOW_REQUEST_QUERIES) and stats.query_count >= SLOW_REQUEST_QUERIES
+
+
+async def timing_middleware(request: Request, call_next):
+    """记录请求耗时、语句数与数据库耗时"""
+    loop_watchdog.ensure_watching()
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    elapsed_ms = (time.perf_counter() - stats.started) * 1000
+    route = route_label(request)
+    label = f"{request.method} {route}"
+    with _histograms_lock:
+        hist = _histograms.get(label)
+        if hist is None:
+            hist = _histograms[label] = RouteHistogram()
+        hist.observe(elapsed_ms, stats)
+    metrics.observe_request(
+        request.method, route, response.status_code,
+        elapsed_ms / 1000, stats.query_count, stats.db_time,
+    )
+    for callback in list(_observers):
+        callback(request.method, route, stats)
+
+    if DEBUG:
+        response.headers["Server-Timing"] = (
+            f'app;dur={elapsed_ms:.1f}, '
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"'
+        )
+
+    if _is_slow(elapsed_ms, stats):
+        logger.warning(
+            "慢请求 %s %s: %.1fms, %d 条语句, 数据库 %.1fms\n  %s",
+            request.method,
+            request.url.path,
+            elapsed_ms,
+            stats.query_count,
+            stats.db_time * 1000,
+            "\n  ".join(stats.statements),
+        )
+    return response
@@ -0,0 +1,134 @@
+"""
+事件循环阻塞检测
+
+async def 路由 / 中间件中直接执行同步数据库查询、文件读写时，整个 worker 的事件循环都会停住，
+其他请求（哪怕只需几毫秒）只能排队等待。
+
+每个事件循环配一个看门狗线程，每隔 THRESHOLD_MS / 4 向事件循环投递一个心跳回调：
+- 心跳超过 THRESHOLD_MS 仍未执行即视为阻塞，立即抓取事件循环线程当前的调用栈（sys._current_frames），
+  并通知观察者（如 loop_guard pytest 插件）
+- 阻塞结束后按总时长（误差不超过一个心跳间隔）记录一次日志，并累加 stg_event_loop_blocked_total
+
+看门狗在第一个请求到达时由 instrumentation.timing_middleware 启动（ensure_watching），
+事件循环关闭后线程自行退出。
+
+配置：
+- STG_LOOP_BLOCK_MS：阻塞阈值（毫秒），默认 200；0 表示关闭
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from app.utils import metrics
+
+logger = logging.getLogger("stg.loop")
+
+THRESHOLD_MS = float(os.getenv("STG_LOOP_BLOCK_MS", "200"))
+
+
+@dataclass
+class BlockEvent:
+    """一次事件循环阻塞；duration_ms 在阻塞结束前为已知的下限，结束后更新为总时长"""
+    duration_ms: float
+    stack: str
+    finished: bool = False
+
+
+class Watchdog(threading.Thread):
+    """监视单个事件循环的后台线程"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int, threshold_ms: float) -> None:
+        super().__init__(name="stg-loop-watchdog", daemon=True)
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.threshold = threshold_ms / 1000
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _loop_stack(self) -> str:
+        frame = getattr(sys, "_current_frames", dict)().get(self.loop_thread_id)
+        return "".join(traceback.format_stack(frame)) if frame is not None else "（无法获取调用栈）"
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            beat = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(beat.set)
+            except RuntimeError:  # 事件循环已关闭
+                break
+            if not beat.wait(self.threshold):
+                block = BlockEvent(duration_ms=(time.perf_counter() - sent) * 1000, stack=self._loop_stack())
+                _notify(block)
+                while not beat.wait(self.threshold):
+                    if self._stopped.is_set() or self.loop.is_closed():
+                        break
+                block.duration_ms = (time.perf_counter() - sent) * 1000
+                block.finished = True
+                _report(block)
+            self._stopped.wait(self.threshold / 4)
+        _forget(self)
+
+
+_watchdogs: Dict[int, Watchdog] = {}
+_watchdogs_lock = threading.Lock()
+_observers: List[Callable[[BlockEvent], None]] = []
+
+
+def add_observer(callback: Callable[[BlockEvent], None]) -> None:
+    """注册阻塞回调（在看门狗线程中、检测到阻塞时立即调用）"""
+    _observers.append(callback)
+
+
+def remove_observer(callback: Callable[[BlockEvent], None]) -> None:
+    if callback in _observers:
+        _observers.remove(callback)
+
+
+def _notify(block: BlockEvent) -> None:
+    for callback in list(_observers):
+        callback(block)
+
+
+def _report(block: BlockEvent) -> None:
+    metrics.record_loop_block(block.duration_ms / 1000)
+    logger.warning("事件循环被阻塞 %.1fms，阻塞时的调用栈：\n%s", block.duration_ms, block.stack)
+
+
+def _forget(watchdog: Watchdog) -> None:
+    with _watchdogs_lock:
+        if _watchdogs.get(id(watchdog.loop)) is watchdog:
+            del _watchdogs[id(watchdog.loop)]
+
+
+def ensure_watching(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """确保当前（或指定的）事件循环已有看门狗；需在事件循环线程中调用"""
+    if THRESHOLD_MS <= 0:
+        return
+    loop = loop or asyncio.get_running_loop()
+    if id(loop) in _watchdogs:
+        return
+    with _watchdogs_lock:
+        if id(loop) not in _watchdogs:
+            watchdog = Watchdog(loop, threading.get_ident(), THRESHOLD_MS)
+            _watchdogs[id(loop)] = watchdog
+            watchdog.start()
+
+
+def configure(threshold_ms: Optional[float] = None) -> None:
+    """调整阈值（如 pytest 插件中调低），已在运行的看门狗会被替换"""
+    global THRESHOLD_MS
+    if threshold_ms is not None:
+        THRESHOLD_MS = threshold_ms
+    with _watchdogs_lock:
+        for watchdog in _watchdogs.values():
+            watchdog.stop()
+        _watchdogs.clear()
@@ -0,0 +1,126 @@
+"""
+Prometheus 指标
+
+gunicorn 下每个 worker 是独立进程，进程内计数器无法反映整体情况。
+设置了 PROMETHEUS_MULTIPROC_DIR（gunicorn_config.py 会自动设置）时，prometheus_client
+以 mmap 文件的形式把各进程的指标写入该目录，/metrics 读取时汇总所有进程；
+未设置时（单进程开发环境）直接使用进程内的默认 registry。
+
+未安装 prometheus_client 时，所有记录函数均为空操作，/metrics 返回 404。
+"""
+import os
+from typing import Optional, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # pragma: no cover
+    Counter = None
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# 请求耗时桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 写语句耗时桶（秒）：SQLite 写锁等待发生在 busy_timeout 内，会体现为写语句耗时变长
+DB_WRITE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+if Counter is not None:
+    HTTP_REQUESTS = Counter(
+        "stg_http_requests_total", "HTTP 请求数", ["method", "route", "status"]
+    )
+    HTTP_LATENCY = Histogram(
+        "stg_http_request_duration_seconds", "HTTP 请求耗时", ["method", "route"], buckets=LATENCY_BUCKETS
+    )
+    DB_STATEMENTS = Counter(
+        "stg_db_statements_total", "执行的 SQL 语句数", ["method", "route"]
+    )
+    DB_TIME = Counter(
+        "stg_db_time_seconds_total", "请求中 SQL 语句累计耗时", ["method", "route"]
+    )
+    DB_WRITE_LATENCY = Histogram(
+        "stg_db_write_duration_seconds", "写语句耗时（含等待数据库写锁的时间）", buckets=DB_WRITE_BUCKETS
+    )
+    CACHE_REQUESTS = Counter(
+        "stg_cache_requests_total", "进程内缓存访问次数（命中率 = hit / 总数）", ["cache", "result"]
+    )
+    UPLOAD_BYTES = Counter(
+        "stg_upload_bytes_total", "已接收的上传字节数", ["kind"]
+    )
+    EMAIL_QUEUE_DEPTH = Gauge(
+        "stg_email_queue_depth", "email_outbox 中待发送的邮件数（由发信 leader 更新）", multiprocess_mode="livesum"
+    )
+    EMAILS = Counter(
+        "stg_emails_total", "邮件发送结果（sent / retry / failed）", ["result"]
+    )
+    LOOP_BLOCKS = Counter(
+        "stg_event_loop_blocked_total", "事件循环阻塞超过 STG_LOOP_BLOCK_MS 的次数"
+    )
+    LOOP_BLOCKED_TIME = Counter(
+        "stg_event_loop_blocked_seconds_total", "事件循环累计阻塞时长"
+    )
+
+
+def enabled() -> bool:
+    return Counter is not None
+
+
+def observe_request(method: str, route: str, status: int, elapsed: float, queries: int, db_time: float) -> None:
+    if Counter is None:
+        return
+    HTTP_REQUESTS.labels(method, route, str(status)).inc()
+    HTTP_LATENCY.labels(method, route).observe(elapsed)
+    if queries:
+        DB_STATEMENTS.labels(method, route).inc(queries)
+        DB_TIME.labels(method, route).inc(db_time)
+
+
+def observe_db_write(elapsed: float) -> None:
+    if Counter is not None:
+        DB_WRITE_LATENCY.observe(elapsed)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if Counter is not None:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_upload(kind: str, size: int) -> None:
+    if Counter is not None:
+        UPLOAD_BYTES.labels(kind).inc(size)
+
+
+def set_email_queue_depth(depth: int) -> None:
+    if Counter is not None:
+        EMAIL_QUEUE_DEPTH.set(depth)
+
+
+def record_email(result: str) -> None:
+    if Counter is not None:
+        EMAILS.labels(result).inc()
+
+
+def record_loop_block(elapsed: float) -> None:
+    if Counter is not None:
+        LOOP_BLOCKS.inc()
+        LOOP_BLOCKED_TIME.inc(elapsed)
+
+
+def render_latest() -> Optional[Tuple[bytes, str]]:
+    """生成 Prometheus 文本格式的指标，返回 (内容, Content-Type)；未安装 prometheus_client 时返回 None"""
+    if Counter is None:
+        return None
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
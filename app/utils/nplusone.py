@@ -0,0 +1,72 @@
+"""
+N+1 查询检测（开发 / 测试模式）
+
+通过 Session 的 do_orm_execute 事件统计每个请求中各关系（如 Comment.game）的加载次数：
+- 懒加载：模板里逐行访问 comment.game 等属性，每行一条查询
+- 逐行查询父对象时触发的 selectin 加载：循环里 db.query(Game)...first() 会让 Game.tags 等
+  默认 selectin 关系每次都再查一遍
+
+同一关系在一个请求内加载超过阈值即视为 N+1：warn 模式记录日志，raise 模式抛出 NPlusOneError。
+统计依附于 instrumentation 的请求上下文，请求之外（脚本、维护任务）不做检查。
+
+配置：
+- STG_NPLUSONE：off / warn / raise，默认 STG_DEBUG=true 时为 warn，否则 off
+- STG_NPLUSONE_THRESHOLD：同一关系允许的加载次数，默认 5
+"""
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.utils import instrumentation
+
+logger = logging.getLogger("stg.nplusone")
+
+MODES = ("off", "warn", "raise")
+
+MODE = os.getenv("STG_NPLUSONE", "warn" if instrumentation.DEBUG else "off").lower()
+THRESHOLD = int(os.getenv("STG_NPLUSONE_THRESHOLD", "5"))
+
+
+class NPlusOneError(RuntimeError):
+    """同一关系在一个请求内被重复加载（raise 模式）"""
+
+
+def _relationship_key(state: ORMExecuteState) -> str:
+    path = state.loader_strategy_path
+    if path is None or not len(path):
+        return "unknown"
+    return str(path[-1])
+
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    if MODE == "off" or not state.is_relationship_load:
+        return
+    stats = instrumentation.current_stats()
+    if stats is None:
+        return
+    key = _relationship_key(state)
+    count = stats.relationship_loads.get(key, 0) + 1
+    stats.relationship_loads[key] = count
+    # 只在刚超过阈值时报告一次，避免同一请求刷屏
+    if count != THRESHOLD + 1:
+        return
+    message = f"疑似 N+1 查询：{key} 在一个请求内加载超过 {THRESHOLD} 次，请在查询中使用 selectinload / joinedload"
+    if MODE == "raise":
+        raise NPlusOneError(message)
+    logger.warning(message)
+
+
+def configure(mode: Optional[str] = None, threshold: Optional[int] = None) -> None:
+    """调整检测模式 / 阈值并注册事件（可重复调用）"""
+    global MODE, THRESHOLD
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"STG_NPLUSONE 只能是 {', '.join(MODES)}")
+        MODE = mode
+    if threshold is not None:
+        THRESHOLD = threshold
+    if MODE != "off" and not event.contains(Session, "do_orm_execute", _on_orm_execute):
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
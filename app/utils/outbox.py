@@ -0,0 +1,284 @@
+"""
+邮件 outbox：请求只负责写入 email_outbox 表，SMTP 发送由后台线程完成
+
+- enqueue：在调用方的事务中写入一封待发送邮件（由调用方 commit），请求不再等待 SMTP
+- Dispatcher：每个 worker 启动一个线程，但只有拿到文件锁（fcntl.flock）的 worker 是发信 leader，
+  其他 worker 定期尝试接管（leader 退出 / 被回收时锁随进程释放）
+- leader 按批取出到期的邮件，整批复用同一个 SMTP 连接，连接空闲 SMTP_IDLE_SECONDS 后关闭；
+  发送失败按指数退避重试，超过 MAX_ATTEMPTS 次标记为 failed
+- 本 worker 写入邮件后 notify() 立即唤醒发信线程；其他 worker 写入的邮件在下一次轮询（POLL_SECONDS）时发送
+- stg_email_queue_depth 为待发送邮件数（由 leader 更新）
+- leader 每小时顺带做一次维护（只在一个 worker 中执行）：清理超过保留期的已发送邮件、过期的密码重置 token，
+  并按当前全站均值校正排行榜分数（rankings.refresh_scores）
+
+本地调试 / 测试可用 app.utils.smtp_sink 作为 SMTP 服务器。
+"""
+import logging
+import os
+import random
+import smtplib
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+from app.utils import metrics, rankings, reset_tokens
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger("stg.email")
+
+# 在 worker 中启动发信线程；设为 false 时需另行运行 python -m app.cli send-emails
+DISPATCHER_ENABLED = os.getenv("STG_EMAIL_DISPATCHER", "true").lower() == "true"
+
+# 轮询间隔（秒）、每批发送数、最大尝试次数
+POLL_SECONDS = float(os.getenv("STG_EMAIL_POLL_SECONDS", "2"))
+BATCH_SIZE = int(os.getenv("STG_EMAIL_BATCH_SIZE", "50"))
+MAX_ATTEMPTS = int(os.getenv("STG_EMAIL_MAX_ATTEMPTS", "8"))
+
+# 重试退避：30s、60s、120s……，最长 1 小时（带 ±20% 抖动）
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# SMTP 连接空闲多久后关闭；单次 SMTP 操作超时
+SMTP_IDLE_SECONDS = 30
+SMTP_TIMEOUT = 10
+
+# 已发送的邮件保留天数（之后由发信线程分批删除）
+RETENTION_DAYS = int(os.getenv("STG_EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+
+LOCK_PATH = os.getenv("STG_EMAIL_LOCK_PATH", os.path.join(tempfile.gettempdir(), "stg_email_outbox.lock"))
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def enqueue(db: Session, recipient: str, subject: str, html: str) -> models.EmailOutbox:
+    """写入一封待发送邮件（不提交，随调用方的事务一起提交）"""
+    message = models.EmailOutbox(recipient=recipient, subject=subject, html=html, next_attempt_at=_now())
+    db.add(message)
+    return message
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class SmtpTransport:
+    """复用一个 SMTP 连接发送多封邮件"""
+
+    def __init__(self, host: str, port: int, sender: str) -> None:
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.connection: Optional[smtplib.SMTP] = None
+        self.connections_opened = 0
+
+    def send(self, recipient: str, subject: str, html: str) -> None:
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.sender
+        message["To"] = recipient
+        message.set_content("请使用支持 HTML 的邮件客户端查看本邮件。")
+        message.add_alternative(html, subtype="html")
+        if self.connection is None:
+            self.connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            self.connections_opened += 1
+        try:
+            self.connection.send_message(message)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError):
+            # 连接级错误（服务器断开、4xx/5xx 响应后连接状态不确定）：丢弃连接，下次重连
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self.connection.close()
+            self.connection = None
+
+
+def default_transport() -> SmtpTransport:
+    from app.email_utils import LOCAL_MAIL_HOST, LOCAL_MAIL_PORT, SENDER_ADDRESS
+
+    return SmtpTransport(LOCAL_MAIL_HOST, LOCAL_MAIL_PORT, SENDER_ADDRESS)
+
+
+def pending_count(db: Session) -> int:
+    return db.query(func.count(models.EmailOutbox.id)).filter(models.EmailOutbox.status == "pending").scalar()
+
+
+def dispatch_once(db: Session, transport: SmtpTransport, batch_size: int = BATCH_SIZE) -> int:
+    """发送一批到期的邮件，返回本批取出的邮件数（等于 batch_size 时说明可能还有更多）"""
+    batch = (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.status == "pending", models.EmailOutbox.next_attempt_at <= _now())
+        .order_by(models.EmailOutbox.next_attempt_at, models.EmailOutbox.id)
+        .limit(batch_size)
+        .all()
+    )
+    for message in batch:
+        message.attempts += 1
+        try:
+            transport.send(message.recipient, message.subject, message.html)
+        except (smtplib.SMTPException, OSError) as e:
+            message.last_error = f"{type(e).__name__}: {e}"[:1000]
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = "failed"
+                metrics.record_email("failed")
+                logger.error("邮件发送失败（已放弃）#%s -> %s：%s", message.id, message.recipient, message.last_error)
+            else:
+                message.next_attempt_at = _now() + timedelta(seconds=retry_delay(message.attempts))
+                metrics.record_email("retry")
+                logger.warning("邮件发送失败（第 %s 次）#%s：%s", message.attempts, message.id, message.last_error)
+        else:
+            message.status = "sent"
+            message.sent_at = _now()
+            message.last_error = None
+            metrics.record_email("sent")
+        # 逐封提交：进程中途退出时已发送的邮件不会被重复发送
+        db.commit()
+    metrics.set_email_queue_depth(pending_count(db))
+    return len(batch)
+
+
+def purge_sent(db: Session, retention_days: int = RETENTION_DAYS, batch_size: int = 1000) -> int:
+    """分批删除超过保留期的已发送邮件，返回删除数"""
+    cutoff = _now() - timedelta(days=retention_days)
+    removed = 0
+    while True:
+        ids = [
+            row[0]
+            for row in db.query(models.EmailOutbox.id)
+            .filter(models.EmailOutbox.status == "sent", models.EmailOutbox.sent_at < cutoff)
+            .limit(batch_size)
+            .all()
+        ]
+        if not ids:
+            return removed
+        db.query(models.EmailOutbox).filter(models.EmailOutbox.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        removed += len(ids)
+
+
+def drain(transport: Optional[SmtpTransport] = None) -> int:
+    """把当前到期的邮件全部尝试发送一遍（命令行 / 测试使用），返回处理的邮件数"""
+    transport = transport or default_transport()
+    db = SessionLocal()
+    try:
+        total = 0
+        while True:
+            count = dispatch_once(db, transport)
+            total += count
+            if count < BATCH_SIZE:
+                return total
+    finally:
+        transport.close()
+        db.close()
+
+
+class Dispatcher(threading.Thread):
+    """发信线程：拿到 leader 锁后循环发送，没拿到时定期重试"""
+
+    def __init__(self, transport_factory=default_transport, lock_path: str = LOCK_PATH) -> None:
+        super().__init__(name="stg-email-dispatcher", daemon=True)
+        self.transport_factory = transport_factory
+        self.lock_path = lock_path
+        self.wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock_file = None
+        self._last_purge = None
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.wake.set()
+
+    def _acquire_leadership(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        logger.info("进程 %s 成为发信 leader", os.getpid())
+        return True
+
+    def run(self) -> None:
+        transport = self.transport_factory()
+        idle_since = None
+        try:
+            while not self._stopped.is_set():
+                if not self._acquire_leadership():
+                    self._stopped.wait(POLL_SECONDS * 5)
+                    continue
+                count = 0
+                db = SessionLocal()
+                try:
+                    count = dispatch_once(db, transport)
+                    if self._last_purge is None or _now() - self._last_purge > timedelta(hours=1):
+                        self._last_purge = _now()
+                        purge_sent(db)
+                        reset_tokens.purge_expired(db)
+                        rankings.refresh_scores(db)
+                        db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("发信线程出错")
+                finally:
+                    db.close()
+                if count >= BATCH_SIZE:
+                    continue
+                # 连接空闲一段时间后关闭，避免长期占用本地 MTA 的连接
+                if count:
+                    idle_since = _now()
+                elif idle_since and _now() - idle_since > timedelta(seconds=SMTP_IDLE_SECONDS):
+                    transport.close()
+                    idle_since = None
+                self.wake.wait(POLL_SECONDS)
+                self.wake.clear()
+        finally:
+            transport.close()
+            if self._lock_file is not None:
+                self._lock_file.close()
+
+
+_dispatcher: Optional[Dispatcher] = None
+
+
+def start_dispatcher() -> None:
+    """在当前 worker 中启动发信线程（fork 之后调用，锁不能由 gunicorn master 持有）"""
+    global _dispatcher
+    if DISPATCHER_ENABLED and _dispatcher is None:
+        _dispatcher = Dispatcher()
+        _dispatcher.start()
+
+
+def stop_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher.join(timeout=SMTP_TIMEOUT)
+        _dispatcher = None
+
+
+def notify() -> None:
+    """本 worker 刚写入了邮件：立即唤醒发信线程（非 leader 时无作用，由 leader 轮询发送）"""
+    if _dispatcher is not None:
+        _dispatcher.wake.set()
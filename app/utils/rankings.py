@@ -0,0 +1,268 @@
+"""
+排行榜：基于预计算表 game_rankings 的贝叶斯平均排名
+
+每个游戏在 game_rankings 中保存品质 / 难度评分的条数与「每条评分各维度均值」之和，
+评分写入或撤销时在同一事务内按差值增量更新（record_quality / record_difficulty），
+并重新计算该游戏的贝叶斯平均：
+
+    score = (PRIOR_WEIGHT * 全站均值 + sum) / (PRIOR_WEIGHT + count)
+
+全站均值取自单行汇总表 ranking_totals，与 game_rankings 按相同差值同步更新，
+评分写入时只读写两行（该游戏与汇总），不扫描 game_rankings。
+
+评分条数少的游戏会被拉向全站均值，不再需要「至少 N 条评分」这类硬阈值来压制偶然的高分。
+全站均值变化后，其他游戏的分数由 refresh_scores 统一校正（变化通常很小）：
+邮件 outbox 的 leader 线程每小时调用一次（见 app/utils/outbox.py），也可手工运行 rebuild_rankings。
+
+排行榜（首页热门、/leaderboard、/api/v1/leaderboard）直接按 *_score 索引排序，
+可按标签 / 公司筛选，不再对评分表做 GROUP BY。
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import upsert_insert
+from app.models import game_tag_association
+from app.utils.ratings import DIFFICULTY_FIELDS, QUALITY_FIELDS, get_difficulty_realm
+
+# 先验权重：相当于给每个游戏预先加上多少条「全站均值」评分
+PRIOR_WEIGHT = float(os.getenv("STG_RANKING_PRIOR_WEIGHT", "5"))
+
+# 进入排行榜所需的最少评分条数
+MIN_RATINGS = int(os.getenv("STG_RANKING_MIN_RATINGS", "3"))
+
+KINDS = ("quality", "difficulty")
+
+_COLUMNS = {
+    "quality": (models.GameRanking.quality_count, models.GameRanking.quality_sum, models.GameRanking.quality_score),
+    "difficulty": (
+        models.GameRanking.difficulty_count, models.GameRanking.difficulty_sum, models.GameRanking.difficulty_score
+    ),
+}
+
+
+# --- 单条评分的取值 ---
+
+def quality_value(rating: Optional[models.QualityRating]) -> Optional[float]:
+    """品质评分的综合分：五个维度的均值，任一维度缺失则不计入（与 SQL 中 NULL 的处理一致）"""
+    if rating is None:
+        return None
+    values = [getattr(rating, field) for field in QUALITY_FIELDS]
+    if any(value is None for value in values):
+        return None
+    return sum(values) / len(values)
+
+
+def difficulty_value(rating: Optional[models.DifficultyRating]) -> Optional[float]:
+    """难度评分的综合分：有效维度的均值，全部缺失则不计入"""
+    if rating is None:
+        return None
+    values = [getattr(rating, field) for field in DIFFICULTY_FIELDS if getattr(rating, field) is not None]
+    return sum(values) / len(values) if values else None
+
+
+# --- 增量更新 ---
+
+def _prior(count: int, total: float) -> float:
+    return float(total) / count if count else 0.0
+
+
+def _prior_mean(db: Session, kind: str) -> float:
+    totals = db.get(models.RankingTotals, kind)
+    return _prior(totals.count, totals.sum) if totals else 0.0
+
+
+def _add_totals(db: Session, kind: str, delta_count: int, delta_sum: float) -> float:
+    """按差值更新全站汇总，返回更新后的全站均值（UPDATE ... RETURNING，一条语句）"""
+    table = models.RankingTotals.__table__
+    row = db.execute(
+        table.update()
+        .where(table.c.kind == kind)
+        .values(count=table.c.count + delta_count, sum=table.c.sum + delta_sum)
+        .returning(table.c.count, table.c.sum)
+    ).first()
+    if row is None:
+        # 汇总行由迁移 / rebuild 写入；缺失时按本次差值补建（并发补建时 ON CONFLICT 退回累加）
+        insert = upsert_insert(db, models.RankingTotals).values(kind=kind, count=delta_count, sum=delta_sum)
+        db.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.kind],
+            set_={"count": table.c.count + delta_count, "sum": table.c.sum + delta_sum},
+        ))
+        return _prior_mean(db, kind)
+    return _prior(row.count, row.sum)
+
+
+def _score_expression(kind: str, prior: float):
+    count_col, sum_col, _ = _COLUMNS[kind]
+    return case(
+        (count_col > 0, (PRIOR_WEIGHT * prior + sum_col) / (PRIOR_WEIGHT + count_col)),
+        else_=None,
+    )
+
+
+def _record_change(db: Session, game_id: int, kind: str, old: Optional[float], new: Optional[float]) -> None:
+    delta_count = (new is not None) - (old is not None)
+    delta_sum = (new or 0.0) - (old or 0.0)
+    if not delta_count and not delta_sum:
+        return
+    count_col, sum_col, score_col = _COLUMNS[kind]
+
+    # 行不存在时先插入空行；并发写入时 ON CONFLICT 保证只插入一次
+    db.execute(upsert_insert(db, models.GameRanking).values(game_id=game_id).on_conflict_do_nothing())
+    ranking = db.query(models.GameRanking).filter(models.GameRanking.game_id == game_id)
+    ranking.update(
+        {count_col: count_col + delta_count, sum_col: sum_col + delta_sum},
+        synchronize_session=False,
+    )
+    prior = _add_totals(db, kind, delta_count, delta_sum)
+    ranking.update({score_col: _score_expression(kind, prior)}, synchronize_session=False)
+
+
+def record_quality(db: Session, game_id: int, old: Optional[float], new: Optional[float]) -> None:
+    """
+    品质评分变更后更新排行（在调用方 commit 之前调用，与评分写入同一事务）。
+    old / new 为 quality_value 的结果：新增评分 old=None，撤销评分 new=None。
+    """
+    _record_change(db, game_id, "quality", old, new)
+
+
+def record_difficulty(db: Session, game_id: int, old: Optional[float], new: Optional[float]) -> None:
+    """难度评分变更后更新排行，参数含义同 record_quality"""
+    _record_change(db, game_id, "difficulty", old, new)
+
+
+def forget_game(db: Session, game_id: int) -> None:
+    """删除游戏时移除其排行行，并从全站汇总中扣除（不提交）"""
+    ranking = db.query(models.GameRanking).filter(models.GameRanking.game_id == game_id).first()
+    if ranking is None:
+        return
+    for kind in KINDS:
+        count_col, sum_col, _ = _COLUMNS[kind]
+        _add_totals(db, kind, -getattr(ranking, count_col.key), -getattr(ranking, sum_col.key))
+    db.delete(ranking)
+
+
+# --- 全量重建 ---
+
+def _quality_aggregates(db: Session) -> List[Tuple[int, int, float]]:
+    per_rating = sum(getattr(models.QualityRating, field) for field in QUALITY_FIELDS) / float(len(QUALITY_FIELDS))
+    return db.query(
+        models.QualityRating.game_id, func.count(per_rating), func.coalesce(func.sum(per_rating), 0.0)
+    ).group_by(models.QualityRating.game_id).all()
+
+
+def _difficulty_aggregates(db: Session) -> List[Tuple[int, int, float]]:
+    columns = [getattr(models.DifficultyRating, field) for field in DIFFICULTY_FIELDS]
+    valid_dims = sum(case((column.isnot(None), 1), else_=0) for column in columns)
+    total = sum(func.coalesce(column, 0) for column in columns)
+    per_rating = total * 1.0 / func.nullif(valid_dims, 0)
+    return db.query(
+        models.DifficultyRating.game_id, func.count(per_rating), func.coalesce(func.sum(per_rating), 0.0)
+    ).group_by(models.DifficultyRating.game_id).all()
+
+
+def refresh_scores(db: Session) -> None:
+    """按当前全站均值重新计算所有游戏的贝叶斯分数（不提交）"""
+    for kind in KINDS:
+        score_col = _COLUMNS[kind][2]
+        db.query(models.GameRanking).update(
+            {score_col: _score_expression(kind, _prior_mean(db, kind))}, synchronize_session=False
+        )
+
+
+def rebuild(db: Session) -> int:
+    """从评分表全量重建 game_rankings 并提交，返回写入的行数"""
+    rows: Dict[int, Dict[str, Any]] = {}
+    for kind, aggregates in (("quality", _quality_aggregates(db)), ("difficulty", _difficulty_aggregates(db))):
+        for game_id, count, total in aggregates:
+            row = rows.setdefault(game_id, {"game_id": game_id})
+            row[f"{kind}_count"] = count
+            row[f"{kind}_sum"] = float(total)
+
+    db.query(models.GameRanking).delete(synchronize_session=False)
+    db.query(models.RankingTotals).delete(synchronize_session=False)
+    db.execute(models.RankingTotals.__table__.insert(), [
+        {
+            "kind": kind,
+            "count": sum(row.get(f"{kind}_count", 0) for row in rows.values()),
+            "sum": sum(row.get(f"{kind}_sum", 0.0) for row in rows.values()),
+        }
+        for kind in KINDS
+    ])
+    if rows:
+        db.execute(models.GameRanking.__table__.insert(), [
+            {
+                "quality_count": 0, "quality_sum": 0.0, "difficulty_count": 0, "difficulty_sum": 0.0,
+                **row,
+            }
+            for row in rows.values()
+        ])
+    refresh_scores(db)
+    db.commit()
+    return len(rows)
+
+
+def ensure_rankings(db: Session) -> None:
+    """部署时（init-db）回填：排行表为空但已有评分（例如刚升级到带排行表的版本）时全量重建"""
+    if db.query(models.GameRanking.game_id).first() is not None:
+        return
+    has_ratings = (
+        db.query(models.QualityRating.id).first() is not None
+        or db.query(models.DifficultyRating.id).first() is not None
+    )
+    if has_ratings:
+        rebuild(db)
+
+
+# --- 查询 ---
+
+def leaderboard(
+    db: Session,
+    kind: str = "quality",
+    tag: Optional[str] = None,
+    company: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    min_ratings: int = MIN_RATINGS,
+) -> Tuple[int, List[Tuple[models.GameRanking, models.Game]]]:
+    """按贝叶斯分数降序返回 (总数, [(排行行, 游戏), ...])，可按标签名 / 公司筛选"""
+    if kind not in _COLUMNS:
+        raise ValueError(f"未知的排行类型: {kind}")
+    count_col, _, score_col = _COLUMNS[kind]
+
+    query = db.query(models.GameRanking, models.Game).join(
+        models.Game, models.Game.id == models.GameRanking.game_id
+    ).filter(score_col.isnot(None), count_col >= max(1, min_ratings))
+    if tag:
+        query = query.join(
+            game_tag_association, game_tag_association.c.game_id == models.GameRanking.game_id
+        ).join(models.Tag, models.Tag.id == game_tag_association.c.tag_id).filter(models.Tag.name == tag)
+    if company:
+        query = query.filter(models.Game.company == company)
+
+    total = query.count()
+    rows = query.order_by(score_col.desc(), count_col.desc(), models.GameRanking.game_id).offset(offset).limit(limit).all()
+    return total, rows
+
+
+def entry(ranking: models.GameRanking, game: models.Game, kind: str = "quality") -> Dict[str, Any]:
+    """排行行转换为模板 / API 使用的字典：score 为贝叶斯分数，mean 为原始均分"""
+    count_col, sum_col, score_col = _COLUMNS[kind]
+    count = getattr(ranking, count_col.key)
+    score = getattr(ranking, score_col.key)
+    data = {
+        "game": game,
+        "game_id": game.id,
+        "title": game.title,
+        "company": game.company,
+        "image_url": game.image_url,
+        "score": round(score, 2),
+        "mean": round(getattr(ranking, sum_col.key) / count, 2) if count else 0.0,
+        "rating_count": count,
+    }
+    if kind == "difficulty":
+        data["realm"] = get_difficulty_realm(score)
+    return data
@@ -0,0 +1,179 @@
+"""
+令牌桶限流（按客户端 IP / 登录用户）
+
+登录、注册、密码重置、发表评论、资源投票没有任何频率限制时，恶意客户端可以把 bcrypt CPU
+和 SQLite 写锁压满。这里为这些路由加令牌桶：
+
+    @router.post("/login", dependencies=[Depends(ratelimit.limit("login"))])
+
+- 桶状态保存在临时目录下的一个独立 SQLite 文件（STG_RATELIMIT_DB），所有 gunicorn worker 共享；
+  WAL + synchronous=OFF，每次检查是一个 BEGIN IMMEDIATE 短事务（补充令牌、判断、扣减原子完成），
+  不经过业务数据库，也不受业务写锁影响
+- 同时按 IP 与用户限流时，所有桶都有令牌才一起扣减：被用户桶拒绝的请求不消耗 IP 桶的令牌
+- 依赖是同步函数，在线程池中执行，不阻塞事件循环
+- 超限返回 429，Retry-After 为攒够一个令牌所需的秒数
+- 限流库出错（例如文件不可写）时放行并记录日志，不影响正常登录
+
+规则在 RULES 中定义，可用环境变量覆盖，例如 STG_RATELIMIT_LOGIN_IP=20/60（60 秒内 20 次，突发上限 20）；
+STG_RATELIMIT_ENABLED=false 关闭全部限流。
+"""
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+logger = logging.getLogger("stg.ratelimit")
+
+ENABLED = os.getenv("STG_RATELIMIT_ENABLED", "true").lower() == "true"
+DB_PATH = os.getenv("STG_RATELIMIT_DB") or os.path.join(tempfile.gettempdir(), "stg_ratelimit.db")
+
+# 桶空闲超过这么久（秒）后删除；每次检查以 1/CLEANUP_EVERY 的概率顺带清理
+IDLE_EXPIRY = 24 * 3600
+CLEANUP_EVERY = 1000
+
+
+@dataclass(frozen=True)
+class Rule:
+    """period 秒内最多 count 次（突发上限 count，之后按 count / period 每秒匀速补充）"""
+    count: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.period
+
+    @classmethod
+    def parse(cls, text: str) -> "Rule":
+        count, _, period = text.partition("/")
+        return cls(int(count), float(period))
+
+
+# 路由 -> (按 IP 的规则, 按登录用户的规则)；None 表示该维度不限
+RULES: Dict[str, Tuple[Optional[Rule], Optional[Rule]]] = {
+    "login": (Rule(10, 60), None),
+    "register": (Rule(5, 3600), None),
+    "password_reset": (Rule(5, 900), None),
+    "comment": (Rule(30, 60), Rule(10, 60)),
+    "vote": (Rule(60, 60), Rule(30, 60)),
+}
+
+
+def _rule_from_env(name: str, scope: str, default: Optional[Rule]) -> Optional[Rule]:
+    value = os.getenv(f"STG_RATELIMIT_{name.upper()}_{scope}")
+    if value is None:
+        return default
+    return Rule.parse(value) if value not in ("", "0", "off") else None
+
+
+_SAVE_SQL = """
+INSERT INTO token_buckets (key, tokens, updated) VALUES (?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated
+"""
+
+
+class SqliteBucketStore:
+    """跨进程共享的令牌桶，每个线程一个连接"""
+
+    def __init__(self, path: str = DB_PATH) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def take_all(self, checks: List[Tuple[str, Rule]], now: Optional[float] = None) -> float:
+        """
+        从每个桶各取一个令牌：全部有令牌时才一起扣减并返回 0；
+        否则不扣减任何桶，返回最长需要等待的秒数
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            available = []
+            for key, rule in checks:
+                row = connection.execute("SELECT tokens, updated FROM token_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = rule.count if row is None else min(rule.count, row[0] + max(0.0, now - row[1]) * rule.rate)
+                available.append((key, rule, tokens))
+            wait = max(((1 - tokens) / rule.rate for _, rule, tokens in available if tokens < 1), default=0.0)
+            if not wait:
+                connection.executemany(_SAVE_SQL, [(key, tokens - 1, now) for key, _, tokens in available])
+            if random.randrange(CLEANUP_EVERY) == 0:
+                connection.execute("DELETE FROM token_buckets WHERE updated < ?", (now - IDLE_EXPIRY,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+    def take(self, key: str, rule: Rule, now: Optional[float] = None) -> float:
+        """取一个令牌：放行返回 0，否则返回需要等待的秒数"""
+        return self.take_all([(key, rule)], now)
+
+    def reset(self) -> None:
+        self._connection().execute("DELETE FROM token_buckets")
+
+
+store = SqliteBucketStore()
+
+
+def client_ip(request: Request) -> str:
+    # 反向代理（Caddy）后由 uvicorn 的 proxy_headers 还原为真实客户端地址
+    return request.client.host if request.client else "unknown"
+
+
+def check(request: Request, name: str) -> None:
+    """按 name 对应的规则检查当前请求，超限时抛出 429"""
+    if not ENABLED:
+        return
+    ip_rule, user_rule = RULES[name]
+    ip_rule = _rule_from_env(name, "IP", ip_rule)
+    user_rule = _rule_from_env(name, "USER", user_rule)
+    user = getattr(request.state, "user", None)
+    checks = []
+    if ip_rule is not None:
+        checks.append((f"{name}:ip:{client_ip(request)}", ip_rule))
+    if user_rule is not None and user is not None:
+        checks.append((f"{name}:user:{user.id}", user_rule))
+    if not checks:
+        return
+    try:
+        wait = store.take_all(checks)
+    except sqlite3.Error:
+        logger.warning("限流存储不可用，放行请求", exc_info=True)
+        return
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="请求过于频繁，请稍后再试。",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+
+def limit(name: str) -> Callable[[Request], None]:
+    """路由依赖：dependencies=[Depends(ratelimit.limit("login"))]"""
+    if name not in RULES:
+        raise KeyError(f"未定义的限流规则：{name}")
+
+    def dependency(request: Request) -> None:
+        check(request, name)
+
+    return dependency
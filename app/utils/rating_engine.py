@@ -0,0 +1,259 @@
+"""
+批量评分聚合引擎
+
+不加载 ORM 评分对象，而是用一条查询取回评分列（game_id, 难度等级, 机体, 各维度分数），
+再按 (游戏, 难度等级, 机体) 分组计算均值、计数与段位。安装了 NumPy 时用 np.unique + np.bincount
+向量化完成分组聚合，否则退回纯 Python 实现，两者输出一致。
+
+输出结构与 app.utils.ratings 中的 get_game_evaluation / 统计页保持一致，可直接替换。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.ratings import (
+    DIFFICULTY_CATEGORIES,
+    DIFFICULTY_FIELDS,
+    QUALITY_CATEGORIES,
+    QUALITY_FIELDS,
+    get_difficulty_realm,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# (game_id, difficulty_level_id, ship_type_id, dodge, strategy, execution)，id 为空时记为 0
+DifficultyRow = Tuple[int, int, int, Optional[int], Optional[int], Optional[int]]
+# (game_id, fun, core, depth, performance, story)
+QualityRow = Tuple[int, int, int, int, int, int]
+
+
+# --- 取数 ---
+
+def fetch_difficulty_rows(db: Session, game_ids: Optional[Iterable[int]] = None) -> List[DifficultyRow]:
+    """一次查询取回难度评分列"""
+    query = db.query(
+        models.DifficultyRating.game_id,
+        func.coalesce(models.DifficultyRating.difficulty_level_id, 0),
+        func.coalesce(models.DifficultyRating.ship_type_id, 0),
+        *(getattr(models.DifficultyRating, field) for field in DIFFICULTY_FIELDS),
+    )
+    if game_ids is not None:
+        query = query.filter(models.DifficultyRating.game_id.in_(list(game_ids)))
+    return [tuple(row) for row in query.all()]
+
+
+def fetch_quality_rows(db: Session, game_ids: Optional[Iterable[int]] = None) -> List[QualityRow]:
+    """一次查询取回品质评分列"""
+    query = db.query(
+        models.QualityRating.game_id,
+        *(getattr(models.QualityRating, field) for field in QUALITY_FIELDS),
+    )
+    if game_ids is not None:
+        query = query.filter(models.QualityRating.game_id.in_(list(game_ids)))
+    return [tuple(row) for row in query.all()]
+
+
+# --- 难度：按情境分组 ---
+
+def _context_stats_numpy(rows: Sequence[DifficultyRow]) -> Dict[int, List[dict]]:
+    data = np.array(rows, dtype=float)  # None -> NaN
+    keys = data[:, :3].astype(np.int64)
+    groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_groups = len(groups)
+
+    values = data[:, 3:]
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    rating_counts = np.bincount(inverse, minlength=n_groups)
+    sums = np.stack([np.bincount(inverse, weights=filled[:, i], minlength=n_groups) for i in range(values.shape[1])], axis=1)
+    counts = np.stack([np.bincount(inverse, weights=valid[:, i], minlength=n_groups) for i in range(values.shape[1])], axis=1)
+    means = sums / np.maximum(counts, 1)
+
+    result: Dict[int, List[dict]] = {}
+    for index, (game_id, diff_id, ship_id) in enumerate(groups.tolist()):
+        result.setdefault(game_id, []).append({
+            "difficulty_level_id": diff_id,
+            "ship_type_id": ship_id,
+            "rating_count": int(rating_counts[index]),
+            # 没有有效分数的维度记为整数 0，与原有实现的输出保持一致
+            "averages": [float(v) if c else 0 for v, c in zip(means[index], counts[index])],
+            "counts": [int(c) for c in counts[index]],
+        })
+    return result
+
+
+def _context_stats_python(rows: Sequence[DifficultyRow]) -> Dict[int, List[dict]]:
+    n_dims = len(DIFFICULTY_FIELDS)
+    acc: Dict[Tuple[int, int, int], list] = {}
+    for row in rows:
+        key = (row[0], row[1], row[2])
+        entry = acc.get(key)
+        if entry is None:
+            entry = acc[key] = [0, [0] * n_dims, [0] * n_dims]
+        entry[0] += 1
+        for i, value in enumerate(row[3:]):
+            if value is not None:
+                entry[1][i] += value
+                entry[2][i] += 1
+
+    result: Dict[int, List[dict]] = {}
+    for (game_id, diff_id, ship_id), (rating_count, sums, counts) in sorted(acc.items()):
+        result.setdefault(game_id, []).append({
+            "difficulty_level_id": diff_id,
+            "ship_type_id": ship_id,
+            "rating_count": rating_count,
+            "averages": [s / c if c else 0 for s, c in zip(sums, counts)],
+            "counts": counts,
+        })
+    return result
+
+
+def difficulty_context_stats(rows: Sequence[DifficultyRow]) -> Dict[int, List[dict]]:
+    """
+    按 (游戏, 难度等级, 机体) 分组统计。
+
+    返回 {game_id: [情境, ...]}，情境按 (难度等级 id, 机体 id) 升序，
+    每个情境包含 rating_count、各维度均值 averages 与有效计数 counts（顺序同 DIFFICULTY_FIELDS）。
+    """
+    if not rows:
+        return {}
+    if np is not None:
+        return _context_stats_numpy(rows)
+    return _context_stats_python(rows)
+
+
+def overall_difficulty_scores(rows: Sequence[DifficultyRow]) -> Dict[int, float]:
+    """每个游戏的总体难度均分：先对每条评分的有效维度取平均，再对所有有效评分取平均"""
+    if not rows:
+        return {}
+    if np is not None:
+        data = np.array(rows, dtype=float)
+        values = data[:, 3:]
+        valid = ~np.isnan(values)
+        dims = valid.sum(axis=1)
+        mask = dims > 0
+        row_means = np.nansum(values[mask], axis=1) / dims[mask]
+        game_ids, inverse = np.unique(data[mask, 0].astype(np.int64), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        sums = np.bincount(inverse, weights=row_means, minlength=len(game_ids))
+        counts = np.bincount(inverse, minlength=len(game_ids))
+        return {int(g): float(s / c) for g, s, c in zip(game_ids, sums, counts)}
+
+    acc: Dict[int, list] = {}
+    for row in rows:
+        dims = [d for d in row[3:] if d is not None]
+        if dims:
+            entry = acc.setdefault(row[0], [0.0, 0])
+            entry[0] += sum(dims) / len(dims)
+            entry[1] += 1
+    return {game_id: total / count for game_id, (total, count) in acc.items()}
+
+
+def context_data(context: dict) -> Dict[str, Any]:
+    """把分组结果转换为 get_game_evaluation 中 difficulty_scores_by_context 的单项结构"""
+    category_scores = []
+    for cat_name, avg, count in zip(DIFFICULTY_CATEGORIES, context["averages"], context["counts"]):
+        category_scores.append({
+            "category": cat_name,
+            "raw_value": round(avg, 2),
+            "count": count,
+            "value": get_difficulty_realm(avg),
+        })
+    valid = [score["raw_value"] for score in category_scores if score["count"] > 0]
+    return {
+        "difficulty_level_id": context["difficulty_level_id"],
+        "ship_type_id": context["ship_type_id"],
+        "categories": category_scores,
+        "overall_avg": round(sum(valid) / len(valid), 2) if valid else 0.0,
+        "total_ratings": context["rating_count"],
+    }
+
+
+# --- 品质 ---
+
+def quality_stats(rows: Sequence[QualityRow]) -> Dict[int, dict]:
+    """每个游戏的品质评分：count、各维度均值 averages（顺序同 QUALITY_FIELDS）与总体均分 overall"""
+    if not rows:
+        return {}
+    if np is not None:
+        data = np.array(rows, dtype=float)
+        game_ids, inverse = np.unique(data[:, 0].astype(np.int64), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(game_ids))
+        sums = np.stack(
+            [np.bincount(inverse, weights=data[:, i + 1], minlength=len(game_ids)) for i in range(len(QUALITY_FIELDS))],
+            axis=1,
+        )
+        row_means = data[:, 1:].sum(axis=1) / len(QUALITY_FIELDS)
+        overall = np.bincount(inverse, weights=row_means, minlength=len(game_ids))
+        return {
+            int(g): {
+                "count": int(c),
+                "averages": [float(s) / int(c) for s in sums[i]],
+                "overall": float(overall[i]) / int(c),
+            }
+            for i, (g, c) in enumerate(zip(game_ids, counts))
+        }
+
+    acc: Dict[int, list] = {}
+    for row in rows:
+        entry = acc.setdefault(row[0], [0, [0] * len(QUALITY_FIELDS), 0.0])
+        entry[0] += 1
+        for i, value in enumerate(row[1:]):
+            entry[1][i] += value
+        entry[2] += sum(row[1:]) / len(QUALITY_FIELDS)
+    return {
+        game_id: {"count": count, "averages": [s / count for s in sums], "overall": overall / count}
+        for game_id, (count, sums, overall) in acc.items()
+    }
+
+
+# --- 组合 ---
+
+def evaluate_game(db: Session, game: models.Game) -> Dict[str, Any]:
+    """
+    与 ratings.get_game_evaluation 输出相同的结构，但评分直接按列查询，
+    调用方无需 selectinload(Game.quality_ratings / Game.difficulty_ratings)。
+    """
+    quality = quality_stats(fetch_quality_rows(db, [game.id])).get(game.id)
+    difficulty_rows = fetch_difficulty_rows(db, [game.id])
+    evaluation: Dict[str, Any] = {}
+
+    if quality:
+        count = quality["count"]
+        evaluation["quality_ratings_count"] = count
+        evaluation["overall_quality_score"] = round(quality["overall"], 2)
+        evaluation["quality_scores"] = [
+            {"category": cat, "raw_value": round(avg, 2), "count": count}
+            for cat, avg in zip(QUALITY_CATEGORIES, quality["averages"])
+        ]
+    else:
+        evaluation["quality_ratings_count"] = 0
+        evaluation["overall_quality_score"] = 0.0
+        evaluation["quality_scores"] = [{"category": cat, "raw_value": 0, "count": 0} for cat in QUALITY_CATEGORIES]
+
+    evaluation["comments"] = sorted([{
+        "id": c.id, "content": c.content,
+        "user_id": c.author_id, "user_name": c.user_name
+    } for c in game.comments], key=lambda x: x["id"], reverse=True)
+
+    evaluation["difficulty_scores_by_context"] = {
+        f"d{ctx['difficulty_level_id']}_s{ctx['ship_type_id']}": context_data(ctx)
+        for ctx in difficulty_context_stats(difficulty_rows).get(game.id, [])
+    }
+
+    overall = overall_difficulty_scores(difficulty_rows).get(game.id)
+    if difficulty_rows:
+        overall_score = round(overall, 2) if overall is not None else 0.0
+        evaluation["overall_difficulty_score"] = overall_score
+        evaluation["overall_difficulty_realm"] = get_difficulty_realm(overall_score).split(" ")[0]
+    else:
+        evaluation["overall_difficulty_score"] = 0.0
+        evaluation["overall_difficulty_realm"] = "N/A"
+    return evaluation
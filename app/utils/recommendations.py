@@ -0,0 +1,267 @@
+"""
+个性化推荐：对「用户 × 游戏」品质评分矩阵做协同过滤
+
+离线任务（python -m app.maintenance.train_recommendations）读取全部品质评分，
+每条评分取五个维度的均值，去掉全站均值与（带阻尼的）游戏偏置后，
+用交替最小二乘（ALS，按评分数加权的 L2 正则）分解为用户 / 游戏隐向量。
+预测分 = 全站均值 + 游戏偏置 + 用户向量 · 游戏向量，为每个用户取未评分游戏中预测分最高的前 N 个，
+写入 user_recommendations 表；用户主页与 /api/v1/me/recommendations 只读该表。
+
+稀疏矩阵用按行 / 按列排序的 COO 数组表示（等价于 CSR / CSC，不依赖 SciPy）。
+ALS 每一侧的最小二乘用共轭梯度近似求解（以上一轮结果为起点，每轮 CG_STEPS 步），
+所有行一起向量化计算，不构造逐行的 Gram 矩阵，全部在 CPU 上完成。
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.ratings import QUALITY_FIELDS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# 隐向量维度
+FACTORS = int(os.getenv("STG_RECOMMENDATION_FACTORS", "32"))
+
+# ALS 迭代次数
+ITERATIONS = int(os.getenv("STG_RECOMMENDATION_ITERATIONS", "10"))
+
+# 每个用户保存的推荐数
+TOP_N = int(os.getenv("STG_RECOMMENDATIONS", "10"))
+
+# 隐向量的 L2 正则系数（按每行评分数加权）
+REGULARIZATION = 0.1
+
+# 游戏偏置的阻尼：评分少的游戏偏置向 0 收缩
+BIAS_DAMPING = 5.0
+
+# 每轮 ALS 中每一侧的共轭梯度步数（以上一轮结果为起点，几步即可）
+CG_STEPS = 3
+
+# 生成推荐时每批计算的用户数（打分矩阵大小为 USER_BATCH × 游戏数 × 4 字节）
+USER_BATCH = 1024
+
+
+class RatingMatrix:
+    """稀疏评分矩阵：同一份 COO 数据分别按行、按列排序，供 ALS 两个方向使用"""
+
+    def __init__(self, rows: "np.ndarray", cols: "np.ndarray", values: "np.ndarray", n_rows: int, n_cols: int) -> None:
+        if np is None:
+            raise RuntimeError("推荐训练需要安装 numpy")
+        self.shape = (n_rows, n_cols)
+        self.nnz = len(values)
+        self.row_ptr, self.row_index, self.row_values = self._compress(rows, cols, values, n_rows)
+        self.col_ptr, self.col_index, self.col_values = self._compress(cols, rows, values, n_cols)
+
+    @staticmethod
+    def _compress(major, minor, values, size):
+        order = np.argsort(major, kind="stable")
+        ptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(major, minlength=size), out=ptr[1:])
+        return ptr, minor[order].astype(np.int64), values[order].astype(np.float32)
+
+
+@dataclass
+class Model:
+    user_ids: "np.ndarray"
+    game_ids: "np.ndarray"
+    user_factors: "np.ndarray"
+    game_factors: "np.ndarray"
+    game_bias: "np.ndarray"
+    mean: float
+
+
+def _segment_sum(ptr: "np.ndarray", nonempty: "np.ndarray", data: "np.ndarray", n_rows: int) -> "np.ndarray":
+    """按行累加已按行排序的逐评分数据（空行为 0）"""
+    out = np.zeros((n_rows,) + data.shape[1:], dtype=data.dtype)
+    if len(nonempty):
+        out[nonempty] = np.add.reduceat(data, ptr[nonempty], axis=0)
+    return out
+
+
+def _solve_side(
+    ptr: "np.ndarray",
+    index: "np.ndarray",
+    values: "np.ndarray",
+    fixed: "np.ndarray",
+    current: "np.ndarray",
+    reg: float,
+    steps: int = CG_STEPS,
+) -> "np.ndarray":
+    """
+    固定另一侧的隐向量，更新这一侧每一行的隐向量。
+
+    每行的正规方程 (Vᵀ V + reg · n · I) x = Vᵀ r 不显式构造 f × f 的 Gram 矩阵，
+    而是以上一轮的结果为起点对所有行同时做几步共轭梯度，每步只需 O(评分数 × f) 的运算。
+    """
+    n_rows = len(ptr) - 1
+    counts = np.diff(ptr)
+    nonempty = np.nonzero(counts)[0]
+    rows = np.repeat(np.arange(n_rows), counts)
+    vectors = fixed[index]
+    damping = (reg * counts).astype(np.float32)[:, None]
+
+    def apply(x):
+        projected = np.einsum("mf,mf->m", vectors, x[rows])
+        return _segment_sum(ptr, nonempty, vectors * projected[:, None], n_rows) + damping * x
+
+    x = current.copy()
+    x[counts == 0] = 0.0
+    residual = _segment_sum(ptr, nonempty, vectors * values[:, None], n_rows) - apply(x)
+    direction = residual.copy()
+    norm = np.einsum("nf,nf->n", residual, residual)
+    for _ in range(steps):
+        step = apply(direction)
+        denom = np.einsum("nf,nf->n", direction, step)
+        alpha = np.divide(norm, denom, out=np.zeros_like(norm), where=denom > 1e-12)
+        x += alpha[:, None] * direction
+        residual -= alpha[:, None] * step
+        new_norm = np.einsum("nf,nf->n", residual, residual)
+        beta = np.divide(new_norm, norm, out=np.zeros_like(norm), where=norm > 1e-12)
+        direction = residual + beta[:, None] * direction
+        norm = new_norm
+    return x
+
+
+def train(
+    matrix: RatingMatrix,
+    factors: int = FACTORS,
+    iterations: int = ITERATIONS,
+    reg: float = REGULARIZATION,
+    seed: int = 42,
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """对（已去均值 / 偏置的）评分矩阵做 ALS，返回 (用户隐向量, 游戏隐向量)"""
+    rng = np.random.default_rng(seed)
+    n_users, n_games = matrix.shape
+    user_factors = rng.normal(0, 0.1, (n_users, factors)).astype(np.float32)
+    game_factors = rng.normal(0, 0.1, (n_games, factors)).astype(np.float32)
+    for _ in range(iterations):
+        user_factors = _solve_side(
+            matrix.row_ptr, matrix.row_index, matrix.row_values, game_factors, user_factors, reg
+        )
+        game_factors = _solve_side(
+            matrix.col_ptr, matrix.col_index, matrix.col_values, user_factors, game_factors, reg
+        )
+    return user_factors, game_factors
+
+
+def fit(
+    user_ids: "np.ndarray",
+    game_ids: "np.ndarray",
+    values: "np.ndarray",
+    factors: int = FACTORS,
+    iterations: int = ITERATIONS,
+    seed: int = 42,
+) -> Tuple[Model, RatingMatrix]:
+    """从 (用户 id, 游戏 id, 评分) 三列训练模型"""
+    if np is None:
+        raise RuntimeError("推荐训练需要安装 numpy")
+    unique_users, rows = np.unique(user_ids, return_inverse=True)
+    unique_games, cols = np.unique(game_ids, return_inverse=True)
+    rows, cols = rows.reshape(-1), cols.reshape(-1)
+    values = np.asarray(values, dtype=np.float64)
+
+    mean = float(values.mean()) if len(values) else 0.0
+    residual = values - mean
+    game_bias = np.bincount(cols, weights=residual, minlength=len(unique_games)) / (
+        np.bincount(cols, minlength=len(unique_games)) + BIAS_DAMPING
+    )
+    residual = residual - game_bias[cols]
+
+    matrix = RatingMatrix(rows, cols, residual, len(unique_users), len(unique_games))
+    user_factors, game_factors = train(matrix, factors=factors, iterations=iterations, seed=seed)
+    model = Model(unique_users, unique_games, user_factors, game_factors, game_bias.astype(np.float32), mean)
+    return model, matrix
+
+
+def recommend(model: Model, matrix: RatingMatrix, top_n: int = TOP_N) -> Dict[int, List[Tuple[int, float]]]:
+    """为每个用户取未评分游戏中预测分最高的前 top_n 个：{用户 id: [(游戏 id, 预测分), ...]}"""
+    n_users, n_games = matrix.shape
+    top_n = min(top_n, n_games)
+    result: Dict[int, List[Tuple[int, float]]] = {}
+    if not top_n:
+        return result
+    counts = np.diff(matrix.row_ptr)
+    for start in range(0, n_users, USER_BATCH):
+        end = min(start + USER_BATCH, n_users)
+        scores = model.user_factors[start:end] @ model.game_factors.T + model.game_bias
+        # 屏蔽已评分的游戏
+        rated_rows = np.repeat(np.arange(end - start), counts[start:end])
+        rated_cols = matrix.row_index[matrix.row_ptr[start]:matrix.row_ptr[end]]
+        scores[rated_rows, rated_cols] = -np.inf
+
+        top = np.argpartition(scores, -top_n, axis=1)[:, -top_n:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top_games = model.game_ids[top]
+        # 每行按预测分降序、同分按游戏 id 升序
+        order = np.lexsort((top_games, -top_scores), axis=1)
+        top_games = np.take_along_axis(top_games, order, axis=1).tolist()
+        top_scores = (np.take_along_axis(top_scores, order, axis=1) + model.mean).tolist()
+        for user_id, games, predicted in zip(model.user_ids[start:end].tolist(), top_games, top_scores):
+            result[user_id] = [(game, score) for game, score in zip(games, predicted) if score != float("-inf")]
+    return result
+
+
+# --- 数据库 ---
+
+def load_ratings(db: Session) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """读取全部品质评分为三列：用户 id、游戏 id、五维均值（缺维度的评分跳过）"""
+    per_rating = sum(getattr(models.QualityRating, field) for field in QUALITY_FIELDS) / float(len(QUALITY_FIELDS))
+    rows = db.query(models.QualityRating.user_id, models.QualityRating.game_id, per_rating).filter(
+        per_rating.isnot(None)
+    ).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2]
+
+
+def train_and_store(
+    db: Session, factors: int = FACTORS, iterations: int = ITERATIONS, top_n: int = TOP_N
+) -> Dict[str, int]:
+    """训练模型并全量替换 user_recommendations，提交后返回统计信息"""
+    user_ids, game_ids, values = load_ratings(db)
+    db.query(models.UserRecommendation).delete(synchronize_session=False)
+    stored = 0
+    if len(values):
+        model, matrix = fit(user_ids, game_ids, values, factors=factors, iterations=iterations)
+        batch = []
+        for user_id, picked in recommend(model, matrix, top_n).items():
+            batch.extend(
+                {"user_id": user_id, "rank": rank, "game_id": game_id, "score": score}
+                for rank, (game_id, score) in enumerate(picked, start=1)
+            )
+            if len(batch) >= 10000:
+                db.execute(models.UserRecommendation.__table__.insert(), batch)
+                stored += len(batch)
+                batch = []
+        if batch:
+            db.execute(models.UserRecommendation.__table__.insert(), batch)
+            stored += len(batch)
+    db.commit()
+    return {
+        "ratings": int(len(values)),
+        "users": int(len(np.unique(user_ids))) if len(values) else 0,
+        "games": int(len(np.unique(game_ids))) if len(values) else 0,
+        "recommendations": stored,
+    }
+
+
+def recommendations_for(db: Session, user_id: int, limit: Optional[int] = None) -> List[Dict[str, object]]:
+    """按排名返回用户的推荐游戏（只取列，不加载 Game 的关系）；已删除的游戏自动跳过"""
+    query = db.query(
+        models.Game.id, models.Game.title, models.Game.company, models.Game.image_url, models.UserRecommendation.score
+    ).join(
+        models.UserRecommendation, models.UserRecommendation.game_id == models.Game.id
+    ).filter(models.UserRecommendation.user_id == user_id).order_by(models.UserRecommendation.rank)
+    if limit:
+        query = query.limit(limit)
+    return [
+        {"id": gid, "title": title, "company": company, "image_url": image_url, "score": round(score, 2)}
+        for gid, title, company, image_url, score in query.all()
+    ]
@@ -0,0 +1,139 @@
+"""
+文章 Markdown 渲染
+
+- 按正文 SHA-256 做 LRU 缓存，相同内容（例如反复预览、保存未修改的正文）直接复用结果
+- Markdown 解析器和 bleach Cleaner 按线程复用（两者都不是线程安全的），Markdown 每次转换前 reset
+- markdown / bleach 在第一次渲染时才导入（worker 启动时不加载，大部分请求用不到）
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.utils import metrics
+
+# 缓存条目数上限（每个 worker 独立）
+MARKDOWN_CACHE_SIZE = int(os.getenv("STG_MARKDOWN_CACHE_SIZE", "128"))
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables"]
+
+ALLOWED_TAGS = [
+    "p",
+    "pre",
+    "code",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "table",
+    "thead",
+    "tbody",
+    "tr",
+    "th",
+    "td",
+    "img",
+    "figure",
+    "figcaption",
+]
+
+ALLOWED_ATTRIBUTES = {
+    "*": ["class", "id", "style"],
+    "a": ["href", "title", "target", "rel"],
+    "img": ["src", "alt", "title", "width", "height", "loading", "referrerpolicy"],
+}
+
+# 首次渲染时由 _load_modules 填充
+md = None
+_bleach = None
+_modules_loaded = False
+_modules_lock = threading.Lock()
+
+_local = threading.local()
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def _load_modules() -> None:
+    """导入 markdown / bleach（只执行一次；未安装时保持为 None）"""
+    global md, _bleach, _modules_loaded
+    if _modules_loaded:
+        return
+    with _modules_lock:
+        if _modules_loaded:
+            return
+        try:
+            import markdown
+        except ImportError:  # pragma: no cover
+            markdown = None
+        try:
+            import bleach
+        except ImportError:  # pragma: no cover
+            bleach = None
+        md = markdown
+        _bleach = bleach
+        _modules_loaded = True
+
+
+def _get_converter():
+    converter = getattr(_local, "converter", None)
+    if converter is None:
+        converter = md.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        _local.converter = converter
+    return converter
+
+
+def _get_cleaner():
+    cleaner = getattr(_local, "cleaner", None)
+    if cleaner is None:
+        cleaner = _bleach.sanitizer.Cleaner(
+            tags=list(_bleach.sanitizer.ALLOWED_TAGS) + ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            strip=True,
+        )
+        _local.cleaner = cleaner
+    return cleaner
+
+
+def _render_uncached(content_md: str) -> str:
+    _load_modules()
+    if md is None:
+        # 最简 fallback，直接转义换行
+        return content_md.replace("\n", "<br>")
+    converter = _get_converter()
+    converter.reset()
+    html = converter.convert(content_md)
+    if _bleach is not None:
+        html = _get_cleaner().clean(html)
+    return html
+
+
+def render_markdown(content_md: str) -> str:
+    """把 Markdown 渲染为经过清洗的 HTML（带缓存）"""
+    if not content_md:
+        return ""
+    key = hashlib.sha256(content_md.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            cache_stats["hits"] += 1
+            metrics.record_cache("markdown", True)
+            return html
+        cache_stats["misses"] += 1
+    metrics.record_cache("markdown", False)
+
+    html = _render_uncached(content_md)
+
+    with _cache_lock:
+        _cache[key] = html
+        _cache.move_to_end(key)
+        while len(_cache) > MARKDOWN_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,95 @@
+"""
+密码重置 token 的生命周期
+
+- 数据库只保存 token 的 SHA-256（token_hash，唯一索引），链接中的原始 token 不落库；
+  token 本身是 256 位随机数，不需要加盐，查找仍是一次索引等值查询
+- 每个用户最多保留 MAX_PER_USER 个未过期的 token，新申请时删除该用户已过期的和最旧的
+- 过期 token 由 purge_expired 按 expires_at 索引分批删除：发信 leader 每小时执行一次（见 outbox.Dispatcher），
+  关闭发信线程时用 cron 运行 python -m app.maintenance.purge_reset_tokens
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+# token 有效期
+TOKEN_TTL = timedelta(minutes=30)
+
+# 每个用户同时有效的 token 数上限
+MAX_PER_USER = int(os.getenv("STG_RESET_TOKENS_PER_USER", "3"))
+
+# 清理时每批删除的行数（每批一个短事务，不长时间占用写锁）
+PURGE_BATCH_SIZE = 1000
+
+
+def _now_utc() -> datetime:
+    # 使用 naive UTC 时间，避免与数据库返回的 naive datetime 比较时报错
+    return datetime.utcnow()
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create(db: Session, user_id: int) -> str:
+    """为用户创建一个 token（不提交），返回链接中使用的原始 token"""
+    now = _now_utc()
+    outstanding = (
+        db.query(models.PasswordResetToken.id, models.PasswordResetToken.expires_at)
+        .filter(models.PasswordResetToken.user_id == user_id)
+        .order_by(models.PasswordResetToken.expires_at.desc())
+        .all()
+    )
+    keep = MAX_PER_USER - 1
+    stale = [row.id for index, row in enumerate(outstanding) if index >= keep or row.expires_at < now]
+    if stale:
+        db.query(models.PasswordResetToken).filter(
+            models.PasswordResetToken.id.in_(stale)
+        ).delete(synchronize_session=False)
+
+    token = secrets.token_urlsafe(32)
+    db.add(models.PasswordResetToken(user_id=user_id, token_hash=hash_token(token), expires_at=now + TOKEN_TTL))
+    return token
+
+
+def lookup(db: Session, token: str) -> Optional[models.PasswordResetToken]:
+    return (
+        db.query(models.PasswordResetToken)
+        .filter(models.PasswordResetToken.token_hash == hash_token(token))
+        .first()
+    )
+
+
+def is_expired(reset_token: models.PasswordResetToken) -> bool:
+    return reset_token.expires_at < _now_utc()
+
+
+def revoke_all(db: Session, user_id: int) -> None:
+    """删除用户的全部 token（不提交），密码重置成功后调用，其他未使用的链接随之失效"""
+    db.query(models.PasswordResetToken).filter(
+        models.PasswordResetToken.user_id == user_id
+    ).delete(synchronize_session=False)
+
+
+def purge_expired(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """按 expires_at 索引分批删除过期 token，返回删除数"""
+    table = models.PasswordResetToken.__table__
+    now = _now_utc()
+    removed = 0
+    while True:
+        expired = (
+            db.query(models.PasswordResetToken.id)
+            .filter(models.PasswordResetToken.expires_at < now)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        result = db.execute(table.delete().where(table.c.id.in_(expired)))
+        db.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
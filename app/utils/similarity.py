@@ -0,0 +1,320 @@
+"""
+相似游戏推荐
+
+相似度 = TAG_WEIGHT × 标签 Jaccard + (1 - TAG_WEIGHT) × 评分向量余弦（负值记 0）。
+评分向量为每个游戏的品质五维均值（/5）与难度三维均值（/60），减去全站均值后做余弦，
+缺失的部分按全站均值处理（即中心化后为 0），没有任何评分的游戏只按标签计算。
+
+计算用 NumPy 按块向量化：标签交集通过「标签 -> 游戏位置」倒排数组 + np.bincount 得到
+（相当于稀疏矩阵乘法，不依赖 SciPy），评分余弦为一次矩阵乘法，前 K 个用 np.argpartition 选出。
+结果写入 game_similarity 表，详情页只做一次按主键的查询。
+
+标签或评分变化时 mark_dirty() 记录到 similarity_dirty_games，由后台任务
+（python -m app.maintenance.build_similarity）增量更新：脏游戏重新计算完整的前 K 个，
+其他游戏只把脏游戏作为候选合并进已有列表。全站均值的缓慢漂移由定期的全量重建（--full）校正。
+"""
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import upsert_insert
+from app.models import game_tag_association
+from app.utils.ratings import DIFFICULTY_FIELDS, QUALITY_FIELDS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# 每个游戏保存的相似游戏数
+TOP_K = int(os.getenv("STG_SIMILAR_GAMES", "8"))
+
+# 标签相似度所占权重，其余为评分向量相似度
+TAG_WEIGHT = float(os.getenv("STG_SIMILARITY_TAG_WEIGHT", "0.7"))
+
+# 脏游戏超过全部游戏的这一比例时直接全量重建
+FULL_REBUILD_RATIO = 0.2
+
+# 每次向量化计算的游戏数（块越大越快，内存占用约 BLOCK_SIZE × 游戏数 × 4 字节）
+BLOCK_SIZE = 128
+
+Neighbors = List[Tuple[int, float]]
+
+
+# --- 写入路径 ---
+
+def mark_dirty(db: Session, game_id: int) -> None:
+    """标记游戏待重新计算（在调用方 commit 之前调用，与业务写入同一事务）"""
+    now = datetime.utcnow()
+    db.execute(
+        upsert_insert(db, models.SimilarityDirtyGame)
+        .values(game_id=game_id, marked_at=now)
+        .on_conflict_do_update(index_elements=["game_id"], set_={"marked_at": now})
+    )
+
+
+def forget_game(db: Session, game_id: int) -> None:
+    """删除游戏前调用：移除它的相似列表，并标记引用了它的游戏待重新计算"""
+    owners = [owner for (owner,) in db.query(models.GameSimilarity.game_id).filter(
+        models.GameSimilarity.similar_game_id == game_id
+    ).distinct()]
+    db.query(models.GameSimilarity).filter(
+        (models.GameSimilarity.game_id == game_id) | (models.GameSimilarity.similar_game_id == game_id)
+    ).delete(synchronize_session=False)
+    db.query(models.SimilarityDirtyGame).filter(
+        models.SimilarityDirtyGame.game_id == game_id
+    ).delete(synchronize_session=False)
+    for owner in owners:
+        mark_dirty(db, owner)
+
+
+# --- 读取路径 ---
+
+def similar_games(db: Session, game_id: int) -> List[Dict[str, object]]:
+    """详情页使用：按排名返回预先计算好的相似游戏（只取列，不加载 Game 的关系）"""
+    rows = db.query(
+        models.Game.id, models.Game.title, models.Game.company, models.Game.image_url, models.GameSimilarity.score
+    ).join(
+        models.GameSimilarity, models.GameSimilarity.similar_game_id == models.Game.id
+    ).filter(models.GameSimilarity.game_id == game_id).order_by(models.GameSimilarity.rank).all()
+    return [
+        {"id": gid, "title": title, "company": company, "image_url": image_url, "score": round(score, 3)}
+        for gid, title, company, image_url, score in rows
+    ]
+
+
+# --- 特征与相似度计算 ---
+
+class Features:
+    """全部游戏的标签集合与评分向量，按游戏 id 升序编号"""
+
+    def __init__(
+        self,
+        game_ids: Sequence[int],
+        tag_links: Sequence[Tuple[int, int]],
+        quality_means: Dict[int, Sequence[Optional[float]]],
+        difficulty_means: Dict[int, Sequence[Optional[float]]],
+    ) -> None:
+        if np is None:
+            raise RuntimeError("相似度计算需要安装 numpy")
+        self.game_ids = np.array(sorted(game_ids), dtype=np.int64)
+        self.position = {int(gid): pos for pos, gid in enumerate(self.game_ids)}
+        n = len(self.game_ids)
+
+        members: Dict[int, List[int]] = {}
+        game_tags: List[List[int]] = [[] for _ in range(n)]
+        for game_id, tag_id in tag_links:
+            pos = self.position.get(game_id)
+            if pos is not None:
+                members.setdefault(tag_id, []).append(pos)
+                game_tags[pos].append(tag_id)
+        self.tag_members = {tag_id: np.array(positions, dtype=np.int64) for tag_id, positions in members.items()}
+        self.game_tags = game_tags
+        self.tag_sizes = np.array([len(tags) for tags in game_tags], dtype=np.float32)
+
+        self.vectors = self._rating_vectors(n, quality_means, difficulty_means)
+
+    def _rating_vectors(self, n: int, quality_means, difficulty_means) -> "np.ndarray":
+        width = len(QUALITY_FIELDS) + len(DIFFICULTY_FIELDS)
+        raw = np.full((n, width), np.nan, dtype=np.float64)
+        for game_id, means in quality_means.items():
+            pos = self.position.get(game_id)
+            if pos is not None:
+                raw[pos, :len(QUALITY_FIELDS)] = [np.nan if v is None else v / 5.0 for v in means]
+        for game_id, means in difficulty_means.items():
+            pos = self.position.get(game_id)
+            if pos is not None:
+                raw[pos, len(QUALITY_FIELDS):] = [np.nan if v is None else v / 60.0 for v in means]
+
+        # 按维度中心化；缺失值视为全站均值（中心化后为 0）
+        with np.errstate(all="ignore"):
+            column_means = np.nanmean(raw, axis=0) if n else np.zeros(width)
+        column_means = np.nan_to_num(column_means)
+        centered = np.nan_to_num(raw - column_means)
+        norms = np.linalg.norm(centered, axis=1, keepdims=True)
+        return (centered / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.game_ids)
+
+    def scores(self, positions: Sequence[int]) -> "np.ndarray":
+        """positions 中每个游戏与全部游戏的相似度矩阵（len(positions) × n），与自身的相似度记为 -1"""
+        n = len(self.game_ids)
+        positions = np.asarray(positions, dtype=np.int64)
+        cosine = np.maximum(self.vectors[positions] @ self.vectors.T, 0.0)
+
+        jaccard = np.zeros((len(positions), n), dtype=np.float32)
+        for row, pos in enumerate(positions):
+            tags = self.game_tags[pos]
+            if not tags:
+                continue
+            inter = np.bincount(np.concatenate([self.tag_members[t] for t in tags]), minlength=n).astype(np.float32)
+            union = self.tag_sizes + self.tag_sizes[pos] - inter
+            np.divide(inter, union, out=jaccard[row], where=union > 0)
+
+        result = TAG_WEIGHT * jaccard + (1.0 - TAG_WEIGHT) * cosine
+        result[np.arange(len(positions)), positions] = -1.0
+        return result
+
+    def top_k(self, scores: "np.ndarray", k: int = TOP_K) -> List[Neighbors]:
+        """每行取相似度大于 0 的前 k 个：[(游戏 id, 相似度), ...]，同分按游戏 id 升序"""
+        n = scores.shape[1]
+        if n <= 1:
+            return [[] for _ in range(scores.shape[0])]
+        k = min(k, n - 1)
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        result = []
+        for row, cols in enumerate(candidates):
+            picked = [(int(self.game_ids[c]), float(scores[row, c])) for c in cols if scores[row, c] > 0]
+            picked.sort(key=lambda item: (-item[1], item[0]))
+            result.append(picked)
+        return result
+
+    def neighbors(self, positions: Sequence[int]) -> Dict[int, Neighbors]:
+        """按块计算 positions 中每个游戏的前 K 个相似游戏：{游戏 id: 列表}"""
+        result: Dict[int, Neighbors] = {}
+        for start in range(0, len(positions), BLOCK_SIZE):
+            block = list(positions[start:start + BLOCK_SIZE])
+            for pos, picked in zip(block, self.top_k(self.scores(block))):
+                result[int(self.game_ids[pos])] = picked
+        return result
+
+
+def load_features(db: Session) -> Features:
+    game_ids = [gid for (gid,) in db.query(models.Game.id)]
+    tag_links = db.query(game_tag_association.c.game_id, game_tag_association.c.tag_id).all()
+    quality = db.query(
+        models.QualityRating.game_id,
+        *(func.avg(getattr(models.QualityRating, field)) for field in QUALITY_FIELDS),
+    ).group_by(models.QualityRating.game_id).all()
+    difficulty = db.query(
+        models.DifficultyRating.game_id,
+        *(func.avg(getattr(models.DifficultyRating, field)) for field in DIFFICULTY_FIELDS),
+    ).group_by(models.DifficultyRating.game_id).all()
+    return Features(
+        game_ids,
+        tag_links,
+        {row[0]: row[1:] for row in quality},
+        {row[0]: row[1:] for row in difficulty},
+    )
+
+
+# --- 持久化 ---
+
+def _write(db: Session, lists: Dict[int, Neighbors]) -> None:
+    ids = list(lists)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        db.query(models.GameSimilarity).filter(
+            models.GameSimilarity.game_id.in_(chunk)
+        ).delete(synchronize_session=False)
+    rows = [
+        {"game_id": game_id, "rank": rank, "similar_game_id": similar_id, "score": score}
+        for game_id, picked in lists.items()
+        for rank, (similar_id, score) in enumerate(picked, start=1)
+    ]
+    if rows:
+        db.execute(models.GameSimilarity.__table__.insert(), rows)
+
+
+def _clear_dirty(db: Session, dirty: Dict[int, datetime]) -> None:
+    """只删除处理期间没有被再次标记的记录（marked_at 未变）"""
+    for game_id, marked_at in dirty.items():
+        db.query(models.SimilarityDirtyGame).filter(
+            models.SimilarityDirtyGame.game_id == game_id,
+            models.SimilarityDirtyGame.marked_at == marked_at,
+        ).delete(synchronize_session=False)
+
+
+def rebuild_all(db: Session, features: Optional[Features] = None) -> int:
+    """全量重建 game_similarity 并提交，返回计算的游戏数"""
+    dirty = dict(db.query(models.SimilarityDirtyGame.game_id, models.SimilarityDirtyGame.marked_at).all())
+    features = features or load_features(db)
+    lists = features.neighbors(list(range(len(features))))
+    db.query(models.GameSimilarity).delete(synchronize_session=False)
+    _write(db, lists)
+    _clear_dirty(db, dirty)
+    db.commit()
+    return len(lists)
+
+
+def update_dirty(db: Session) -> int:
+    """
+    增量更新并提交，返回处理的脏游戏数。
+
+    - 脏游戏：重新计算完整的前 K 个
+    - 其他游戏：已有列表中未变化的条目分数不变，只需把脏游戏作为候选合并进来；
+      如果满 K 个的列表中移除了脏游戏，被挤出列表的第 K+1 名未知，则对该游戏完整重算
+    - 相似列表为空（首次运行）或脏游戏过多时改为全量重建
+    """
+    dirty = dict(db.query(models.SimilarityDirtyGame.game_id, models.SimilarityDirtyGame.marked_at).all())
+    has_lists = db.query(models.GameSimilarity.game_id).first() is not None
+    if not dirty and has_lists:
+        return 0
+
+    features = load_features(db)
+    if not has_lists or len(dirty) > FULL_REBUILD_RATIO * max(1, len(features)):
+        rebuild_all(db, features)
+        return len(dirty)
+
+    # 已删除的游戏：清掉它们残留的列表
+    deleted = [game_id for game_id in dirty if game_id not in features.position]
+    if deleted:
+        db.query(models.GameSimilarity).filter(
+            models.GameSimilarity.game_id.in_(deleted)
+        ).delete(synchronize_session=False)
+
+    old: Dict[int, Neighbors] = {}
+    for game_id, similar_id, score in db.query(
+        models.GameSimilarity.game_id, models.GameSimilarity.similar_game_id, models.GameSimilarity.score
+    ).order_by(models.GameSimilarity.game_id, models.GameSimilarity.rank):
+        old.setdefault(game_id, []).append((similar_id, score))
+
+    # 每个游戏进入列表所需的最低分：列表已满时为第 K 名的分数，否则任何正分都可以
+    n = len(features)
+    threshold = np.zeros(n, dtype=np.float32)
+    for game_id, picked in old.items():
+        pos = features.position.get(game_id)
+        if pos is not None and len(picked) >= TOP_K:
+            threshold[pos] = picked[-1][1]
+
+    dirty_positions = [features.position[game_id] for game_id in dirty if game_id in features.position]
+    dirty_ids = set(dirty)
+    lists: Dict[int, Neighbors] = {}
+    candidates: Dict[int, Neighbors] = {}
+    for start in range(0, len(dirty_positions), BLOCK_SIZE):
+        block = dirty_positions[start:start + BLOCK_SIZE]
+        scores = features.scores(block)
+        for row, (pos, picked) in enumerate(zip(block, features.top_k(scores))):
+            game_id = int(features.game_ids[pos])
+            lists[game_id] = picked
+            # 相似度对称：这一行也是其他游戏与该脏游戏的相似度
+            for other in np.nonzero(scores[row] > threshold)[0]:
+                candidates.setdefault(int(features.game_ids[other]), []).append((game_id, float(scores[row, other])))
+
+    affected = set(candidates) | {
+        game_id for game_id, picked in old.items() if any(similar_id in dirty_ids for similar_id, _ in picked)
+    }
+    recompute = []
+    for game_id in affected - dirty_ids:
+        if game_id not in features.position:
+            continue
+        previous = old.get(game_id, [])
+        kept = [(similar_id, score) for similar_id, score in previous if similar_id not in dirty_ids]
+        if len(kept) < len(previous) and len(previous) >= TOP_K:
+            recompute.append(features.position[game_id])
+            continue
+        merged = kept + candidates.get(game_id, [])
+        merged.sort(key=lambda item: (-item[1], item[0]))
+        lists[game_id] = merged[:TOP_K]
+    if recompute:
+        lists.update(features.neighbors(recompute))
+
+    _write(db, lists)
+    _clear_dirty(db, dirty)
+    db.commit()
+    return len(dirty)
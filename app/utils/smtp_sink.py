@@ -0,0 +1,136 @@
+"""
+本地 SMTP 替身：接收邮件并保存在内存中，不向外投递
+
+用于本地调试与测试，代替 Postfix（STG_LOCAL_MAIL_HOST / STG_LOCAL_MAIL_PORT 指向它）：
+
+    python -m app.utils.smtp_sink --port 1025        # 打印收到的每封邮件
+
+测试中：
+
+    with SmtpSink() as sink:
+        transport = outbox.SmtpTransport(sink.host, sink.port, "noreply@localhost")
+        outbox.drain(transport)
+        assert sink.messages[0]["To"] == "user@example.com"
+
+sink.fail_next(n, code) 让接下来 n 封邮件以指定 SMTP 响应码拒收，用于验证重试；
+sink.connections 为累计的 SMTP 连接数，用于验证连接复用。
+只实现发信所需的最小命令集（HELO/EHLO、MAIL、RCPT、DATA、RSET、NOOP、QUIT），不支持 STARTTLS / AUTH。
+"""
+import argparse
+import socketserver
+import threading
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List, Optional
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        sink = self.server.sink
+        sink._connected()
+        self._reply("220 stg-smtp-sink ready")
+        recipients: List[str] = []
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-stg-smtp-sink\r\n250 8BITMIME\r\n")
+            elif verb == "HELO":
+                self._reply("250 stg-smtp-sink")
+            elif verb == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self._reply(sink._deliver(b"".join(lines), recipients))
+                recipients = []
+            elif verb == "RSET":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    sink: "SmtpSink"
+
+
+class SmtpSink:
+    """在后台线程中运行的 SMTP 服务器；port=0 时自动选择空闲端口"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, verbose: bool = False) -> None:
+        self._server = _Server((host, port), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self.verbose = verbose
+        self.messages: List[EmailMessage] = []
+        self.connections = 0
+        self._failures: List[int] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def fail_next(self, count: int = 1, code: int = 451) -> None:
+        with self._lock:
+            self._failures.extend([code] * count)
+
+    def _connected(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def _deliver(self, data: bytes, recipients: List[str]) -> str:
+        with self._lock:
+            if self._failures:
+                return f"{self._failures.pop(0)} Temporary failure (smtp_sink)"
+            message = message_from_bytes(data, policy=policy.default)
+            self.messages.append(message)
+        if self.verbose:
+            print(f"[smtp_sink] {', '.join(recipients)}: {message['Subject']}")
+        return "250 OK: queued"
+
+    def start(self) -> "SmtpSink":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stg-smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "SmtpSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 SMTP 替身（只接收、打印，不投递）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    sink = SmtpSink(args.host, args.port, verbose=True)
+    print(f"[smtp_sink] 监听 {sink.host}:{sink.port}")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
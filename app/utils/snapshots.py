@@ -0,0 +1,131 @@
+"""
+SQLite 数据库快照（backup API）
+
+- copy_database：用 sqlite3.Connection.backup 分批复制页面，每批之间释放读锁让写入继续
+  （写入频繁导致反复重来时退化为一次性复制），写出到临时文件后原子替换目标文件，读者不会看到半份数据
+- SnapshotRefresher：只读引擎的快照模式使用，按间隔在后台线程中刷新主库快照；
+  多个 gunicorn worker 通过文件锁保证同一时间只有一个在刷新，其他 worker 继续读现有快照
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger("stg.snapshot")
+
+# 每批复制的页数（默认页大小 4KB 时约 4MB），以及批间休眠秒数
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+
+# 分批复制期间主库被其他连接写入时，SQLite 会从头重新复制；重来这么多次后改为一次性复制
+BACKUP_MAX_RESTARTS = 3
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _backup(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, sleep: float) -> None:
+    remaining_seen = [None, 0]
+
+    def progress(status, remaining, total):
+        last, restarts = remaining_seen
+        if last is not None and remaining > last:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        remaining_seen[:] = [remaining, restarts]
+
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=sleep)
+    except _TooManyRestarts:
+        logger.warning("分批复制期间主库持续写入，改为一次性复制")
+        source.backup(target)
+
+
+def copy_database(
+    source_path: str,
+    target_path: str,
+    pages: int = BACKUP_PAGES,
+    sleep: float = BACKUP_SLEEP,
+) -> int:
+    """把 source_path 复制到 target_path（原子替换），返回快照的字节数"""
+    temp_path = f"{target_path}.tmp-{os.getpid()}"
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            _backup(source, target, pages, sleep)
+            # 快照只读打开（immutable），不需要 WAL
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    return os.path.getsize(target_path)
+
+
+class SnapshotRefresher:
+    """按 interval 秒刷新 source_path 的快照到 target_path"""
+
+    def __init__(self, source_path: str, target_path: str, interval: float) -> None:
+        self.source_path = source_path
+        self.target_path = target_path
+        self.interval = interval
+        self._next_check = 0.0
+        self._running = threading.Lock()
+
+    def ready(self) -> bool:
+        return os.path.exists(self.target_path)
+
+    def age(self) -> Optional[float]:
+        try:
+            return time.time() - os.path.getmtime(self.target_path)
+        except OSError:
+            return None
+
+    def refresh_if_stale(self) -> None:
+        """快照过期时在后台线程中刷新；调用开销只是一次时间比较，可在每个请求中调用"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + min(self.interval, 5.0)
+        age = self.age()
+        if age is not None and age < self.interval:
+            return
+        if self._running.acquire(blocking=False):
+            threading.Thread(target=self._refresh, name="stg-snapshot", daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            with open(f"{self.target_path}.lock", "w") as lock_file:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        return  # 其他 worker 正在刷新
+                age = self.age()
+                if age is not None and age < self.interval:
+                    return
+                started = time.perf_counter()
+                size = copy_database(self.source_path, self.target_path)
+                logger.info(
+                    "只读快照已刷新：%s（%.1f MB，%.2fs）",
+                    self.target_path, size / 1024 / 1024, time.perf_counter() - started,
+                )
+        except Exception:
+            logger.exception("刷新只读快照失败")
+        finally:
+            self._running.release()
@@ -0,0 +1,111 @@
+"""
+进程内的用户状态缓存：user_id -> (token_version, is_admin)
+
+登录 token 携带 uid / adm / ver，校验时只需确认 ver 与这里记录的版本一致，不再每个请求查一次 users 表。
+
+- 只缓存本 worker 最近见过的用户：第一次见到某个 uid 时按主键查一次（新注册的用户立即可用）；
+  IDLE_SECONDS 内没有再出现的用户从缓存中移除
+- 缓存每 REFRESH_SECONDS 秒按 id 重新加载一次（只查缓存中的用户，不扫全表）；
+  过期后由第一个用到它的请求在线程池中刷新，刷新期间其他请求继续使用旧数据
+- 管理员身份以这里的 is_admin 为准（不信任 token 中的 adm），取消管理员最多延迟 REFRESH_SECONDS 秒生效
+- 用户不存在（已删除）或版本号不一致的 token 视为已撤销
+- 本 worker 中修改了 token_version / is_admin 后调用 invalidate()，下一个请求即重新加载；
+  其他 worker 最多延迟 REFRESH_SECONDS 秒生效
+"""
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+
+REFRESH_SECONDS = float(os.getenv("STG_TOKEN_VERSION_REFRESH_SECONDS", "5"))
+
+# 多久没有请求的用户从缓存中移除
+IDLE_SECONDS = 3600
+
+# 刷新时每条查询包含的 id 数（SQLite 的绑定参数个数有上限）
+REFRESH_CHUNK = 500
+
+
+class UserState(NamedTuple):
+    token_version: int
+    is_admin: bool
+
+
+# user_id -> 状态；None 表示用户不存在
+_states: Dict[int, Optional[UserState]] = {}
+_last_seen: Dict[int, float] = {}
+_loaded_at = time.monotonic()
+_refresh_lock = threading.Lock()
+
+
+def _load(user_ids) -> Dict[int, Optional[UserState]]:
+    user_ids = list(user_ids)
+    states: Dict[int, Optional[UserState]] = dict.fromkeys(user_ids)
+    db = SessionLocal()
+    try:
+        for start in range(0, len(user_ids), REFRESH_CHUNK):
+            rows = db.execute(
+                select(models.User.id, models.User.token_version, models.User.is_admin).where(
+                    models.User.id.in_(user_ids[start:start + REFRESH_CHUNK])
+                )
+            ).all()
+            for user_id, version, is_admin in rows:
+                states[user_id] = UserState(version or 0, bool(is_admin))
+    finally:
+        db.close()
+    return states
+
+
+def is_stale() -> bool:
+    return time.monotonic() - _loaded_at > REFRESH_SECONDS
+
+
+def is_known(user_id: int) -> bool:
+    return user_id in _states
+
+
+def load(user_id: int) -> None:
+    """缓存未命中：按主键加载这一个用户"""
+    _states.update(_load([user_id]))
+    _last_seen[user_id] = time.monotonic()
+
+
+def refresh() -> None:
+    """重新加载缓存中的用户并移除长期未出现的用户；已有线程在刷新时直接返回"""
+    global _loaded_at
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        if not is_stale():
+            return
+        now = time.monotonic()
+        for user_id, seen in list(_last_seen.items()):
+            if now - seen > IDLE_SECONDS:
+                _last_seen.pop(user_id, None)
+                _states.pop(user_id, None)
+        _states.update(_load(list(_states)))
+        _loaded_at = time.monotonic()
+    finally:
+        _refresh_lock.release()
+
+
+def current(user_id: int) -> Optional[UserState]:
+    """用户当前的状态；用户不存在或尚未加载时返回 None"""
+    _last_seen[user_id] = time.monotonic()
+    return _states.get(user_id)
+
+
+def invalidate() -> None:
+    """下一次校验时强制重新加载"""
+    global _loaded_at
+    _loaded_at = 0.0
+
+
+def bump(user: models.User) -> None:
+    """作废用户已签发的全部登录 token（不提交，随调用方的事务一起提交后再调用 invalidate）"""
+    user.token_version = (user.token_version or 0) + 1
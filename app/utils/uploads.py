@@ -0,0 +1,220 @@
+"""
+上传文件的流式保存辅助函数
+
+所有上传入口（游戏封面、资源封面、文章图片、文章静态包）统一走这里：
+- 分块读取 UploadFile，边读边写入目标目录下的临时文件，超过大小限制立即中止
+- 通过文件头魔数判断真实类型，不信任客户端提供的 content_type / 扩展名
+- 写入完成后用 os.replace 原子地重命名到最终位置，避免出现写了一半的文件
+- 文件按 SHA-256 内容哈希命名并登记到 StoredFile 表，相同内容只存一份，
+  通过引用计数管理生命周期（归零的文件由 cleanup_static 统一清理）
+"""
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config.constants import BASE_DIR
+from app.database import upsert_insert
+from app.utils import metrics
+
+# 每次从上传流读取的块大小
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# 识别文件类型所需的最少文件头字节数
+_SNIFF_SIZE = 16
+
+# 上传根目录（对应 URL /static/uploads/）
+UPLOADS_ROOT = BASE_DIR / "app" / "static" / "uploads"
+
+# 文件类型 -> 保存时使用的扩展名
+KIND_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "png": ".png",
+    "gif": ".gif",
+    "webp": ".webp",
+    "zip": ".zip",
+}
+
+IMAGE_KINDS = ("jpeg", "png", "gif", "webp")
+
+
+def sniff_kind(header: bytes) -> Optional[str]:
+    """根据文件头魔数判断文件类型，无法识别时返回 None"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return "zip"
+    return None
+
+
+def _too_large(limit_label: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"文件大小不能超过 {limit_label}")
+
+
+def stream_to_tempfile(
+    upload: UploadFile,
+    dest_dir: Path,
+    max_size: int,
+    allowed_kinds: Iterable[str],
+    limit_label: str,
+    type_error: str,
+) -> Tuple[Path, str, int, str]:
+    """
+    将上传内容分块写入 dest_dir 下的临时文件，同时计算 SHA-256。
+
+    返回 (临时文件路径, 识别出的类型, 字节数, 十六进制哈希)。临时文件与最终文件位于同一目录，
+    以保证后续 os.replace 是原子操作；调用方负责重命名或删除该临时文件。
+    """
+    allowed = tuple(allowed_kinds)
+
+    # 客户端声明了大小时先做一次廉价的预检查
+    declared_size = getattr(upload, "size", None)
+    if declared_size is not None and declared_size > max_size:
+        raise _too_large(limit_label)
+
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=dest_dir)
+    tmp_path = Path(tmp_name)
+    # fd 交给 os.fdopen 后由文件对象负责关闭；之后不能再 os.close(fd)，
+    # 否则可能关掉其他线程刚打开、恰好复用了同一编号的文件
+    fd_owned = True
+    try:
+        upload.file.seek(0)
+        header = upload.file.read(_SNIFF_SIZE)
+        kind = sniff_kind(header)
+        if kind not in allowed:
+            raise HTTPException(status_code=400, detail=type_error)
+
+        size = len(header)
+        digest = hashlib.sha256(header)
+        out = os.fdopen(fd, "wb")
+        fd_owned = False
+        with out:
+            out.write(header)
+            while True:
+                chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(limit_label)
+                digest.update(chunk)
+                out.write(chunk)
+        metrics.record_upload(kind, size)
+        return tmp_path, kind, size, digest.hexdigest()
+    except BaseException:
+        if fd_owned:
+            os.close(fd)
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def store_upload(
+    db: Session,
+    upload: UploadFile,
+    subdir: str,
+    max_size: int,
+    allowed_kinds: Iterable[str] = IMAGE_KINDS,
+    limit_label: str = "1MB",
+    type_error: str = "只支持上传 JPG, PNG, GIF, WebP 格式的图片",
+    acquire: bool = True,
+) -> Tuple[str, bool]:
+    """
+    流式保存上传文件到 static/uploads/{subdir}/{sha256}{ext}，返回 (URL, 是否为新文件)。
+
+    内容已存在时直接复用原文件，只增加引用计数。StoredFile 的变更随调用方的事务一起提交；
+    :param acquire: 是否立即占用一个引用（文章插图等由后续保存动作再占用时传 False）
+    """
+    target_dir = UPLOADS_ROOT / subdir
+    tmp_path, kind, size, sha256 = stream_to_tempfile(
+        upload, target_dir, max_size, allowed_kinds, limit_label, type_error
+    )
+    filename = f"{sha256}{KIND_EXTENSIONS[kind]}"
+    url = f"/static/uploads/{subdir}/{filename}"
+    delta = 1 if acquire else 0
+    try:
+        final_path = target_dir / filename
+        # 单条 upsert 完成「登记或增加引用」，多个 worker 并发上传同一内容也不会冲突。
+        # 先登记再检查文件：正在删除同一文件的清理任务在提交前已把文件移走，
+        # upsert 会等到它提交之后才执行，随后这里发现文件不存在并重新写入
+        now = datetime.utcnow()
+        stmt = upsert_insert(db, models.StoredFile).values(
+            sha256=sha256, url=url, size=size, ref_count=delta, created_at=now, updated_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.StoredFile.url],
+            set_={"ref_count": models.StoredFile.ref_count + delta, "updated_at": now},
+        ))
+        is_new = not final_path.exists()
+        if is_new:
+            os.replace(tmp_path, final_path)
+        return url, is_new
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def acquire_upload(db: Session, url: Optional[str]) -> None:
+    """为已登记的上传文件增加一个引用"""
+    if not url:
+        return
+    db.query(models.StoredFile).filter(models.StoredFile.url == url).update(
+        {
+            models.StoredFile.ref_count: models.StoredFile.ref_count + 1,
+            models.StoredFile.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+
+
+def release_upload(db: Session, url: Optional[str]) -> None:
+    """释放一个引用；文件本身在引用归零后由清理任务删除"""
+    if not url:
+        return
+    db.query(models.StoredFile).filter(
+        models.StoredFile.url == url, models.StoredFile.ref_count > 0
+    ).update(
+        {
+            models.StoredFile.ref_count: models.StoredFile.ref_count - 1,
+            models.StoredFile.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+
+
+def discard_upload(db: Session, url: Optional[str]) -> bool:
+    """
+    事务回滚后调用：若该文件没有登记记录（即本次新写入且登记已被回滚），直接删除文件。
+    返回是否删除了文件。
+    """
+    if not url:
+        return False
+    if db.query(models.StoredFile.id).filter(models.StoredFile.url == url).first() is None:
+        delete_upload(url)
+        return True
+    return False
+
+
+def upload_path(url: Optional[str]) -> Optional[Path]:
+    """/static/uploads/ 下文件 URL 对应的磁盘路径，其他 URL 返回 None"""
+    if not url or not url.startswith("/static/uploads/"):
+        return None
+    return BASE_DIR / "app" / url.lstrip("/")
+
+
+def delete_upload(url: Optional[str]) -> None:
+    """删除 /static/uploads/ 下的文件（URL 形式），不存在时忽略"""
+    path = upload_path(url)
+    if path is not None:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,6 @@
+"""
+性能基准脚本（不参与线上运行）。
+
+每个脚本都可以通过 `python -m benchmarks.<name>` 单独执行，
+结果输出为 JSON，便于在不同提交之间对比。
+"""
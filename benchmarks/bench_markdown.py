@@ -0,0 +1,112 @@
+"""
+文章 Markdown 渲染耗时：旧实现（每次新建 Markdown + bleach.clean）vs rendering 模块（复用解析器与 Cleaner + LRU 缓存）。
+
+生成约 --size KB 的文章（标题、段落、列表、代码块、表格、图片混合），分别统计：
+- legacy：每次调用都重新构建解析器与清洗器（原 articles.render_markdown 的做法）
+- cold：rendering 模块未命中缓存（每轮修改一个字符，模拟编辑中的实时预览）
+- cached：rendering 模块命中缓存（重复预览 / 保存未修改的正文）
+
+用法：
+    python -m benchmarks.bench_markdown --size 200 --rounds 20
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+import bleach
+import markdown as md
+
+from app.utils import rendering
+
+_BLOCK = """## 第 {n} 节
+
+这是一段 **加粗** 与 *斜体* 混合的正文，包含 [链接](https://example.com/{n}) 和 `行内代码`。
+评分系统会综合玩家的多个维度打分，生成最终的雷达图。
+
+- 列表项 A{n}
+- 列表项 B{n}
+- 列表项 C{n}
+
+```python
+def score_{n}(values):
+    return sum(values) / len(values)
+```
+
+| 维度 | 分数 |
+| --- | --- |
+| 画面 | {n} |
+| 剧情 | {n} |
+
+![封面 {n}](/static/uploads/articles/{n}.png)
+
+"""
+
+
+def build_article(size_kb: int) -> str:
+    parts = []
+    total = 0
+    n = 0
+    while total < size_kb * 1024:
+        block = _BLOCK.format(n=n)
+        parts.append(block)
+        total += len(block.encode("utf-8"))
+        n += 1
+    return "".join(parts)
+
+
+def legacy_render(content_md: str) -> str:
+    html = md.markdown(content_md, extensions=rendering.MARKDOWN_EXTENSIONS)
+    return bleach.clean(
+        html,
+        tags=list(bleach.sanitizer.ALLOWED_TAGS) + rendering.ALLOWED_TAGS,
+        attributes=rendering.ALLOWED_ATTRIBUTES,
+        strip=True,
+    )
+
+
+def _timeit(func: Callable[[int], None], rounds: int) -> Dict[str, float]:
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200, help="文章大小（KB）")
+    parser.add_argument("--rounds", type=int, default=20, help="每种方式的执行次数")
+    args = parser.parse_args(argv)
+
+    article = build_article(args.size)
+    rendering.clear_cache()
+    # 预热：首次导入扩展、编译正则等一次性开销不计入
+    legacy_render(article[:1024])
+    rendering.render_markdown(article[:1024] + " ")
+
+    legacy = _timeit(lambda i: legacy_render(article + str(i)), args.rounds)
+    cold = _timeit(lambda i: rendering.render_markdown(article + str(i)), args.rounds)
+    rendering.render_markdown(article)
+    cached = _timeit(lambda i: rendering.render_markdown(article), args.rounds)
+
+    report = {
+        "article_bytes": len(article.encode("utf-8")),
+        "rounds": args.rounds,
+        "legacy": legacy,
+        "cold": cold,
+        "cached": cached,
+        "speedup_cold": round(legacy["median_ms"] / cold["median_ms"], 2) if cold["median_ms"] else None,
+        "speedup_cached": round(legacy["median_ms"] / cached["median_ms"], 2) if cached["median_ms"] else None,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
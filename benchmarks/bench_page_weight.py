@@ -0,0 +1,94 @@
+"""
+页面体积对比：封面使用原图 vs 使用缩略图（srcset）。
+
+在当前数据库上渲染卡片页面，统计 HTML 与页面中图片的字节数。
+对带 srcset 的图片，按浏览器的选择规则取「宽度 >= 槽位宽度 × DPR」的最小候选。
+
+用法：
+    python -m benchmarks.bench_page_weight --dpr 2 --slot 240
+"""
+import argparse
+import json
+import re
+from typing import Dict, List, Optional
+
+from fastapi.testclient import TestClient
+
+from app.config.constants import BASE_DIR
+from app.main import app
+from app.utils import images
+
+IMG_TAG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+ATTR_RE = re.compile(r'(\w[\w-]*)="([^"]*)"')
+
+DEFAULT_PATHS = ["/", "/games", "/resources/"]
+
+
+def _file_size(url: str) -> int:
+    if not url.startswith("/static/"):
+        return 0
+    path = BASE_DIR / "app" / url.lstrip("/")
+    return path.stat().st_size if path.exists() else 0
+
+
+def _pick_candidate(src: str, srcset: Optional[str], needed_width: float) -> str:
+    if not srcset:
+        return src
+    candidates = []
+    for part in srcset.split(","):
+        url, _, descriptor = part.strip().rpartition(" ")
+        candidates.append((int(descriptor.rstrip("w")), url))
+    candidates.sort()
+    for width, url in candidates:
+        if width >= needed_width:
+            return url
+    return candidates[-1][1]
+
+
+def measure(client: TestClient, path: str, needed_width: float) -> Dict[str, int]:
+    html = client.get(path).text
+    image_bytes = 0
+    image_count = 0
+    for tag in IMG_TAG_RE.findall(html):
+        attrs = dict(ATTR_RE.findall(tag))
+        src = attrs.get("src")
+        if not src:
+            continue
+        image_bytes += _file_size(_pick_candidate(src, attrs.get("srcset"), needed_width))
+        image_count += 1
+    html_bytes = len(html.encode("utf-8"))
+    return {
+        "html_bytes": html_bytes,
+        "images": image_count,
+        "image_bytes": image_bytes,
+        "total_bytes": html_bytes + image_bytes,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dpr", type=float, default=1.0, help="设备像素比")
+    parser.add_argument("--slot", type=int, default=240, help="卡片在页面中的显示宽度（CSS 像素）")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS)
+    args = parser.parse_args(argv)
+
+    needed_width = args.slot * args.dpr
+    client = TestClient(app)
+    report = {}
+    for path in args.paths:
+        images.RENDITIONS_ENABLED = False
+        before = measure(client, path, needed_width)
+        images.RENDITIONS_ENABLED = True
+        after = measure(client, path, needed_width)
+        saved = before["total_bytes"] - after["total_bytes"]
+        report[path] = {
+            "before": before,
+            "after": after,
+            "saved_bytes": saved,
+            "saved_ratio": round(saved / before["total_bytes"], 4) if before["total_bytes"] else 0.0,
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
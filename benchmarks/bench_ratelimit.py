@@ -0,0 +1,85 @@
+"""
+限流器自身开销基准：每次 ratelimit.store.take 的耗时（微秒）。
+
+- single：单进程连续检查（大部分 key 不同，模拟不同客户端；每个 key 会被多次命中）
+- contended：--processes 个进程同时检查同一批 key，模拟多个 gunicorn worker 争用同一个限流库
+每个场景输出 p50 / p99 / max（微秒）以及放行、拒绝次数。限流库使用临时文件，不影响正在运行的服务。
+
+用法：
+    python -m benchmarks.bench_ratelimit
+    python -m benchmarks.bench_ratelimit --checks 20000 --processes 4 --keys 500
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from typing import List, Optional
+
+from app.utils import ratelimit
+
+RULE = ratelimit.Rule(10, 60)
+
+
+def run_checks(path: str, checks: int, keys: int) -> dict:
+    store = ratelimit.SqliteBucketStore(path)
+    store.take("warmup", RULE)
+    timings: List[float] = []
+    denied = 0
+    for i in range(checks):
+        key = f"login:ip:10.0.{(i % keys) // 256}.{(i % keys) % 256}"
+        started = time.perf_counter()
+        wait = store.take(key, RULE)
+        timings.append((time.perf_counter() - started) * 1e6)
+        denied += wait > 0
+    return {"timings": timings, "denied": denied}
+
+
+def _worker(args) -> dict:
+    return run_checks(*args)
+
+
+def summarize(timings: List[float], denied: int) -> dict:
+    timings = sorted(timings)
+    return {
+        "checks": len(timings),
+        "allowed": len(timings) - denied,
+        "denied": denied,
+        "p50_us": round(statistics.median(timings), 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+        "max_us": round(timings[-1], 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=10000, help="每个进程的检查次数")
+    parser.add_argument("--keys", type=int, default=1000, help="不同 key（客户端）的数量")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ratelimit.db")
+        single = run_checks(path, args.checks, args.keys)
+
+        ratelimit.SqliteBucketStore(path).reset()
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.map(_worker, [(path, args.checks, args.keys)] * args.processes)
+
+    print(json.dumps({
+        "rule": f"{RULE.count}/{RULE.period:g}s",
+        "single": summarize(single["timings"], single["denied"]),
+        "contended": {
+            "processes": args.processes,
+            **summarize(
+                [t for result in results for t in result["timings"]],
+                sum(result["denied"] for result in results),
+            ),
+        },
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+评分计算函数的微基准：get_game_evaluation、难度情境分组、get_difficulty_realm，
+以及 rating_engine 对同样数据的按列分组聚合（engine_contexts）。
+
+在内存中构造合成游戏（10 / 1k / 100k 条评分，分布在多个难度 × 机体情境中），不依赖数据库。
+每次运行的结果追加到历史文件；任一用例的中位耗时比最近几次运行中的最好成绩慢超过 --threshold%
+时以非零状态退出，可直接用在 CI 中。
+
+用法：
+    python -m benchmarks.bench_ratings
+    python -m benchmarks.bench_ratings --sizes 10 1000 --threshold 15 --history /tmp/ratings.json
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from app.utils import rating_engine
+from app.utils.ratings import get_difficulty_realm, get_game_evaluation
+
+DEFAULT_HISTORY = Path(__file__).resolve().parent.parent / ".benchmarks" / "bench_ratings.json"
+
+# 与最近多少次运行的最好成绩比较（取最好成绩可以过滤掉偶发的慢结果）
+BASELINE_WINDOW = 5
+
+# 每个用例至少运行的时长（秒），小用例会自动重复多次
+MIN_CASE_TIME = 0.2
+
+
+def make_game(rating_count: int, contexts: int, rng: random.Random, with_quality: bool = True) -> SimpleNamespace:
+    """构造带评分与评论的合成游戏，difficulty_level_id × ship_type_id 共 contexts 种组合"""
+    levels = max(1, contexts // 3)
+    ships = max(1, contexts // levels)
+    quality = [
+        SimpleNamespace(**{field: rng.randint(1, 5) for field in ("fun", "core", "depth", "performance", "story")})
+        for _ in range(rating_count if with_quality else 0)
+    ]
+    difficulty = []
+    for _ in range(rating_count):
+        base = rng.randint(5, 55)
+        difficulty.append(SimpleNamespace(
+            difficulty_level_id=rng.randint(1, levels),
+            ship_type_id=rng.randint(1, ships),
+            dodge=base + rng.randint(-5, 5),
+            strategy=base + rng.randint(-5, 5) if rng.random() > 0.1 else None,
+            execution=base + rng.randint(-5, 5),
+        ))
+    comments = [
+        SimpleNamespace(id=i, content="评论", author_id=i % 100, user_name=f"user{i % 100}")
+        for i in range(min(rating_count, 200))
+    ]
+    return SimpleNamespace(quality_ratings=quality, difficulty_ratings=difficulty, comments=comments)
+
+
+def time_case(func: Callable[[], object], repeats: int) -> Dict[str, float]:
+    """返回单次调用耗时（毫秒）的中位数 / 最小值"""
+    # 先估计需要多少次循环才能让每轮运行至少 MIN_CASE_TIME / repeats 秒
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_CASE_TIME / repeats or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    per_call = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started) / loops * 1000)
+    return {"median_ms": round(statistics.median(per_call), 6), "min_ms": round(min(per_call), 6), "loops": loops}
+
+
+def build_cases(sizes: List[int], contexts: int, seed: int) -> Dict[str, Callable[[], object]]:
+    rng = random.Random(seed)
+    cases: Dict[str, Callable[[], object]] = {}
+    for size in sizes:
+        game = make_game(size, contexts, rng)
+        cases[f"game_evaluation[{size}]"] = lambda game=game: get_game_evaluation(game)
+        # 只有难度评分：主要耗时在情境分组循环
+        difficulty_only = make_game(size, contexts, rng, with_quality=False)
+        cases[f"difficulty_contexts[{size}]"] = lambda game=difficulty_only: get_game_evaluation(game)
+        # 同样的难度评分按列交给评分引擎（不含取数时间）
+        rows = [
+            (1, r.difficulty_level_id, r.ship_type_id, r.dodge, r.strategy, r.execution)
+            for r in difficulty_only.difficulty_ratings
+        ]
+        cases[f"engine_contexts[{size}]"] = lambda rows=rows: (
+            rating_engine.difficulty_context_stats(rows), rating_engine.overall_difficulty_scores(rows)
+        )
+    scores = [rng.uniform(0, 60) for _ in range(1000)]
+    cases["difficulty_realm[x1000]"] = lambda: [get_difficulty_realm(s) for s in scores]
+    return cases
+
+
+def load_history(path: Path) -> List[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+
+
+def find_regressions(results: Dict[str, dict], history: List[dict], threshold: float) -> Dict[str, dict]:
+    regressions = {}
+    recent = history[-BASELINE_WINDOW:]
+    for name, result in results.items():
+        previous = [entry["results"][name]["median_ms"] for entry in recent if name in entry.get("results", {})]
+        if not previous:
+            continue
+        baseline = min(previous)
+        change = (result["median_ms"] - baseline) / baseline if baseline else 0.0
+        if change * 100 > threshold:
+            regressions[name] = {"baseline_ms": baseline, "median_ms": result["median_ms"], "change": round(change, 4)}
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000], help="每个游戏的评分条数")
+    parser.add_argument("--contexts", type=int, default=12, help="难度 × 机体情境数")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--threshold", type=float, default=20.0, help="允许的变慢比例（百分比）")
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="历史结果文件")
+    parser.add_argument("--no-save", action="store_true", help="不把本次结果写入历史文件")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.sizes, args.contexts, args.seed)
+    results = {name: time_case(func, args.repeats) for name, func in cases.items()}
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold)
+
+    entry = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    if not args.no_save:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        args.history.write_text(json.dumps(history + [entry], ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(json.dumps({**entry, "regressions": regressions}, ensure_ascii=False, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+SessionMiddleware 的每请求开销基准：匿名访问页面和静态资源时，有 / 没有会话中间件的耗时差。
+
+直接在进程内调用 ASGI 应用（不经过网络和 TestClient），比较三种配置：
+- none：当前应用（不使用 SessionMiddleware）
+- session：外层包一层与旧版本相同配置的 SessionMiddleware，请求不带 session Cookie
+- session_cookie：同上，但请求带着旧版本登录时写入的 session Cookie（{"user_id": ...}），
+  中间件每个请求都要校验签名、解码，并在响应中重新签名写回 Cookie
+三种配置轮流执行，减少机器负载波动的影响；输出每种配置的中位数耗时（微秒）以及相对 none 的差值。
+
+数据库需事先初始化（python -m app.cli init-db 或 benchmarks.seed_data）。
+
+用法：
+    STG_DATABASE_URL=sqlite:////tmp/stg_bench.db python -m benchmarks.bench_session_overhead
+    python -m benchmarks.bench_session_overhead --requests 500 --path / --path /static/css/style.css
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from base64 import b64encode
+from typing import Dict, List, Optional
+
+from itsdangerous import TimestampSigner
+from starlette.middleware.sessions import SessionMiddleware
+
+SECRET = "bench-session-secret"
+DEFAULT_PATHS = ["/", "/static/css/style.css"]
+
+
+def session_cookie(data: dict) -> bytes:
+    # 与 SessionMiddleware 写入的格式一致：base64(JSON) 再加时间戳签名
+    signed = TimestampSigner(SECRET).sign(b64encode(json.dumps(data).encode("utf-8")))
+    return b"session_id=" + signed
+
+
+async def call(app, path: str, headers: List[tuple]) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), *headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+        "state": {},
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(paths: List[str], requests: int, rounds: int) -> Dict[str, dict]:
+    from app.main import app
+
+    wrapped = SessionMiddleware(
+        app, secret_key=SECRET, session_cookie="session_id", max_age=3600 * 24 * 7, same_site="lax"
+    )
+    variants = {
+        "none": (app, []),
+        "session": (wrapped, []),
+        "session_cookie": (wrapped, [(b"cookie", session_cookie({"user_id": 1}))]),
+    }
+    report = {}
+    for path in paths:
+        timings: Dict[str, List[float]] = {name: [] for name in variants}
+        statuses = set()
+        for name, (target, headers) in variants.items():  # 预热
+            statuses.add(await call(target, path, headers))
+        per_round = max(1, requests // rounds)
+        for _ in range(rounds):
+            for name, (target, headers) in variants.items():
+                for _ in range(per_round):
+                    started = time.perf_counter()
+                    await call(target, path, headers)
+                    timings[name].append((time.perf_counter() - started) * 1e6)
+        medians = {name: statistics.median(values) for name, values in timings.items()}
+        report[path] = {
+            "status": sorted(statuses),
+            "requests": per_round * rounds,
+            **{
+                name: {
+                    "p50_us": round(median, 1),
+                    "overhead_us": round(median - medians["none"], 1),
+                }
+                for name, median in medians.items()
+            },
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="每种配置每个路径的请求数")
+    parser.add_argument("--rounds", type=int, default=10, help="三种配置轮流执行的轮数")
+    parser.add_argument("--path", action="append", help=f"默认 {' '.join(DEFAULT_PATHS)}")
+    parser.add_argument("--database-url", help="默认使用 STG_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["STG_DATABASE_URL"] = args.database_url
+    report = asyncio.run(run(args.path or DEFAULT_PATHS, args.requests, args.rounds))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
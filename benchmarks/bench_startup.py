@@ -0,0 +1,93 @@
+"""
+worker 启动耗时基准：从进程启动、导入 app.main 到第一个响应。
+
+每轮启动一个全新的 Python 进程（相当于一个新 worker 在没有预加载时的冷启动），在子进程中：
+- import_s：导入 app.main 的耗时
+- first_response_s：导入完成后，第一个请求（进程内 ASGI 调用）的耗时
+- lazy_loaded：导入完成时已加载的重量级可选模块（markdown / bleach 应按需导入）
+父进程另外统计 total_s：从启动子进程到拿到第一个响应（含解释器启动）。
+
+数据库需事先初始化（python -m app.cli init-db 或 benchmarks.seed_data），应用导入时不再建表。
+
+用法：
+    STG_DATABASE_URL=sqlite:////tmp/stg_bench.db python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --path /games --database-url sqlite:////tmp/stg_bench.db
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from app.config.constants import BASE_DIR
+
+HEAVY_MODULES = ["markdown", "bleach", "jose", "numpy", "PIL"]
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+loaded = [name for name in {modules!r} if name in sys.modules]
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    request_started = time.perf_counter()
+    status = client.get({path!r}).status_code
+    finished = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - started,
+    "first_response_s": finished - request_started,
+    "status": status,
+    "lazy_loaded": loaded,
+    "wall_time": time.time(),
+}}))
+"""
+
+
+def run_once(path: str, env: dict) -> dict:
+    code = CHILD.format(modules=HEAVY_MODULES, path=path)
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=str(BASE_DIR), env=env, capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["total_s"] = report.pop("wall_time") - started
+    return report
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "median": round(statistics.median(values), 4),
+        "min": round(min(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="第一个请求的路径")
+    parser.add_argument("--database-url", help="默认使用 STG_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.database_url:
+        env["STG_DATABASE_URL"] = args.database_url
+
+    runs = [run_once(args.path, env) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "path": args.path,
+        "status": sorted({run["status"] for run in runs}),
+        "import_s": summarize([run["import_s"] for run in runs]),
+        "first_response_s": summarize([run["first_response_s"] for run in runs]),
+        "total_s": summarize([run["total_s"] for run in runs]),
+        "loaded_after_import": runs[-1]["lazy_loaded"],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
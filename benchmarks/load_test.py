@@ -0,0 +1,283 @@
+"""
+可复现的压测脚本（httpx + asyncio）。
+
+对运行中的站点（建议先用 seed_data 生成数据）按加权场景发起请求：
+首页、浏览、游戏详情、统计、资源列表、品质 / 难度评分提交、资源投票。
+游戏与资源按 Zipf 分布选择，与 seed_data 的热度倾斜一致；相同 --seed 产生相同的请求序列。
+
+输出各场景的 p50 / p95 / p99、吞吐量、错误数与被限流（429）的次数（JSON），可保存后在不同提交之间对比。
+压测从单个 IP 发起，会很快触发登录 / 投票等路由的限流（见 app/utils/ratelimit.py），
+测服务端性能时应关闭限流启动被测服务（429 单独计入 rate_limited，不算错误）。
+登录失败的连接数记入 meta.login_failures，这些连接只跑不需要登录的场景；所选场景都需要登录且全部登录失败时直接退出：
+
+    python -m benchmarks.seed_data --database-url sqlite:////tmp/stg_bench.db --scale medium --reset
+    STG_DATABASE_URL=sqlite:////tmp/stg_bench.db STG_RATELIMIT_ENABLED=false gunicorn -c gunicorn_config.py app.main:app
+    python -m benchmarks.load_test --duration 60 --concurrency 50 --games 10000 --resources 20000 -o before.json
+    python -m benchmarks.load_test ... -o after.json
+    python -m benchmarks.load_test --compare before.json after.json
+
+只读高并发（对比同步 / 异步数据库会话下的吞吐，只选不需要登录的读场景，跳过登录）：
+
+    python -m benchmarks.load_test --concurrency 500 --duration 60 --preset reads -o reads.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.seed_data import SCALES, Zipf
+
+QUALITY_FIELDS = ["趣味性", "核心设计", "深度", "演出", "剧情"]
+DIFFICULTY_FIELDS = ["避弹", "策略", "执行"]
+
+# 场景名 -> 权重
+SCENARIO_WEIGHTS = {
+    "home": 10,
+    "browse": 15,
+    "game_detail": 30,
+    "stats": 5,
+    "resources": 10,
+    "rate_quality": 10,
+    "rate_difficulty": 5,
+    "resource_vote": 10,
+    "api_games": 5,
+}
+
+# 需要登录的场景
+AUTH_SCENARIOS = {"rate_quality", "rate_difficulty", "resource_vote"}
+
+# 预设场景组合（--preset）
+PRESETS = {
+    # 使用异步数据库会话的热点读路由
+    "reads": ["browse", "game_detail", "resources", "api_games"],
+}
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+class Scenarios:
+    def __init__(self, rng: random.Random, games: int, resources: int) -> None:
+        self.rng = rng
+        self.popular_games = Zipf(games, rng)
+        self.popular_resources = Zipf(resources, rng)
+        self.page_count = max(1, games // 20)
+
+    def home(self) -> Request:
+        return "GET", "/", None
+
+    def browse(self) -> Request:
+        page = min(self.page_count, 1 + int(self.rng.expovariate(0.5)))
+        return "GET", f"/games?page={page}", None
+
+    def game_detail(self) -> Request:
+        return "GET", f"/game/{self.popular_games.sample() + 1}", None
+
+    def stats(self) -> Request:
+        return "GET", "/stats", None
+
+    def resources(self) -> Request:
+        return "GET", "/resources/", None
+
+    def api_games(self) -> Request:
+        return "GET", "/api/v1/games", None
+
+    def rate_quality(self) -> Request:
+        form = {f"rating_{name}": str(self.rng.randint(1, 5)) for name in QUALITY_FIELDS}
+        return "POST", f"/game/{self.popular_games.sample() + 1}/rate_quality", form
+
+    def rate_difficulty(self) -> Request:
+        base = self.rng.randint(5, 55)
+        form = {f"rating_{name}": str(max(1, min(60, base + self.rng.randint(-5, 5)))) for name in DIFFICULTY_FIELDS}
+        return "POST", f"/game/{self.popular_games.sample() + 1}/rate_difficulty", form
+
+    def resource_vote(self) -> Request:
+        form = {"direction": "up" if self.rng.random() < 0.85 else "down"}
+        return "POST", f"/resources/{self.popular_resources.sample() + 1}/vote", form
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(
+    samples: Dict[str, List[float]], errors: Dict[str, int], rate_limited: Dict[str, int], elapsed: float
+) -> Dict[str, dict]:
+    report = {}
+    for name in sorted(set(samples) | set(errors) | set(rate_limited)):
+        values = sorted(samples.get(name, []))
+        report[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "rate_limited": rate_limited.get(name, 0),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2) if values else 0.0,
+        }
+    return report
+
+
+async def login(client: httpx.AsyncClient, username: str) -> bool:
+    try:
+        resp = await client.post("/login", data={"username": username, "password": "password"})
+    except httpx.HTTPError:
+        return False
+    return resp.status_code in (200, 303)
+
+
+def _cumulative(names: List[str]) -> List[int]:
+    cum_weights = []
+    total = 0
+    for name in names:
+        total += SCENARIO_WEIGHTS[name]
+        cum_weights.append(total)
+    return cum_weights
+
+
+async def run(args) -> dict:
+    names = [name for name, weight in SCENARIO_WEIGHTS.items() if weight and (name in args.scenarios)]
+    # 登录失败的连接只能跑不需要登录的场景
+    public_names = [name for name in names if name not in AUTH_SCENARIOS]
+
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {}
+    rate_limited: Dict[str, int] = {}
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    needs_login = bool(AUTH_SCENARIOS & set(names))
+    login_failures = 0
+
+    async def worker(index: int) -> None:
+        nonlocal login_failures
+        worker_rng = random.Random(args.seed * 1000 + index)
+        scenarios = Scenarios(worker_rng, args.games, args.resources)
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            worker_names = names
+            if needs_login and not await login(client, f"user{1 + index % max(1, args.users - 1)}"):
+                login_failures += 1
+                worker_names = public_names
+                if not worker_names:
+                    return
+            cum_weights = _cumulative(worker_names)
+            sent = 0
+            while time.perf_counter() < deadline and (not args.requests or sent < args.requests):
+                name = worker_rng.choices(worker_names, cum_weights=cum_weights)[0]
+                method, url, form = getattr(scenarios, name)()
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, url, data=form)
+                    status_code = resp.status_code
+                except httpx.HTTPError:
+                    status_code = None
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                sent += 1
+                if status_code is not None and status_code < 400:
+                    samples[name].append(elapsed_ms)
+                elif status_code == 429:
+                    rate_limited[name] = rate_limited.get(name, 0) + 1
+                else:
+                    errors[name] = errors.get(name, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total_requests = sum(len(v) for v in samples.values())
+    if login_failures == args.concurrency and not public_names:
+        raise SystemExit(f"[load_test] {login_failures} 个连接全部登录失败，所选场景都需要登录，压测未执行")
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "duration_s": round(elapsed, 2),
+            "concurrency": args.concurrency,
+            "scenarios": names,
+            "seed": args.seed,
+            # 登录失败（含被限流）的连接只跑不需要登录的场景，场景比例会偏离权重
+            "login_failures": login_failures,
+            "total_requests": total_requests,
+            "total_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        },
+        "scenarios": summarize(samples, errors, rate_limited, elapsed),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path: str, after_path: str) -> dict:
+    """对比两次压测报告：每个场景给出 p50/p95/p99 与吞吐量的变化比例（负数表示变快 / 变少）"""
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+
+    def change(old: float, new: float) -> Optional[float]:
+        return round((new - old) / old, 4) if old else None
+
+    diff = {}
+    for name in sorted(set(before["scenarios"]) & set(after["scenarios"])):
+        old, new = before["scenarios"][name], after["scenarios"][name]
+        diff[name] = {
+            # 旧报告没有 rate_limited 字段，按 0 处理
+            key: {"before": old.get(key, 0), "after": new.get(key, 0), "change": change(old.get(key, 0), new.get(key, 0))}
+            for key in ("p50_ms", "p95_ms", "p99_ms", "rps", "errors", "rate_limited")
+        }
+    return {
+        "before": before["meta"].get("commit"),
+        "after": after["meta"].get("commit"),
+        "scenarios": diff,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    small = SCALES["small"]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, default=0, help="每个并发连接最多发送的请求数（0 表示不限）")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--games", type=int, default=small["games"], help="数据库中的游戏数（与 seed_data 一致）")
+    parser.add_argument("--resources", type=int, default=small["resources"])
+    parser.add_argument("--users", type=int, default=small["users"])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIO_WEIGHTS), choices=list(SCENARIO_WEIGHTS))
+    parser.add_argument("--preset", choices=list(PRESETS), help="使用预设场景组合（覆盖 --scenarios）")
+    parser.add_argument("-o", "--output", help="把报告写入 JSON 文件")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="对比两份报告后退出")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), ensure_ascii=False, indent=2))
+        return
+    if args.preset:
+        args.scenarios = PRESETS[args.preset]
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
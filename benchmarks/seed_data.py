@@ -0,0 +1,304 @@
+"""
+生成压测用的合成数据。
+
+按 Zipf 分布模拟真实的热度倾斜：少数热门游戏 / 资源占据大部分评分、评论与投票，
+少数活跃用户贡献大部分内容。相同 --seed 生成的数据完全一致，便于在不同提交间对比。
+
+所有用户的密码都是 "password"（用户名 user0 ... userN，user0 为管理员），供 load_test 登录。
+
+用法：
+    python -m benchmarks.seed_data --database-url sqlite:////tmp/stg_bench.db --scale large --reset
+    python -m benchmarks.seed_data --scale small --games 2000 --quality-ratings 50000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import bindparam
+
+# 预设规模；单项参数可覆盖
+SCALES = {
+    "small": dict(users=500, games=1000, quality_ratings=20000, difficulty_ratings=8000, comments=5000,
+                  resources=2000, resource_votes=10000, bounties=300, articles=50),
+    "medium": dict(users=10000, games=10000, quality_ratings=200000, difficulty_ratings=80000, comments=50000,
+                   resources=20000, resource_votes=100000, bounties=3000, articles=300),
+    "large": dict(users=100000, games=50000, quality_ratings=1000000, difficulty_ratings=400000, comments=250000,
+                  resources=100000, resource_votes=500000, bounties=20000, articles=1000),
+}
+
+TAG_COUNT = 200
+RESOURCE_TAG_COUNT = 80
+COMPANY_COUNT = 800
+RESOURCE_CATEGORIES = ["游戏本体", "补丁", "OST", "设定集", "录像", "工具"]
+BOUNTY_CATEGORIES = ["技术求助", "资源征集", "合作邀请", "其他", "游戏悬赏"]
+
+# 每批插入的行数
+BATCH_SIZE = 10000
+
+# Zipf 指数：越大越集中在头部
+ZIPF_EXPONENT = 1.1
+
+
+class Zipf:
+    """按 Zipf 分布从 0..n-1 中抽样（排名越靠前越容易被抽中）"""
+
+    def __init__(self, n: int, rng: random.Random, exponent: float = ZIPF_EXPONENT) -> None:
+        self.n = n
+        self.rng = rng
+        # 打乱排名与 id 的对应关系，避免「id 越小越热门」这种不真实的规律
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+        total = 0.0
+        self.cumulative = []
+        for rank in range(1, n + 1):
+            total += 1.0 / rank ** exponent
+            self.cumulative.append(total)
+        self.total = total
+
+    def sample(self) -> int:
+        rank = bisect_left(self.cumulative, self.rng.random() * self.total)
+        return self.order[min(rank, self.n - 1)]
+
+
+def _batches(rows: Iterable[dict], size: int = BATCH_SIZE) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(conn, table, rows: Iterable[dict]) -> int:
+    count = 0
+    for batch in _batches(rows):
+        conn.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def _unique_pairs(total: int, left: Zipf, right_count: int, rng: random.Random):
+    """生成不重复的 (left, right) 组合：left 按 Zipf 抽样，right 均匀抽样"""
+    seen = set()
+    attempts = 0
+    while len(seen) < total and attempts < total * 5:
+        attempts += 1
+        pair = (left.sample(), rng.randrange(right_count))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        yield pair
+
+
+def seed(conn, counts: Dict[str, int], rng: random.Random) -> Dict[str, int]:
+    from app import auth, models
+    from app.utils.rendering import render_markdown
+
+    now = datetime.utcnow()
+    report: Dict[str, int] = {}
+
+    def ago(max_days: int = 730) -> datetime:
+        return now - timedelta(seconds=rng.randrange(max_days * 86400))
+
+    # 用户：只计算一次密码哈希，所有用户共用
+    hashed = auth.get_password_hash("password")
+    n_users = counts["users"]
+    report["users"] = _insert(conn, models.User.__table__, (
+        {"id": i + 1, "username": f"user{i}", "email": f"user{i}@example.com",
+         "hashed_password": hashed, "is_admin": i == 0, "created_at": ago()}
+        for i in range(n_users)
+    ))
+    active_users = Zipf(n_users, rng)
+
+    def user_id() -> int:
+        return active_users.sample() + 1
+
+    # 标签 / 游戏
+    report["tags"] = _insert(conn, models.Tag.__table__, (
+        {"id": i + 1, "name": f"标签{i}"} for i in range(TAG_COUNT)
+    ))
+    tag_popularity = Zipf(TAG_COUNT, rng)
+    company_popularity = Zipf(COMPANY_COUNT, rng)
+
+    n_games = counts["games"]
+    report["games"] = _insert(conn, models.Game.__table__, (
+        {"id": i + 1, "title": f"Game {i:06d}", "company": f"社团{company_popularity.sample():04d}",
+         "description": f"合成数据游戏 {i}", "image_url": None, "created_by": user_id()}
+        for i in range(n_games)
+    ))
+
+    def game_tags() -> Iterator[dict]:
+        for game_id in range(1, n_games + 1):
+            for tag in {tag_popularity.sample() for _ in range(rng.randint(1, 5))}:
+                yield {"game_id": game_id, "tag_id": tag + 1}
+
+    report["game_tags"] = _insert(conn, models.game_tag_association, game_tags())
+
+    report["aliases"] = _insert(conn, models.Alias.__table__, (
+        {"game_id": game_id, "name": f"别名{game_id}-{k}"}
+        for game_id in range(1, n_games + 1)
+        for k in range(rng.choice((0, 0, 1, 2)))
+    ))
+
+    # 难度等级 / 机体：记录每个游戏拥有的 id，难度评分从中选择
+    levels: List[Sequence[int]] = []
+    ships: List[Sequence[int]] = []
+    level_rows, ship_rows = [], []
+    for game_id in range(1, n_games + 1):
+        start = len(level_rows) + 1
+        for name in ("Easy", "Normal", "Hard", "Lunatic")[: rng.randint(1, 4)]:
+            level_rows.append({"id": len(level_rows) + 1, "game_id": game_id, "name": name})
+        levels.append(range(start, len(level_rows) + 1))
+        start = len(ship_rows) + 1
+        for k in range(rng.randint(1, 3)):
+            ship_rows.append({"id": len(ship_rows) + 1, "game_id": game_id, "name": f"机体{k + 1}"})
+        ships.append(range(start, len(ship_rows) + 1))
+    report["difficulty_levels"] = _insert(conn, models.DifficultyLevel.__table__, level_rows)
+    report["ship_types"] = _insert(conn, models.ShipType.__table__, ship_rows)
+
+    popular_games = Zipf(n_games, rng)
+
+    # 评分：每个用户对每个游戏最多一条品质评分；热门游戏评分多且偏高
+    def quality_rows() -> Iterator[dict]:
+        for game, user in _unique_pairs(counts["quality_ratings"], popular_games, n_users, rng):
+            bias = 1 if game % 3 == 0 else 0
+            yield {"game_id": game + 1, "user_id": user + 1, "user_name": f"user{user}",
+                   **{field: min(5, rng.randint(1, 5) + bias) for field in ("fun", "core", "depth", "performance", "story")},
+                   "created_at": ago()}
+
+    report["quality_ratings"] = _insert(conn, models.QualityRating.__table__, quality_rows())
+
+    def difficulty_rows() -> Iterator[dict]:
+        for game, user in _unique_pairs(counts["difficulty_ratings"], popular_games, n_users, rng):
+            base = rng.randint(5, 55)
+            yield {"game_id": game + 1, "user_id": user + 1, "user_name": f"user{user}",
+                   "difficulty_level_id": rng.choice(levels[game]), "ship_type_id": rng.choice(ships[game]),
+                   **{field: max(1, min(60, base + rng.randint(-5, 5))) for field in ("dodge", "strategy", "execution")},
+                   "created_at": ago()}
+
+    report["difficulty_ratings"] = _insert(conn, models.DifficultyRating.__table__, difficulty_rows())
+
+    def comment_rows() -> Iterator[dict]:
+        for _ in range(counts["comments"]):
+            uid = user_id()
+            yield {"game_id": popular_games.sample() + 1, "author_id": uid, "user_name": f"user{uid - 1}",
+                   "content": "合成评论 " * rng.randint(1, 20)}
+
+    report["comments"] = _insert(conn, models.Comment.__table__, comment_rows())
+
+    # 资源 / 投票
+    report["resource_tags"] = _insert(conn, models.ResourceTag.__table__, (
+        {"id": i + 1, "name": f"资源标签{i}"} for i in range(RESOURCE_TAG_COUNT)
+    ))
+    n_resources = counts["resources"]
+    report["resources"] = _insert(conn, models.Resource.__table__, (
+        {"id": i + 1, "title": f"资源 {i}", "content": "https://example.com/download", "intro": "合成资源",
+         "cover_image": None, "category": rng.choice(RESOURCE_CATEGORIES),
+         "status": "valid" if rng.random() > 0.05 else "invalid", "heat": 0,
+         "uploader_id": user_id(), "created_at": ago()}
+        for i in range(n_resources)
+    ))
+    resource_tag_popularity = Zipf(RESOURCE_TAG_COUNT, rng)
+    report["resource_tag_links"] = _insert(conn, models.resource_tag_association, (
+        {"resource_id": resource_id, "resource_tag_id": tag + 1}
+        for resource_id in range(1, n_resources + 1)
+        for tag in {resource_tag_popularity.sample() for _ in range(rng.randint(0, 3))}
+    ))
+
+    heat = [0] * n_resources
+    popular_resources = Zipf(n_resources, rng)
+
+    def vote_rows() -> Iterator[dict]:
+        for resource, user in _unique_pairs(counts["resource_votes"], popular_resources, n_users, rng):
+            value = 1 if rng.random() < 0.85 else -1
+            heat[resource] += value
+            yield {"resource_id": resource + 1, "user_id": user + 1, "value": value, "created_at": ago()}
+
+    report["resource_votes"] = _insert(conn, models.ResourceVote.__table__, vote_rows())
+    resources = models.Resource.__table__
+    heat_rows = [{"rid": i + 1, "h": h} for i, h in enumerate(heat) if h]
+    if heat_rows:
+        conn.execute(
+            resources.update().where(resources.c.id == bindparam("rid")).values(heat=bindparam("h")),
+            heat_rows,
+        )
+
+    # 悬赏
+    category_ids = [row[0] for row in conn.execute(models.BountyCategory.__table__.select().with_only_columns(
+        models.BountyCategory.__table__.c.id))]
+    if not category_ids:
+        _insert(conn, models.BountyCategory.__table__, (
+            {"id": i + 1, "name": name} for i, name in enumerate(BOUNTY_CATEGORIES)
+        ))
+        category_ids = list(range(1, len(BOUNTY_CATEGORIES) + 1))
+    report["bounties"] = _insert(conn, models.Bounty.__table__, (
+        {"id": i + 1, "title": f"悬赏 {i}", "content": "合成悬赏内容", "reward": f"{rng.randint(1, 500)} 元",
+         "game_name": f"Game {popular_games.sample():06d}", "created_by": user_id(),
+         "category_id": rng.choice(category_ids), "is_completed": rng.random() < 0.3,
+         "created_at": ago(), "updated_at": now}
+        for i in range(counts["bounties"])
+    ))
+
+    # 文章：正文按真实流程渲染一次
+    article_md = "\n\n".join(f"## 第 {k} 节\n\n合成文章段落，**加粗** 与 `代码`。\n\n- 要点 A\n- 要点 B" for k in range(8))
+    article_html = render_markdown(article_md)
+    admin_id = 1
+    report["articles"] = _insert(conn, models.Article.__table__, (
+        {"id": i + 1, "title": f"文章 {i}", "slug": f"article-{i}", "content_md": article_md,
+         "content_html": article_html, "status": "published", "author_id": admin_id,
+         "created_at": ago(), "updated_at": now}
+        for i in range(counts["articles"])
+    ))
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="目标数据库（默认使用 STG_DATABASE_URL）")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--reset", action="store_true", help="先删除并重建所有表")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name)
+    args = parser.parse_args(argv)
+
+    # 必须在导入 app.database 之前设置
+    if args.database_url:
+        os.environ["STG_DATABASE_URL"] = args.database_url
+
+    from app import cli, database, models
+
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    engine = database.engine
+    if args.reset:
+        models.Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    # 与部署相同，通过迁移建表（之后可以直接对这个库运行 init-db）
+    cli.migrate()
+
+    with engine.connect() as conn:
+        if conn.execute(models.Game.__table__.select().limit(1)).first() is not None:
+            parser.error("数据库中已有数据，请使用 --reset 或指定新的 --database-url")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        report = seed(conn, counts, random.Random(args.seed))
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -90,7 +90,8 @@ print_usage() {
   menu                  交互式菜单（默认）
   install               安装 / 更新
   uninstall             卸载
-  backup                备份当前安装（代码 + 数据库 + 上传文件，过滤环境数据）
+  backup                备份当前安装（代码 + 数据库在线备份副本 + 上传文件，过滤环境数据）
+                        仅备份数据库（压缩 / 轮换 / 校验）：venv/bin/python -m app.cli backup
 
 常用选项:
   --domain <域名>       指定域名（使用 HTTPS 模式）
@@ -986,9 +987,8 @@ setup_env_file() {
         if command -v python3 &> /dev/null; then
             print_info "自动生成安全密钥..."
             SECRET_KEY=$(python3 -c "import secrets; print(secrets.token_urlsafe(32))" 2>/dev/null)
-            SESSION_KEY=$(python3 -c "import secrets; print(secrets.token_urlsafe(32))" 2>/dev/null)
             
-            if [ -n "$SECRET_KEY" ] && [ -n "$SESSION_KEY" ]; then
+            if [ -n "$SECRET_KEY" ]; then
                 # 更新或添加密钥
                 if grep -q "STG_SECRET_KEY=" "$ENV_FILE"; then
                     sed -i "s|STG_SECRET_KEY=.*|STG_SECRET_KEY=$SECRET_KEY|" "$ENV_FILE"
@@ -996,12 +996,6 @@ setup_env_file() {
                     echo "STG_SECRET_KEY=$SECRET_KEY" >> "$ENV_FILE"
                 fi
                 
-                if grep -q "STG_SESSION_SECRET_KEY=" "$ENV_FILE"; then
-                    sed -i "s|STG_SESSION_SECRET_KEY=.*|STG_SESSION_SECRET_KEY=$SESSION_KEY|" "$ENV_FILE"
-                else
-                    echo "STG_SESSION_SECRET_KEY=$SESSION_KEY" >> "$ENV_FILE"
-                fi
-                
                 print_info "安全密钥已自动生成 ✓"
             fi
             
@@ -1071,7 +1065,7 @@ static_cleanup() {
     print_info "第一步：预览（dry-run），不会真正删除任何文件，只打印即将被删除的对象。"
     echo ""
 
-    local PY_CMD_DRY="from app.maintenance.cleanup_static import cleanup_covers, cleanup_article_statics; cleanup_covers(dry_run=True); cleanup_article_statics(dry_run=True)"
+    local PY_CMD_DRY="from app.maintenance.cleanup_static import cleanup_uploads, cleanup_article_statics, cleanup_article_leftovers; cleanup_uploads(dry_run=True); cleanup_article_statics(dry_run=True); cleanup_article_leftovers(dry_run=True)"
     run_as_user "$SERVICE_USER" "cd '$INSTALL_DIR' && source venv/bin/activate && python3 -c \"$PY_CMD_DRY\"" || {
         print_error "dry-run 预览执行失败，请检查应用代码与依赖是否完整。"
         return 1
@@ -1090,7 +1084,7 @@ static_cleanup() {
     fi
 
     print_warn "即将执行实际删除，请确保已做好备份！"
-    local PY_CMD_REAL="from app.maintenance.cleanup_static import cleanup_covers, cleanup_article_statics; cleanup_covers(dry_run=False); cleanup_article_statics(dry_run=False)"
+    local PY_CMD_REAL="from app.maintenance.cleanup_static import cleanup_uploads, cleanup_article_statics, cleanup_article_leftovers; cleanup_uploads(dry_run=False); cleanup_article_statics(dry_run=False); cleanup_article_leftovers(dry_run=False)"
     run_as_user "$SERVICE_USER" "cd '$INSTALL_DIR' && source venv/bin/activate && python3 -c \"$PY_CMD_REAL\"" || {
         print_error "实际删除执行过程中出现错误，请检查输出信息。"
         return 1
@@ -1172,11 +1166,46 @@ backup() {
         EXCLUDE_ARGS+=("$exclude_pattern")
     done < <(get_backup_exclude_patterns)
 
+    # 数据库不直接打包正在写入的文件（可能得到损坏的副本），而是用在线备份命令生成一致的副本
+    # （SQLite backup API 分批复制 + integrity_check），再追加到压缩包中
+    local STAGE_DIR
+    STAGE_DIR=$(mktemp -d)
+    local DB_FILE="$INSTALL_DIR/stg_website.db"
+    local DB_STAGED=false
+    if [ -f "$DB_FILE" ] && [ -x "$INSTALL_DIR/venv/bin/python" ]; then
+        print_info "正在生成数据库在线备份..."
+        mkdir -p "$STAGE_DIR/$INSTALL_BASENAME"
+        if (cd "$INSTALL_DIR" && set -a && { [ ! -f .env ] || source .env; } && set +a && \
+            venv/bin/python -m app.cli backup --output "$STAGE_DIR/$INSTALL_BASENAME/stg_website.db" --compression none); then
+            DB_STAGED=true
+            EXCLUDE_ARGS+=("--exclude=stg_website.db" "--exclude=stg_website.db-*")
+        else
+            print_error "数据库在线备份失败，已取消备份。"
+            rm -rf "$STAGE_DIR"
+            return 1
+        fi
+    elif [ -f "$DB_FILE" ]; then
+        print_warn "未找到虚拟环境，数据库文件将直接打包（请确保服务已停止）"
+    fi
+
     # 创建压缩包
-    if ! tar -czf "$BACKUP_PATH" "${EXCLUDE_ARGS[@]}" "$INSTALL_BASENAME" 2>/dev/null; then
+    local TAR_FILE="$STAGE_DIR/backup.tar"
+    if ! tar -cf "$TAR_FILE" "${EXCLUDE_ARGS[@]}" "$INSTALL_BASENAME" 2>/dev/null; then
         print_error "备份失败，请检查磁盘空间和权限，以及 tar 命令是否可用。"
+        rm -rf "$STAGE_DIR"
+        return 1
+    fi
+    if [ "$DB_STAGED" = true ] && ! tar -rf "$TAR_FILE" -C "$STAGE_DIR" "$INSTALL_BASENAME/stg_website.db" 2>/dev/null; then
+        print_error "备份失败：无法把数据库副本加入压缩包。"
+        rm -rf "$STAGE_DIR"
+        return 1
+    fi
+    if ! gzip -c "$TAR_FILE" > "$BACKUP_PATH"; then
+        print_error "备份失败，请检查磁盘空间和权限。"
+        rm -rf "$STAGE_DIR"
         return 1
     fi
+    rm -rf "$STAGE_DIR"
 
     # 验证备份文件
     if [ ! -f "$BACKUP_PATH" ]; then
@@ -1314,7 +1343,7 @@ setup_database() {
         DB_EXISTS=false
     fi
     
-    # 初始化数据库表
+    # 初始化数据库：Alembic 迁移到最新版本 + 悬赏板块等初始数据（应用启动时不再建表）
     if [ "$DB_EXISTS" = true ]; then
         print_info "更新数据库表结构（保留现有数据）..."
     else
@@ -1334,7 +1363,7 @@ setup_database() {
     # 直接调用 run_as_user（数据库初始化通常很快，不需要 timeout）
     # 如果确实需要超时保护，可以在 Python 代码层面实现
     print_info "执行数据库初始化命令..."
-    DB_OUTPUT=$(run_as_user "$SERVICE_USER" "cd '$INSTALL_DIR' && $ENV_VARS source venv/bin/activate && python3 -c 'from app import models, database; models.Base.metadata.create_all(bind=database.engine)'" 2>&1)
+    DB_OUTPUT=$(run_as_user "$SERVICE_USER" "cd '$INSTALL_DIR' && $ENV_VARS source venv/bin/activate && python3 -m app.cli init-db" 2>&1)
     DB_EXIT=$?
     
     # 重新启用 set -e
@@ -1353,35 +1382,16 @@ setup_database() {
         print_error "  2. 数据库文件路径是否有写权限"
         print_error "  3. 如果使用 PostgreSQL/MySQL，请确保数据库服务正在运行"
         print_error "  4. 检查虚拟环境中的依赖是否完整安装"
-        print_error "  5. 尝试手动运行: cd $INSTALL_DIR && source venv/bin/activate && python3 -c 'from app import models, database; models.Base.metadata.create_all(bind=database.engine)'"
+        print_error "  5. 尝试手动运行: cd $INSTALL_DIR && source venv/bin/activate && python3 -m app.cli init-db"
         exit 1
     else
-        print_info "数据库表创建成功 ✓"
+        print_info "数据库迁移与初始数据完成 ✓"
         # 显示输出（如果有）
         if [ -n "$DB_OUTPUT" ] && [ "$DB_OUTPUT" != "" ]; then
             echo "$DB_OUTPUT"
         fi
     fi
     
-    # 初始化悬赏板块
-    print_info "初始化悬赏板块..."
-    set +e
-    BOUNTY_OUTPUT=$(run_as_user "$SERVICE_USER" "cd '$INSTALL_DIR' && $ENV_VARS source venv/bin/activate && python3 -c 'from app.main import init_bounty_categories; init_bounty_categories()'" 2>&1)
-    BOUNTY_EXIT=$?
-    set -e
-    
-    if [ $BOUNTY_EXIT -eq 0 ]; then
-        print_info "悬赏板块初始化完成 ✓"
-        if [ -n "$BOUNTY_OUTPUT" ] && [ "$BOUNTY_OUTPUT" != "" ]; then
-            echo "$BOUNTY_OUTPUT"
-        fi
-    else
-        print_warn "悬赏板块初始化失败（退出码: $BOUNTY_EXIT），但可以继续"
-        if [ -n "$BOUNTY_OUTPUT" ]; then
-            echo "警告输出: $BOUNTY_OUTPUT"
-        fi
-    fi
-    
     # 设置数据库文件权限
     if [ -f "stg_website.db" ]; then
         chmod 600 "stg_website.db"
@@ -1408,6 +1418,14 @@ setup_systemd_service() {
         # 启用服务
         systemctl enable "${PROJECT_NAME}.service"
         
+        # 相似游戏后台计算（常驻，随主服务启动 / 停止 / 重启）
+        SIMILARITY_TEMPLATE="$INSTALL_DIR/${PROJECT_NAME}_similarity.service"
+        if [ -f "$SIMILARITY_TEMPLATE" ]; then
+            cp "$SIMILARITY_TEMPLATE" "/etc/systemd/system/${PROJECT_NAME}_similarity.service"
+            systemctl daemon-reload
+            systemctl enable "${PROJECT_NAME}_similarity.service"
+        fi
+        
         print_info "Systemd 服务配置完成 ✓"
     else
         print_error "未找到服务模板文件: $SERVICE_TEMPLATE"
@@ -1556,16 +1574,19 @@ uninstall() {
     
     # 停止服务
     print_info "停止服务..."
+    systemctl stop "${PROJECT_NAME}_similarity.service" 2>/dev/null || true
     systemctl stop "${PROJECT_NAME}.service" 2>/dev/null || true
     systemctl stop caddy 2>/dev/null || true
     
     # 禁用服务
     print_info "禁用服务..."
+    systemctl disable "${PROJECT_NAME}_similarity.service" 2>/dev/null || true
     systemctl disable "${PROJECT_NAME}.service" 2>/dev/null || true
     systemctl disable caddy 2>/dev/null || true
     
     # 删除服务文件
     print_info "删除服务文件..."
+    rm -f "/etc/systemd/system/${PROJECT_NAME}_similarity.service"
     rm -f "/etc/systemd/system/${PROJECT_NAME}.service"
     rm -f /etc/systemd/system/caddy.service
     systemctl daemon-reload
@@ -1,6 +1,8 @@
 # Gunicorn configuration file for STG Community Website
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 # Server socket
 bind = "127.0.0.1:8000"
@@ -19,6 +21,25 @@ errorlog = "-"   # Log to stderr (captured by systemd)
 loglevel = os.getenv("STG_LOG_LEVEL", "info")
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
+# Metrics: workers write Prometheus metrics to mmap files in this directory and
+# /metrics aggregates them. Must be set before the app (and prometheus_client) is imported.
+# Stale files from a previous run are removed on start.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "stg_metrics")
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges (e.g. email queue depth) of a worker that exited."""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
 # Process naming
 proc_name = "stg_website"
 
@@ -1,6 +1,7 @@
 # set_admin.py
 import sys
 from app import models, database
+from app.utils import token_versions
 
 def set_user_admin_status(username: str, is_admin: bool):
     """设置用户的管理员状态"""
@@ -11,7 +12,10 @@ def set_user_admin_status(username: str, is_admin: bool):
             print(f"错误：找不到用户 '{username}'")
             return
 
-        user.is_admin = is_admin
+        if user.is_admin != is_admin:
+            user.is_admin = is_admin
+            # 作废该用户已签发的登录 token，新的管理员身份在下次登录时写入 token
+            token_versions.bump(user)
         db.commit()
         status = "管理员" if is_admin else "普通用户"
         print(f"成功将用户 '{username}' 的状态设置为 {status}。")
@@ -0,0 +1,88 @@
+"""
+测试配置
+
+- 数据库、限流库、发信锁文件都放在本次测试的临时目录中，不影响开发库；必须在导入 app 之前设置环境变量
+- 数据库与部署相同，通过迁移建表，再用 benchmarks.seed_data 写入少量合成数据（所有用户密码为 "password"，user0 为管理员）
+- 关闭后台发信线程与限流，需要时由测试自己调用 outbox.drain() / ratelimit
+"""
+import os
+import random
+import shutil
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="stg-tests-")
+os.environ.update({
+    "STG_DATABASE_URL": f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}",
+    "STG_RATELIMIT_DB": os.path.join(TEST_DIR, "ratelimit.db"),
+    "STG_RATELIMIT_ENABLED": "false",
+    "STG_EMAIL_DISPATCHER": "false",
+    "STG_EMAIL_LOCK_PATH": os.path.join(TEST_DIR, "email_outbox.lock"),
+    "STG_READ_SNAPSHOT_SECONDS": "0",
+})
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+pytest_plugins = ["tests.query_budget", "tests.loop_guard"]
+
+# 合成数据规模（benchmarks.seed_data.SCALES 中的各项）
+SEED_COUNTS = dict(users=6, games=12, quality_ratings=30, difficulty_ratings=15, comments=20,
+                   resources=8, resource_votes=15, bounties=4, articles=2)
+
+ADMIN_ID = 1
+USER_ID = 2
+
+
+def pytest_sessionfinish(session, exitstatus) -> None:
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def seeded():
+    """建表并写入合成数据，返回各表的行数"""
+    from app import cli, database
+    from benchmarks import seed_data
+
+    cli.migrate()
+    with database.engine.begin() as conn:
+        counts = seed_data.seed(conn, SEED_COUNTS, random.Random(42))
+    cli.seed()
+    return counts
+
+
+@pytest.fixture(scope="session")
+def app(seeded):
+    from app.main import app
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """匿名访问的客户端（不跟随重定向）"""
+    with TestClient(app, follow_redirects=False) as client:
+        yield client
+
+
+def login(client: TestClient, user_id: int) -> TestClient:
+    """直接签发登录 token 写入 Cookie（与 /login 写入的 Cookie 相同）"""
+    from app import auth, database, models
+
+    db = database.SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        token = auth.create_access_token(data=auth.token_claims(user))
+    finally:
+        db.close()
+    client.cookies.set("access_token", f"Bearer {token}")
+    return client
+
+
+@pytest.fixture
+def user_client(client):
+    return login(client, USER_ID)
+
+
+@pytest.fixture
+def admin_client(client):
+    return login(client, ADMIN_ID)
@@ -0,0 +1,102 @@
+"""
+pytest 插件：事件循环阻塞检查
+
+在 tests/conftest.py 中启用：
+
+    pytest_plugins = ["tests.query_budget", "tests.loop_guard"]
+
+启用后，测试期间通过 TestClient 发出的请求出现以下情况即让该测试失败：
+- 同步引擎（database.engine）的语句在事件循环线程中执行：async def 路由 / 依赖 / 中间件里的同步查询，
+  无论测试库上有多快都会被发现（生产数据量下它们就是阻塞点）
+- 事件循环阻塞超过 STG_LOOP_BLOCK_TEST_MS（默认 100ms，看门狗检测，覆盖文件读写等其他阻塞）
+失败信息附带调用栈。单个测试可用 @pytest.mark.loop_block(ms) 放宽阻塞阈值（只能调高），
+loop_block(None) 表示两项都不检查。
+
+同步（def）路由在线程池中执行，不会阻塞事件循环，因此不受此检查影响。
+"""
+import asyncio
+import os
+import traceback
+from typing import List, Optional, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from app import database
+from app.config.constants import BASE_DIR
+from app.utils import loop_watchdog
+
+TEST_THRESHOLD_MS = float(os.getenv("STG_LOOP_BLOCK_TEST_MS", "100"))
+
+APP_DIR = str(BASE_DIR / "app")
+
+
+class BlockRecorder:
+    """收集一个测试期间的阻塞事件与在事件循环线程中执行的同步语句"""
+
+    def __init__(self) -> None:
+        self.blocks: List[loop_watchdog.BlockEvent] = []
+        self.statements: List[Tuple[str, str]] = []
+
+    def __call__(self, block: loop_watchdog.BlockEvent) -> None:
+        self.blocks.append(block)
+
+    def failures(self, threshold_ms: float) -> List[str]:
+        failures = [
+            f"同步语句在事件循环中执行：{statement}\n{stack}"
+            for statement, stack in self.statements
+        ]
+        failures.extend(
+            f"阻塞 {block.duration_ms:.1f}ms（阈值 {threshold_ms:.0f}ms），调用栈：\n{block.stack}"
+            for block in self.blocks
+            if block.duration_ms >= threshold_ms
+        )
+        return failures
+
+
+_recorder: Optional[BlockRecorder] = None
+
+
+def _app_stack() -> str:
+    """只保留项目代码的栈帧，直接指向发出查询的路由 / 依赖"""
+    frames = [frame for frame in traceback.extract_stack()[:-2] if frame.filename.startswith(APP_DIR)]
+    return "".join(traceback.format_list(frames))
+
+
+def _check_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _recorder is None:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # 不在事件循环线程中（线程池、脚本），不阻塞
+    _recorder.statements.append((statement.split("\n", 1)[0][:200], _app_stack()))
+
+
+def pytest_configure(config) -> None:
+    config.addinivalue_line("markers", "loop_block(ms): 放宽本测试的事件循环阻塞阈值，None 表示不检查")
+    loop_watchdog.configure(threshold_ms=TEST_THRESHOLD_MS)
+    if not event.contains(database.engine, "before_cursor_execute", _check_statement):
+        event.listen(database.engine, "before_cursor_execute", _check_statement)
+
+
+@pytest.fixture(autouse=True)
+def loop_block(request):
+    """记录本测试中事件循环的阻塞，测试结束时有同步语句在事件循环中执行或阻塞超过阈值即失败"""
+    global _recorder
+    recorder = _recorder = BlockRecorder()
+    loop_watchdog.add_observer(recorder)
+    try:
+        yield recorder
+    finally:
+        loop_watchdog.remove_observer(recorder)
+        _recorder = None
+    marker = request.node.get_closest_marker("loop_block")
+    threshold_ms = TEST_THRESHOLD_MS
+    if marker:
+        if marker.args and marker.args[0] is None:
+            return
+        threshold_ms = max(threshold_ms, marker.args[0])
+    failures = recorder.failures(threshold_ms)
+    if failures:
+        pytest.fail("事件循环被阻塞：\n" + "\n".join(failures), pytrace=False)
@@ -0,0 +1,84 @@
+"""
+pytest 插件：路由查询预算与 N+1 检测
+
+在 tests/conftest.py 中启用：
+
+    pytest_plugins = ["tests.query_budget", "tests.loop_guard"]
+
+启用后：
+- N+1 检测器切换为 raise 模式，任何请求中同一关系加载超过阈值都会让测试失败
+- 每个测试通过 TestClient 发出的请求都会按路由模板检查 SQL 语句数，
+  超过 ROUTE_QUERY_BUDGETS 中的上限（未列出的路由使用 DEFAULT_QUERY_BUDGET）即失败
+- 单个测试可用 @pytest.mark.query_budget(n) 覆盖上限，或用 query_budget fixture 读取本测试的记录
+
+预算按「与数据量无关」来设定：列表页的语句数不应随行数增长，超出通常意味着出现了逐行查询。
+"""
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from app.utils import instrumentation, nplusone
+
+# 未列出的路由的默认上限（含中间件中读取当前用户的 1 条语句）
+DEFAULT_QUERY_BUDGET = 10
+
+# "METHOD 路由模板" -> 语句数上限
+ROUTE_QUERY_BUDGETS: Dict[str, int] = {
+    "GET /": 30,
+    "GET /games": 12,
+    "GET /stats": 18,
+    "GET /game/{game_id}": 15,
+    "GET /game/{game_id}/edit": 10,
+    "GET /user/{user_id}": 25,
+    "GET /api/v1/games": 8,
+    "GET /leaderboard": 12,
+    "GET /api/v1/leaderboard": 8,
+    "GET /articles": 5,
+    "GET /bounties": 8,
+    "GET /bounty/{bounty_id}": 10,
+    "GET /resources/": 8,
+    "GET /resources/{resource_id}": 8,
+}
+
+
+def budget_for(label: str) -> int:
+    return ROUTE_QUERY_BUDGETS.get(label, DEFAULT_QUERY_BUDGET)
+
+
+class QueryRecorder:
+    """收集一个测试期间所有请求的 (路由, 语句数, 执行过的语句)"""
+
+    def __init__(self) -> None:
+        self.requests: List[Tuple[str, int, List[str]]] = []
+
+    def __call__(self, method: str, route: str, stats: instrumentation.RequestStats) -> None:
+        self.requests.append((f"{method} {route}", stats.query_count, list(stats.statements)))
+
+    def over_budget(self, override: Optional[int] = None) -> List[str]:
+        failures = []
+        for label, count, statements in self.requests:
+            limit = override if override is not None else budget_for(label)
+            if count > limit:
+                failures.append(f"{label}: {count} 条语句，上限 {limit}\n    " + "\n    ".join(statements))
+        return failures
+
+
+def pytest_configure(config) -> None:
+    config.addinivalue_line("markers", "query_budget(n): 覆盖本测试中所有请求的 SQL 语句数上限")
+    nplusone.configure(mode="raise")
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request):
+    """记录本测试中的请求，测试结束时检查语句数是否超出预算"""
+    recorder = QueryRecorder()
+    instrumentation.add_observer(recorder)
+    try:
+        yield recorder
+    finally:
+        instrumentation.remove_observer(recorder)
+    marker = request.node.get_closest_marker("query_budget")
+    override = marker.args[0] if marker else None
+    failures = recorder.over_budget(override)
+    if failures:
+        pytest.fail("SQL 语句数超出预算：\n" + "\n".join(failures), pytrace=False)
@@ -0,0 +1,190 @@
+"""
+静态包后台解压：符号链接切换与同一 slug 的串行安装、执行进程退出后的任务状态，以及残留目录的清理。
+"""
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
+import pytest
+
+from app.maintenance import cleanup_static
+from app.utils import archives
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archives, "JOBS_DIR", tmp_path / "jobs")
+    archives.JOBS_DIR.mkdir()
+    return archives.JOBS_DIR
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _zip(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_install_job_completes(jobs_dir, tmp_path):
+    zip_path = tmp_path / "package.zip"
+    zip_path.write_bytes(_zip({"index.html": "<h1>hi</h1>"}))
+    target = tmp_path / "static" / "slug"
+
+    job_id = archives.start_install_job(zip_path, target, {"static_path": "/static/articles/slug/"})
+    for _ in range(100):
+        job = archives.get_job(job_id)
+        if job["status"] != "running":
+            break
+        time.sleep(0.02)
+    assert job["status"] == "done"
+    assert (target / "index.html").read_text() == "<h1>hi</h1>"
+    assert not zip_path.exists()
+
+
+def _install(tmp_path, target, content: str) -> None:
+    zip_path = tmp_path / f"{content}.zip"
+    zip_path.write_bytes(_zip({"index.html": content}))
+    archives.install_package(zip_path, target)
+
+
+def _siblings(target) -> list:
+    """target 之外的同级条目（按前缀）"""
+    return sorted(path.name.split("-")[0] for path in target.parent.iterdir() if path != target)
+
+
+def test_reinstall_switches_symlink_and_removes_old_releases(tmp_path):
+    target = tmp_path / "static" / "slug"
+    # 前缀相同的其他 slug 不受影响
+    _install(tmp_path, tmp_path / "static" / "slug-2", "other")
+    _install(tmp_path, target, "v1")
+    first = archives.release_of(target)
+    assert target.is_symlink() and first is not None
+
+    _install(tmp_path, target, "v2")
+    assert (target / "index.html").read_text() == "v2"
+    assert archives.release_of(target) != first
+    # 上一个版本保留到下一次切换
+    assert first.exists()
+
+    _install(tmp_path, target, "v3")
+    assert (target / "index.html").read_text() == "v3"
+    assert not first.exists()
+    assert len(archives._releases(target)) == 2
+    assert (tmp_path / "static" / "slug-2" / "index.html").read_text() == "other"
+
+
+def test_target_exists_after_every_rename(tmp_path, monkeypatch):
+    target = tmp_path / "static" / "slug"
+    _install(tmp_path, target, "v0")
+    replace = os.replace
+    states = []
+
+    def spy(src, dst):
+        replace(src, dst)
+        states.append(target.exists())
+
+    monkeypatch.setattr(os, "replace", spy)
+    _install(tmp_path, target, "v1")
+    assert states and all(states)
+    assert (target / "index.html").read_text() == "v1"
+
+
+def test_concurrent_installs_of_one_slug_serialize(tmp_path, monkeypatch):
+    target = tmp_path / "static" / "slug"
+    extract = archives.extract_zip
+    active = []
+    overlap = []
+    errors = []
+
+    def slow_extract(*args, **kwargs):
+        active.append(1)
+        overlap.append(len(active))
+        time.sleep(0.02)
+        try:
+            return extract(*args, **kwargs)
+        finally:
+            active.pop()
+
+    def install(content: str) -> None:
+        try:
+            _install(tmp_path, target, content)
+        except Exception as exc:
+            errors.append(exc)
+
+    monkeypatch.setattr(archives, "extract_zip", slow_extract)
+    threads = [threading.Thread(target=install, args=(f"v{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert max(overlap) == 1
+    assert (target / "index.html").read_text() in {f"v{i}" for i in range(4)}
+    assert _siblings(target) == [".release", ".release"]
+
+
+def test_legacy_plain_directory_is_replaced(tmp_path):
+    target = tmp_path / "static" / "slug"
+    target.mkdir(parents=True)
+    (target / "index.html").write_text("legacy")
+
+    _install(tmp_path, target, "v1")
+    assert target.is_symlink()
+    assert (target / "index.html").read_text() == "v1"
+    assert _siblings(target) == [".release"]
+
+
+def test_remove_article_dir_removes_release(tmp_path):
+    target = tmp_path / "static" / "slug"
+    _install(tmp_path, target, "v1")
+    archives.remove_article_dir(target)
+    assert list(target.parent.iterdir()) == []
+
+
+def test_job_of_exited_worker_is_failed(jobs_dir):
+    archives._write_job("abc123", status="running", done=1, total=2, pid=_dead_pid(), static_path="/s/")
+    archives._write_job("def456", status="running", done=1, total=2, pid=os.getpid(), static_path="/s/")
+
+    assert archives.fail_interrupted_jobs() == 1
+    job = archives.get_job("abc123")
+    assert job["status"] == "failed"
+    assert job["static_path"] == "/s/"
+    # 仍在运行的进程的任务不受影响
+    assert archives.get_job("def456")["status"] == "running"
+
+
+def test_get_job_notices_exited_worker(jobs_dir):
+    archives._write_job("abc123", status="running", done=0, total=0, pid=_dead_pid())
+    assert archives.get_job("abc123")["status"] == "failed"
+
+
+def test_cleanup_removes_old_leftover_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(cleanup_static, "BASE_DIR", tmp_path)
+    root = tmp_path / "app" / "static" / "articles"
+    old = time.time() - archives.JOB_TTL_SECONDS - 60
+    names = (".staging-a-x1", ".trash-a-x2", ".release-a-x4", ".release-c-x5", ".staging-b-x3", "legacy")
+    for name in names:
+        (root / name).mkdir(parents=True)
+    os.symlink(".release-c-x5", root / "article")
+    os.symlink(".release-c-x5", root / ".link-article-x6")
+    for name in (".staging-a-x1", ".trash-a-x2", ".release-a-x4", ".release-c-x5", "legacy"):
+        os.utime(root / name, (old, old))
+    os.utime(root / ".link-article-x6", (old, old), follow_symlinks=False)
+
+    cleanup_static.cleanup_article_leftovers(dry_run=True)
+    assert len(list(root.iterdir())) == 8
+
+    cleanup_static.cleanup_article_leftovers(dry_run=False)
+    # 最近修改过的暂存目录（解压可能仍在进行）、正式目录及其指向的版本目录保留
+    assert sorted(path.name for path in root.iterdir()) == [".release-c-x5", ".staging-b-x3", "article", "legacy"]
@@ -0,0 +1,86 @@
+"""
+登录 token 的撤销：重置密码、set_admin.py 修改管理员身份后旧 token 返回 401；缺少 uid / ver 的旧版 token 无效。
+"""
+import pytest
+
+from app import auth, database, models
+from app.routers.password_reset import _create_reset_token
+from app.utils import token_versions
+from set_admin import set_user_admin_status
+
+from tests.conftest import login
+
+# 需要登录的只读接口
+PROBE = "/api/v1/me/recommendations"
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    """其他进程（set_admin.py）修改用户后，本进程的用户状态缓存每次请求都重新加载"""
+    monkeypatch.setattr(token_versions, "REFRESH_SECONDS", 0)
+
+
+def _user(user_id: int) -> models.User:
+    db = database.SessionLocal()
+    try:
+        return db.get(models.User, user_id)
+    finally:
+        db.close()
+
+
+def test_valid_token_is_accepted(user_client):
+    assert user_client.get(PROBE).status_code == 200
+
+
+@pytest.mark.parametrize("claims", [
+    {"sub": "user1"},
+    {"sub": "user1", "uid": 2},
+    {"sub": "user1", "ver": 0},
+    {"uid": 2, "ver": 0},
+])
+def test_token_without_uid_or_ver_is_rejected(client, claims):
+    assert auth.decode_claims(auth.create_access_token(data=claims)) is None
+    client.cookies.set("access_token", f"Bearer {auth.create_access_token(data=claims)}")
+    assert client.get(PROBE).status_code == 401
+
+
+def test_password_reset_revokes_tokens(client):
+    user = _user(5)
+    login(client, user.id)
+    assert client.get(PROBE).status_code == 200
+
+    db = database.SessionLocal()
+    try:
+        token = _create_reset_token(db, user.email)
+    finally:
+        db.close()
+    data = {"token": token, "new_password": "another-password", "confirm_password": "another-password"}
+    assert client.post("/password-reset", data=data).status_code == 200
+
+    assert _user(user.id).token_version == (user.token_version or 0) + 1
+    assert client.get(PROBE).status_code == 401
+    # 重新登录后签发的新 token 有效
+    login(client, user.id)
+    assert client.get(PROBE).status_code == 200
+
+
+def test_set_admin_revokes_tokens(client, fresh_cache):
+    user = _user(4)
+    login(client, user.id)
+    assert client.get(PROBE).status_code == 200
+
+    set_user_admin_status(user.username, True)
+    try:
+        assert client.get(PROBE).status_code == 401
+        login(client, user.id)
+        assert client.get(PROBE).status_code == 200
+    finally:
+        set_user_admin_status(user.username, False)
+    assert client.get(PROBE).status_code == 401
+
+
+def test_set_admin_without_change_keeps_tokens(client, fresh_cache):
+    user = _user(4)
+    login(client, user.id)
+    set_user_admin_status(user.username, bool(user.is_admin))
+    assert client.get(PROBE).status_code == 200
@@ -0,0 +1,127 @@
+"""
+封面缩略图：manifest 缓存、丢失任务的重新提交与补齐命令。
+"""
+import json
+import os
+import time
+
+import pytest
+
+from app import database, models
+from app.maintenance import build_cover_renditions
+from app.utils import images, uploads
+
+pytestmark = pytest.mark.skipif(images.Image is None, reason="需要 Pillow")
+
+render_renditions = images.render_renditions
+
+
+@pytest.fixture
+def covers(tmp_path, monkeypatch):
+    """封面与缩略图写到临时目录，并清空 manifest 缓存"""
+    monkeypatch.setattr(images, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(uploads, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(images, "RENDITIONS_DIR", tmp_path / "app" / "static" / "uploads" / "covers" / "renditions")
+    monkeypatch.setattr(images, "_manifest_cache", images.OrderedDict())
+    monkeypatch.setattr(images, "_missing", {})
+    (tmp_path / "app" / "static" / "uploads" / "covers").mkdir(parents=True)
+    return tmp_path
+
+
+def _cover(base, name: str) -> str:
+    url = f"/static/uploads/covers/{name}.png"
+    images.Image.new("RGB", (400, 300), "red").save(base / "app" / url.lstrip("/"))
+    return url
+
+
+def _wait_for(condition, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.05)
+
+
+def _crash_once(src_path: str, out_dir: str, stem: str) -> dict:
+    """第一次调用时让子进程直接退出（模拟子进程崩溃），之后正常生成"""
+    flag = os.path.join(out_dir, f".{stem}.crashed")
+    if not os.path.exists(flag):
+        open(flag, "w").close()
+        os._exit(1)
+    return render_renditions(src_path, out_dir, stem)
+
+
+def test_missing_manifest_is_cached_briefly(covers, monkeypatch):
+    url = _cover(covers, "a")
+    assert images.load_manifest(url) is None
+
+    images.RENDITIONS_DIR.mkdir(parents=True)
+    images._manifest_path(url).write_text(json.dumps({"renditions": {}}))
+    # 未过期前不再检查文件
+    assert images.load_manifest(url) is None
+
+    monkeypatch.setattr(images, "MISSING_TTL_SECONDS", 0)
+    assert images.load_manifest(url) == {"renditions": {}}
+
+
+def test_manifest_cache_evicts_least_recently_used(covers, monkeypatch):
+    monkeypatch.setattr(images, "MANIFEST_CACHE_SIZE", 2)
+    images.RENDITIONS_DIR.mkdir(parents=True)
+    urls = [f"/static/uploads/covers/{name}.png" for name in "abc"]
+    for url in urls:
+        images._manifest_path(url).write_text(json.dumps({"renditions": {}}))
+        images.load_manifest(url)
+    assert list(images._manifest_cache) == urls[1:]
+
+
+def test_schedule_writes_manifest_and_clears_pending(covers):
+    url = _cover(covers, "b")
+    images.schedule_renditions(url)
+    assert images._pending_path(url).exists() or images.has_renditions(url)
+    _wait_for(lambda: not images._pending_path(url).exists())
+    manifest = json.loads(images._manifest_path(url).read_text())
+    assert set(manifest["renditions"]) == set(images.RENDITIONS)
+
+
+def test_broken_pool_is_retried(covers, monkeypatch):
+    monkeypatch.setattr(images, "render_renditions", _crash_once)
+    url = _cover(covers, "c")
+    images.schedule_renditions(url)
+    _wait_for(lambda: not images._pending_path(url).exists())
+    assert images.has_renditions(url)
+
+
+def test_resume_pending_resubmits_jobs_of_exited_workers(covers, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(images, "schedule_renditions", scheduled.append)
+    images.RENDITIONS_DIR.mkdir(parents=True)
+    dead = os.fork()
+    if dead == 0:
+        os._exit(0)
+    os.waitpid(dead, 0)
+    (images.RENDITIONS_DIR / ".lost.pending").write_text(
+        json.dumps({"url": "/static/uploads/covers/lost.png", "pid": dead})
+    )
+    (images.RENDITIONS_DIR / ".live.pending").write_text(
+        json.dumps({"url": "/static/uploads/covers/live.png", "pid": os.getpid()})
+    )
+
+    assert images.resume_pending() == 1
+    assert scheduled == ["/static/uploads/covers/lost.png"]
+
+
+def test_backfill_renders_covers_without_manifest(seeded, covers):
+    urls = [_cover(covers, name) for name in ("d", "e")]
+    db = database.SessionLocal()
+    try:
+        for url in urls:
+            db.add(models.StoredFile(sha256=url, url=url, size=1, ref_count=1))
+        db.commit()
+        assert build_cover_renditions.missing_covers() == urls
+
+        build_cover_renditions.build_cover_renditions(workers=1)
+        assert all(images.has_renditions(url) for url in urls)
+        assert build_cover_renditions.missing_covers() == []
+    finally:
+        db.query(models.StoredFile).filter(models.StoredFile.url.in_(urls)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
@@ -0,0 +1,110 @@
+"""
+邮件 outbox：密码重置请求只写入 outbox，由 drain() 通过本地 SMTP 替身发送。
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import database, models
+from app.utils import outbox, reset_tokens
+from app.utils.smtp_sink import SmtpSink
+
+EMAIL = "user5@example.com"
+
+
+@pytest.fixture
+def sink(seeded):
+    """本地 SMTP 替身；先清空 outbox，避免其他测试写入的邮件干扰计数"""
+    db = database.SessionLocal()
+    try:
+        db.query(models.EmailOutbox).delete()
+        db.commit()
+    finally:
+        db.close()
+    with SmtpSink() as sink:
+        yield sink
+
+
+def _transport(sink: SmtpSink) -> outbox.SmtpTransport:
+    return outbox.SmtpTransport(sink.host, sink.port, "noreply@localhost")
+
+
+def _rows():
+    db = database.SessionLocal()
+    try:
+        return db.query(models.EmailOutbox).order_by(models.EmailOutbox.id).all()
+    finally:
+        db.close()
+
+
+def test_password_reset_email_is_sent_by_drain(client, sink):
+    response = client.post("/password-reset/request", data={"email": EMAIL})
+    assert response.status_code == 200
+    # 请求本身不发信
+    assert sink.messages == []
+
+    assert outbox.drain(_transport(sink)) == 1
+    assert len(sink.messages) == 1
+    assert sink.connections == 1
+    assert sink.messages[0]["To"] == EMAIL
+    [row] = _rows()
+    assert row.status == "sent"
+    assert row.attempts == 1
+
+
+def test_batch_reuses_one_connection(client, sink):
+    for email in (EMAIL, "user1@example.com", "nobody@example.com"):
+        client.post("/password-reset/request", data={"email": email})
+
+    assert outbox.drain(_transport(sink)) == 2
+    assert sorted(message["To"] for message in sink.messages) == sorted([EMAIL, "user1@example.com"])
+    assert sink.connections == 1
+
+
+def test_temporary_failure_is_retried_later(client, sink):
+    client.post("/password-reset/request", data={"email": EMAIL})
+    sink.fail_next(1, 451)
+
+    assert outbox.drain(_transport(sink)) == 1
+    assert sink.messages == []
+    [row] = _rows()
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert "451" in row.last_error
+    assert row.next_attempt_at > datetime.utcnow()
+
+    # 退避期内不会重发
+    assert outbox.drain(_transport(sink)) == 0
+    assert sink.messages == []
+
+
+def test_dispatcher_purges_expired_reset_tokens(sink, tmp_path):
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter_by(email=EMAIL).one()
+        reset_tokens.create(db, user.id)
+        db.flush()
+        db.query(models.PasswordResetToken).update({"expires_at": datetime.utcnow() - timedelta(minutes=1)})
+        db.commit()
+    finally:
+        db.close()
+
+    dispatcher = outbox.Dispatcher(lambda: _transport(sink), lock_path=str(tmp_path / "outbox.lock"))
+    dispatcher.start()
+    try:
+        deadline = time.monotonic() + 10
+        while _reset_token_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        dispatcher.stop()
+        dispatcher.join(timeout=10)
+    assert _reset_token_count() == 0
+
+
+def _reset_token_count() -> int:
+    db = database.SessionLocal()
+    try:
+        return db.query(models.PasswordResetToken).count()
+    finally:
+        db.close()
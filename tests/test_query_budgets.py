@@ -0,0 +1,45 @@
+"""
+路由查询预算：ROUTE_QUERY_BUDGETS 中的每个路由（匿名 / 管理员，后者可访问全部页面）各请求一次，
+语句数不超过预算，且 N+1 检测器处于 raise 模式（逐行懒加载直接让请求失败）。
+"""
+import pytest
+from fastapi.routing import APIRoute
+
+from app.main import app as main_app
+from app.utils import nplusone
+
+from tests.query_budget import ROUTE_QUERY_BUDGETS
+from tests.test_routes import _url
+
+
+def _route_labels():
+    return {
+        f"{method} {route.path}"
+        for route in main_app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+
+def test_budgets_name_existing_routes():
+    missing = set(ROUTE_QUERY_BUDGETS) - _route_labels()
+    assert not missing, f"预算中的路由不存在：{sorted(missing)}"
+
+
+def test_nplusone_raises():
+    assert nplusone.MODE == "raise"
+
+
+@pytest.mark.parametrize("who", ["client", "admin_client"])
+@pytest.mark.parametrize("label", sorted(ROUTE_QUERY_BUDGETS))
+def test_route_within_budget(request, query_budget, who, label):
+    method, path = label.split(" ", 1)
+    client = request.getfixturevalue(who)
+    response = client.request(method, _url(path))
+    # 匿名访问需要登录的页面时返回 401 / 重定向，同样要在预算内
+    assert response.status_code < 500, response.text
+
+    recorded = [(route, count) for route, count, _ in query_budget.requests if route == label]
+    assert len(recorded) == 1, query_budget.requests
+    count = recorded[0][1]
+    assert count <= ROUTE_QUERY_BUDGETS[label], f"{label}: {count} 条语句"
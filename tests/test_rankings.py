@@ -0,0 +1,120 @@
+"""
+排行榜：评分写入 / 修改 / 撤销时增量维护的 game_rankings 与 ranking_totals，
+应与从评分表全量重建（rankings.rebuild）的结果一致。
+"""
+import pytest
+from sqlalchemy import func
+
+from app import database, models
+from app.utils import rankings
+from app.utils.ratings import DIFFICULTY_CATEGORY_MAP, QUALITY_CATEGORY_MAP
+
+
+def _snapshot(scores: bool = True) -> dict:
+    db = database.SessionLocal()
+    try:
+        rows = {
+            ranking.game_id: (
+                ranking.quality_count, pytest.approx(ranking.quality_sum),
+                ranking.difficulty_count, pytest.approx(ranking.difficulty_sum),
+            ) + ((pytest.approx(ranking.quality_score), pytest.approx(ranking.difficulty_score)) if scores else ())
+            for ranking in db.query(models.GameRanking)
+            # 评分全部撤销后增量路径保留计数为 0 的行，重建时不会生成
+            if ranking.quality_count or ranking.difficulty_count
+        }
+        totals = {row.kind: (row.count, pytest.approx(row.sum)) for row in db.query(models.RankingTotals)}
+        return {"rows": rows, "totals": totals}
+    finally:
+        db.close()
+
+
+def _quality(client, game_id: int, value: int):
+    data = {f"rating_{name}": str(value) for name in QUALITY_CATEGORY_MAP}
+    response = client.post(f"/game/{game_id}/rate_quality", data=data)
+    assert response.status_code == 200, response.text
+
+
+def _difficulty(client, game_id: int, values: dict):
+    data = {f"rating_{name}": str(value) for name, value in values.items()}
+    response = client.post(f"/game/{game_id}/rate_difficulty", data=data)
+    assert response.status_code == 200, response.text
+
+
+def test_incremental_updates_match_rebuild(user_client, admin_client):
+    db = database.SessionLocal()
+    try:
+        rankings.rebuild(db)
+    finally:
+        db.close()
+    difficulty_names = list(DIFFICULTY_CATEGORY_MAP)
+
+    # 新增
+    _quality(user_client, 3, 5)
+    _quality(admin_client, 3, 2)
+    _difficulty(user_client, 4, {name: 20 for name in difficulty_names})
+    # 只填部分维度的难度评分按有效维度求均值
+    _difficulty(admin_client, 4, {difficulty_names[0]: 50})
+    # 修改
+    _quality(user_client, 3, 1)
+    _difficulty(user_client, 4, {name: 40 for name in difficulty_names})
+    # 撤销
+    assert admin_client.delete("/game/3/rate_quality").status_code == 200
+    _quality(admin_client, 5, 4)
+    assert admin_client.delete("/game/5/rate_quality").status_code == 200
+    assert admin_client.delete("/game/4/rate_difficulty").status_code == 200
+
+    incremental = _snapshot(scores=False)
+    # 最后写入的游戏按当时（即当前）的全站均值计分，与重建结果一致
+    db = database.SessionLocal()
+    try:
+        last = db.get(models.GameRanking, 4)
+        last_score = last.difficulty_score
+        rankings.refresh_scores(db)
+        db.commit()
+    finally:
+        db.close()
+    refreshed = _snapshot()
+
+    db = database.SessionLocal()
+    try:
+        rankings.rebuild(db)
+        rebuilt_last = db.get(models.GameRanking, 4).difficulty_score
+    finally:
+        db.close()
+    assert last_score == pytest.approx(rebuilt_last)
+    assert incremental == _snapshot(scores=False)
+    assert refreshed == _snapshot()
+
+
+def test_forget_game_subtracts_totals(seeded):
+    db = database.SessionLocal()
+    try:
+        rankings.rebuild(db)
+        game_id = db.query(models.GameRanking.game_id).filter(models.GameRanking.quality_count > 0).first()[0]
+        rankings.forget_game(db, game_id)
+        db.flush()
+        count, total = db.query(
+            func.sum(models.GameRanking.quality_count), func.sum(models.GameRanking.quality_sum)
+        ).one()
+        totals = db.get(models.RankingTotals, "quality")
+        assert db.get(models.GameRanking, game_id) is None
+        assert (totals.count, totals.sum) == (count, pytest.approx(total))
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_missing_totals_row_is_recreated(seeded):
+    db = database.SessionLocal()
+    try:
+        rankings.rebuild(db)
+        expected = db.get(models.RankingTotals, "difficulty").count + 1
+        db.query(models.RankingTotals).delete()
+        rankings.record_difficulty(db, 1, None, 30.0)
+        assert db.get(models.RankingTotals, "difficulty").count == 1
+        db.rollback()
+        rankings.record_difficulty(db, 1, None, 30.0)
+        assert db.get(models.RankingTotals, "difficulty").count == expected
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,65 @@
+"""
+限流：令牌桶的补充 / 扣减（显式传入 now），多个桶同时检查时的扣减规则，以及路由返回 429 + Retry-After。
+"""
+import pytest
+
+from app.utils import ratelimit
+
+RULE = ratelimit.Rule(3, 60)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ratelimit.SqliteBucketStore(str(tmp_path / "ratelimit.db"))
+
+
+def test_burst_then_refill(store):
+    assert [store.take("k", RULE, now=1000) for _ in range(3)] == [0, 0, 0]
+    # 桶空后需要等 period / count 秒攒够一个令牌
+    assert store.take("k", RULE, now=1000) == pytest.approx(20)
+    assert store.take("k", RULE, now=1010) == pytest.approx(10)
+    assert store.take("k", RULE, now=1020) == 0
+    assert store.take("k", RULE, now=1020) > 0
+
+
+def test_tokens_capped_at_capacity(store):
+    store.take("k", RULE, now=1000)
+    # 空闲很久后最多只有 count 个令牌
+    assert [store.take("k", RULE, now=10000) for _ in range(3)] == [0, 0, 0]
+    assert store.take("k", RULE, now=10000) > 0
+
+
+def test_keys_are_independent(store):
+    for _ in range(3):
+        store.take("a", RULE, now=1000)
+    assert store.take("a", RULE, now=1000) > 0
+    assert store.take("b", RULE, now=1000) == 0
+
+
+def test_rejected_request_consumes_no_bucket(store):
+    user_rule = ratelimit.Rule(1, 60)
+    checks = [("vote:ip:1.2.3.4", RULE), ("vote:user:1", user_rule)]
+    assert store.take_all(checks, now=1000) == 0
+    # 用户桶已空：拒绝，且不消耗 IP 桶
+    for _ in range(5):
+        assert store.take_all(checks, now=1000) == pytest.approx(60)
+    assert store.take("vote:ip:1.2.3.4", RULE, now=1000) == 0
+    assert store.take("vote:ip:1.2.3.4", RULE, now=1000) == 0
+    assert store.take("vote:ip:1.2.3.4", RULE, now=1000) > 0
+
+
+@pytest.fixture
+def limited(store, monkeypatch):
+    """打开限流（conftest 默认关闭），使用独立的限流库，登录限制为每分钟 2 次"""
+    monkeypatch.setattr(ratelimit, "ENABLED", True)
+    monkeypatch.setattr(ratelimit, "store", store)
+    monkeypatch.setenv("STG_RATELIMIT_LOGIN_IP", "2/60")
+
+
+def test_login_returns_429_with_retry_after(client, limited):
+    form = {"username": "user1", "password": "wrong"}
+    assert [client.post("/login", data=form).status_code for _ in range(2)] == [401, 401]
+
+    response = client.post("/login", data=form)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
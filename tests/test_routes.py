@@ -0,0 +1,105 @@
+"""
+逐个请求路由：所有 GET 页面（匿名 / 普通用户 / 管理员）以及评分、投票、密码重置等写入路由。
+
+除了断言没有 5xx，每个测试都由 tests.loop_guard 检查：async 路由在事件循环中执行了同步查询，
+或事件循环被阻塞超过阈值，测试即失败。
+"""
+import re
+
+import pytest
+from fastapi.routing import APIRoute
+
+from app import database, models
+from app.main import app as main_app
+from app.routers.password_reset import _create_reset_token
+from app.utils.ratings import DIFFICULTY_CATEGORY_MAP, QUALITY_CATEGORY_MAP
+
+from tests.conftest import USER_ID
+
+# 路径参数的取值（对应合成数据中存在的行；job_id 为不存在的任务）
+PATH_PARAMS = {
+    "game_id": "1",
+    "user_id": str(USER_ID),
+    "resource_id": "1",
+    "bounty_id": "1",
+    "article_id": "1",
+    "slug": "article-0",
+    "job_id": "missing",
+}
+
+# 必填的查询参数
+QUERY_STRINGS = {
+    "/password-reset": "?token=invalid",
+}
+
+GET_ROUTES = sorted(
+    route.path
+    for route in main_app.routes
+    if isinstance(route, APIRoute) and "GET" in route.methods
+)
+
+
+def _url(path: str) -> str:
+    return re.sub(r"\{(\w+)\}", lambda match: PATH_PARAMS[match.group(1)], path) + QUERY_STRINGS.get(path, "")
+
+
+@pytest.mark.parametrize("who", ["client", "user_client", "admin_client"])
+@pytest.mark.parametrize("path", GET_ROUTES)
+def test_get_route(request, who, path):
+    client = request.getfixturevalue(who)
+    response = client.get(_url(path))
+    assert response.status_code < 500, response.text
+
+
+def test_rate_quality(user_client):
+    data = {f"rating_{name}": "4" for name in QUALITY_CATEGORY_MAP}
+    response = user_client.post("/game/1/rate_quality", data=data)
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "success"
+
+
+def test_rate_difficulty(user_client):
+    db = database.SessionLocal()
+    try:
+        level = db.query(models.DifficultyLevel).filter_by(game_id=1).first()
+        ship = db.query(models.ShipType).filter_by(game_id=1).first()
+    finally:
+        db.close()
+    data = {f"rating_{name}": "30" for name in DIFFICULTY_CATEGORY_MAP}
+    data.update(difficulty_level_id=str(level.id), ship_type_id=str(ship.id))
+    response = user_client.post("/game/1/rate_difficulty", data=data)
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "success"
+
+
+def test_rate_requires_login(client):
+    response = client.post("/game/1/rate_quality", data={"rating_趣味性": "4"})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("direction", ["up", "down"])
+def test_resource_vote(user_client, direction):
+    response = user_client.post("/resources/1/vote", data={"direction": direction})
+    assert response.status_code == 200, response.text
+
+
+def test_password_reset_request(client):
+    response = client.post("/password-reset/request", data={"email": "user3@example.com"})
+    assert response.status_code == 200
+    # 不存在的邮箱返回同样的页面
+    response = client.post("/password-reset/request", data={"email": "nobody@example.com"})
+    assert response.status_code == 200
+
+
+def test_password_reset_submit(client):
+    db = database.SessionLocal()
+    try:
+        token = _create_reset_token(db, "user4@example.com")
+    finally:
+        db.close()
+    data = {"token": token, "new_password": "new-password", "confirm_password": "new-password"}
+    response = client.post("/password-reset", data=data)
+    assert response.status_code == 200, response.text
+    # token 只能使用一次
+    response = client.post("/password-reset", data=data)
+    assert response.status_code == 400